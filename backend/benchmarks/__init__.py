@@ -0,0 +1,27 @@
+"""
+Standalone performance benchmarks. Run from the backend directory, e.g.
+
+    python -m benchmarks.ws_auth
+    python -m benchmarks.endpoints
+
+Each benchmark runs against a throwaway test database.
+"""
+import os
+
+def setup_django():
+    """
+    Configure Django and create a test database, returns a teardown callable.
+    """
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'bugsnug.settings')
+    import django
+    django.setup()
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+
+    def teardown():
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+    return teardown
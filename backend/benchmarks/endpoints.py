@@ -0,0 +1,269 @@
+"""
+Latency percentiles, throughput and database queries per request of the
+hot endpoints, served through the full ASGI stack against seeded data
+and a fake Codeforces with configurable latency.
+
+    python -m benchmarks.endpoints [--requests N] [--concurrency N] [--latency S]
+    python -m benchmarks.endpoints --save-baseline baseline.json
+    python -m benchmarks.endpoints --baseline baseline.json [--tolerance 0.2]
+
+With --baseline the exit status is 1 when any scenario regressed.
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+from contextlib import asynccontextmanager, nullcontext
+from urllib.parse import urlencode
+from . import setup_django
+
+SCENARIOS = [
+    'problems', 'problems_filtered', 'problems_search',
+    'submissions', 'submissions_sync',
+    'chat_history', 'chat_history_deep', 'chat_inbox', 'chat_consumer',
+]
+REQUEST_TIMEOUT = 30
+# Messages in each of the short conversations filling the inbox
+INBOX_MESSAGES = 10
+NEVER_SYNC = 10 ** 9
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=500, help='Measured requests per scenario')
+    parser.add_argument('--warmup', type=int, default=20, help='Unmeasured requests before each scenario')
+    parser.add_argument('--concurrency', type=int, default=10)
+    parser.add_argument('--latency', type=float, default=0.05, help='Seconds per fake Codeforces call')
+    parser.add_argument('--jitter', type=float, default=0.02, help='Extra random seconds per fake call')
+    parser.add_argument('--problems', type=int, default=10000)
+    parser.add_argument('--users', type=int, default=10, help='Users with a synced submission history')
+    parser.add_argument('--submissions', type=int, default=5000, help='Submissions per user')
+    parser.add_argument('--messages', type=int, default=50000, help='Messages in the benchmarked conversation')
+    parser.add_argument('--channel-layer', choices=['settings', 'memory'], default='settings',
+                        help='Channel layer for chat_consumer, memory isolates the consumer itself')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help='Comma separated subset to run')
+    parser.add_argument('--save-baseline', metavar='FILE')
+    parser.add_argument('--baseline', metavar='FILE')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed slowdown against the baseline')
+    args = parser.parse_args()
+    args.scenarios = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    return args
+
+class Bench:
+    """
+    Seeded users, tokens and the request helpers scenarios are built from.
+    """
+    def __init__(self, args, fake):
+        from django.contrib.auth import get_user_model
+        from rest_framework_simplejwt.tokens import AccessToken
+        from chat.views import history_cursor
+        from chat.models import Message
+        from .seed import seed_contests, seed_conversation, seed_problems, seed_users
+
+        User = get_user_model()
+        self.args = args
+        self.fake = fake
+        self.random = random.Random(0)
+
+        started = time.perf_counter()
+        seed_problems()
+        seed_contests()
+        self.users = seed_users(args.users)
+        # Chat peers of users[0], the first one with the long conversation
+        self.peers = [User.objects.create_user(f'peer{i}', password='x') for i in range(max(1, args.concurrency))]
+        conversation = seed_conversation(self.users[0], self.peers[0], args.messages)
+        for peer in self.peers[1:]:
+            seed_conversation(self.users[0], peer, INBOX_MESSAGES)
+        print(f'seeded in {time.perf_counter() - started:.1f}s', file=sys.stderr)
+
+        self.tokens = {user.id: str(AccessToken.for_user(user)) for user in self.users + self.peers}
+        middle = (
+            Message.objects.filter(conversation=conversation)
+            .order_by('-timestamp', '-id')
+            .values('id', 'timestamp')[args.messages // 2:args.messages // 2 + 1]
+        )
+        self.deep_cursor = history_cursor(middle[0]) if middle else None
+
+    def user(self, i):
+        return self.users[i % len(self.users)]
+
+    async def get(self, user, path, params=None):
+        # Through the ASGI application as daphne would call it, so each
+        # request gets its own thread-sensitive context like in production
+        from bugsnug.asgi import application
+        from channels.testing import HttpCommunicator
+
+        if params:
+            path = f'{path}?{urlencode(params)}'
+        headers = [(b'host', b'testserver'), (b'authorization', f'Bearer {self.tokens[user.id]}'.encode())]
+        communicator = HttpCommunicator(application, 'GET', path, headers=headers)
+        try:
+            response = await communicator.get_response(timeout=REQUEST_TIMEOUT)
+        finally:
+            await communicator.send_input({'type': 'http.disconnect'})
+            await communicator.wait()
+        return response['status'] == 200
+
+    def scenario(self, name):
+        """
+        (call, async context manager or None) for a scenario, call(i)
+        issues request i within the context.
+        """
+        tags = ['dp', 'greedy', 'math', 'graphs', 'strings', 'trees']
+        words = ['array', 'tree', 'game', 'string', 'queries', 'permutation']
+        if name == 'problems':
+            return lambda i: self.get(self.user(i), '/api/problems/', {'page': i % 50 + 1}), None
+        if name == 'problems_filtered':
+            def call(i):
+                return self.get(self.user(i), '/api/problems/', {
+                    'tags': ','.join(self.random.sample(tags, 2)),
+                    'tags_mode': 'or' if i % 2 else 'and',
+                    'min_rating': 1200,
+                    'max_rating': 2400,
+                    'sort': '-rating' if i % 3 else 'rating',
+                    'hide_solved': 'true',
+                })
+            return call, None
+        if name == 'problems_search':
+            return lambda i: self.get(self.user(i), '/api/problems/', {'q': words[i % len(words)]}), None
+        if name == 'submissions':
+            return lambda i: self.get(self.user(i), '/api/users/submissions/'), sync_interval(NEVER_SYNC)
+        if name == 'submissions_sync':
+            return lambda i: self.get(self.user(i), '/api/users/submissions/', {'limit': 100}), sync_interval(-1)
+        if name == 'chat_history':
+            peer = self.peers[0].username
+            return lambda i: self.get(self.users[0], f'/api/chat/history/{peer}/'), None
+        if name == 'chat_history_deep':
+            peer = self.peers[0].username
+            return lambda i: self.get(self.users[0], f'/api/chat/history/{peer}/', {'before': self.deep_cursor}), None
+        if name == 'chat_inbox':
+            return lambda i: self.get(self.users[0], '/api/chat/inbox/'), None
+        if name == 'chat_consumer':
+            rooms = ChatRooms(self.users[0], self.peers, self.args.channel_layer)
+            return rooms.call, rooms
+        raise ValueError(name)
+
+@asynccontextmanager
+async def sync_interval(seconds):
+    """
+    Overrides how stale submissions must be before a request syncs them,
+    -1 syncs on every request and NEVER_SYNC not at all.
+    """
+    from problems import sync
+    interval = sync.SUBMISSION_SYNC_INTERVAL
+    sync.SUBMISSION_SYNC_INTERVAL = seconds
+    try:
+        yield
+    finally:
+        sync.SUBMISSION_SYNC_INTERVAL = interval
+
+class ChatRooms:
+    """
+    One connected pair of ChatConsumers per concurrent worker. A request
+    is a message from the user until the peer's socket receives it.
+    """
+    def __init__(self, user, peers, layer):
+        self.user = user
+        self.peers = peers
+        self.layer = layer
+        self.rooms = []
+
+    async def __aenter__(self):
+        from channels.layers import InMemoryChannelLayer, channel_layers
+        from channels.routing import URLRouter
+        from channels.testing import WebsocketCommunicator
+        from chat.routing import websocket_urlpatterns
+
+        if self.layer == 'memory':
+            channel_layers.set('default', InMemoryChannelLayer())
+        application = URLRouter(websocket_urlpatterns)
+        for peer in self.peers:
+            room = f'{self.user.username}_{peer.username}'
+            sockets = []
+            for member in (self.user, peer):
+                communicator = WebsocketCommunicator(application, f'/ws/chat/{room}/')
+                communicator.scope['user'] = member
+                connected, _ = await communicator.connect()
+                if not connected:
+                    raise RuntimeError(f'{member.username} could not join {room}')
+                sockets.append(communicator)
+            self.rooms.append((asyncio.Lock(), *sockets))
+        return self
+
+    async def call(self, i):
+        lock, sender, receiver = self.rooms[i % len(self.rooms)]
+        async with lock:
+            await sender.send_json_to({'message': f'bench {i}'})
+            # The sender is in the group too, drain its echo
+            await receiver.receive_json_from(timeout=10)
+            await sender.receive_json_from(timeout=10)
+        return True
+
+    async def __aexit__(self, *exc_info):
+        for _, sender, receiver in self.rooms:
+            await sender.disconnect()
+            await receiver.disconnect()
+
+async def run_scenario(bench, name, counter):
+    from .harness import Result, run_concurrently
+
+    args = bench.args
+    call, context = bench.scenario(name)
+    async with context or nullcontext():
+        await run_concurrently(call, args.warmup, args.concurrency)
+        counter.count = 0
+        bench.fake.reset_calls()
+        latencies, elapsed, errors = await run_concurrently(call, args.requests, args.concurrency)
+        queries = counter.count
+        upstream_calls = sum(bench.fake.calls.values())
+    return Result(name, latencies, elapsed, args.concurrency, queries, upstream_calls, errors)
+
+def main():
+    args = parse_args()
+    teardown = setup_django()
+    try:
+        from django.db import connection
+        from .fake_codeforces import FakeCodeforces
+        from .harness import QueryCounter, compare_baseline, format_table, load_baseline, save_baseline
+
+        fake = FakeCodeforces(problems=args.problems, submissions_per_user=args.submissions)
+        fake.install()
+        try:
+            bench = Bench(args, fake)
+            fake.latency, fake.jitter = args.latency, args.jitter
+            counter = QueryCounter()
+            counter.install()
+
+            async def run_all():
+                return {name: (await run_scenario(bench, name, counter)).as_dict() for name in args.scenarios}
+            results = asyncio.run(run_all())
+        finally:
+            fake.uninstall()
+
+        print(format_table(results))
+        meta = {
+            'database': connection.vendor,
+            **{key: getattr(args, key) for key in ('requests', 'concurrency', 'latency', 'jitter', 'problems', 'users', 'submissions', 'messages', 'channel_layer')},
+        }
+        if args.save_baseline:
+            save_baseline(args.save_baseline, results, meta)
+            print(f'baseline written to {args.save_baseline}')
+        if args.baseline:
+            baseline = load_baseline(args.baseline)
+            changed = sorted(key for key, value in meta.items() if baseline['meta'].get(key) != value)
+            if changed:
+                print(f"warning: baseline was recorded with different {', '.join(changed)}")
+            regressions = compare_baseline(baseline, results, args.tolerance)
+            for regression in regressions:
+                print(f'REGRESSION {regression}')
+            if regressions:
+                sys.exit(1)
+            print(f'no regressions against {args.baseline}')
+    finally:
+        teardown()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,182 @@
+"""
+In-process stand-in for the Codeforces API. Serves a deterministic,
+generated dataset with a configurable latency, behind the same client
+interface utils.codeforces uses, so the response cache, single-flight
+and sync code still run for real.
+"""
+import asyncio
+import random
+import threading
+import time
+from utils import codeforces
+from utils.cache import get_cache
+from utils.codeforces import BaseClient, CodeforcesError
+
+TAGS = [
+    'implementation', 'math', 'greedy', 'dp', 'data structures', 'brute force',
+    'constructive algorithms', 'graphs', 'sortings', 'binary search', 'dfs and similar',
+    'trees', 'strings', 'number theory', 'combinatorics', 'two pointers', 'bitmasks',
+    'geometry', 'dsu', 'shortest paths', 'probabilities', 'divide and conquer',
+    'hashing', 'games', 'interactive', 'flows', 'matrices', 'fft',
+]
+WORDS = [
+    'array', 'tree', 'game', 'string', 'queries', 'permutation', 'graph', 'sum',
+    'minimum', 'maximum', 'path', 'subsequence', 'points', 'segments', 'balanced',
+    'binary', 'cyclic', 'lucky', 'robot', 'cards', 'coins', 'matrix', 'prefix',
+    'palindrome', 'division', 'colors', 'towers', 'swaps', 'xor', 'median',
+]
+VERDICTS = ['OK'] * 5 + ['WRONG_ANSWER'] * 3 + ['TIME_LIMIT_EXCEEDED', 'RUNTIME_ERROR']
+LANGUAGES = ['GNU C++17', 'GNU C++20 (64)', 'Python 3', 'PyPy 3-64', 'Java 21', 'Rust 2021']
+INDEXES = 'ABCDEF'
+
+class FakeCodeforces:
+    """
+    Generated problemset, contests and per-handle submission histories.
+    Every handle exists and has `submissions_per_user` submissions, newest
+    first like user.status. Each call sleeps `latency` seconds plus up to
+    `jitter` more, so upstream cost shows up in the measurements.
+    """
+    def __init__(self, problems=10000, submissions_per_user=5000, contests=2000, latency=0.0, jitter=0.0, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.submissions_per_user = submissions_per_user
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.problems = self._make_problems(problems)
+        self.contests = self._make_contests(contests)
+        self.histories = {}
+
+    def _make_problems(self, count):
+        problems = []
+        for i in range(count):
+            rating = self.random.randrange(800, 3600, 100) if self.random.random() < 0.9 else None
+            problems.append({
+                'contestId': i // len(INDEXES) + 1,
+                'index': INDEXES[i % len(INDEXES)],
+                'name': ' '.join(self.random.sample(WORDS, self.random.randint(1, 4))).title(),
+                'type': 'PROGRAMMING',
+                'rating': rating,
+                'tags': sorted(self.random.sample(TAGS, self.random.randint(0, 4))),
+            })
+        return problems
+
+    def _make_contests(self, count):
+        now = int(time.time())
+        contests = []
+        for contest_id in range(1, count + 1):
+            start = now + (contest_id - count + 10) * 3 * 86400
+            contests.append({
+                'id': contest_id,
+                'name': f'Codeforces Round {contest_id}',
+                'type': 'CF',
+                'phase': 'BEFORE' if start > now else 'FINISHED',
+                'frozen': False,
+                'durationSeconds': 7200,
+                'startTimeSeconds': start,
+                'relativeTimeSeconds': now - start,
+            })
+        return contests
+
+    def history(self, handle):
+        with self.lock:
+            submissions = self.histories.get(handle)
+            if submissions is None:
+                submissions = self.histories[handle] = self._make_history(handle, len(self.histories))
+            return submissions
+
+    def _make_history(self, handle, offset):
+        rng = random.Random(handle)
+        first_id = (offset + 1) * 10_000_000
+        created = int(time.time()) - self.submissions_per_user * 3600
+        submissions = []
+        for i in range(self.submissions_per_user):
+            problem = rng.choice(self.problems)
+            submissions.append({
+                'id': first_id + i,
+                'contestId': problem['contestId'],
+                'creationTimeSeconds': created + i * 3600,
+                'problem': problem,
+                'author': {'members': [{'handle': handle}]},
+                'programmingLanguage': rng.choice(LANGUAGES),
+                'verdict': rng.choice(VERDICTS),
+            })
+        submissions.reverse()
+        return submissions
+
+    def call(self, method, params=None):
+        """
+        The result of an API call, as CodeforcesClient.request returns it.
+        """
+        params = params or {}
+        with self.lock:
+            self.calls[method] = self.calls.get(method, 0) + 1
+        if method == 'problemset.problems':
+            return {
+                'problems': self.problems,
+                'problemStatistics': [
+                    {'contestId': p['contestId'], 'index': p['index'], 'solvedCount': (i * 7919) % 50000}
+                    for i, p in enumerate(self.problems)
+                ],
+            }
+        if method == 'user.status':
+            start = int(params.get('from', 1)) - 1
+            return self.history(params['handle'])[start:start + int(params.get('count', 1000))]
+        if method == 'user.info':
+            return [self.user_info(handle) for handle in params['handles'].split(';')]
+        if method == 'contest.list':
+            return self.contests
+        raise CodeforcesError(f'Codeforces API Error: method {method} is not faked')
+
+    def user_info(self, handle):
+        rating = random.Random(handle).randrange(800, 3000)
+        return {
+            'handle': handle,
+            'rating': rating,
+            'maxRating': rating + 100,
+            'rank': 'expert',
+            'maxRank': 'candidate master',
+            'titlePhoto': f'https://userpic.codeforces.org/{handle}.jpg',
+        }
+
+    def delay(self):
+        return self.latency + (self.random.uniform(0, self.jitter) if self.jitter else 0)
+
+    def reset_calls(self):
+        with self.lock:
+            self.calls.clear()
+
+    def install(self):
+        """
+        Route utils.codeforces through this fake until uninstall().
+        """
+        sync_client = FakeClient(self)
+        async_client = AsyncFakeClient(self)
+        self._saved = (codeforces.get_client, codeforces.get_async_client)
+        codeforces.get_client = lambda: sync_client
+        codeforces.get_async_client = lambda: async_client
+        get_cache().clear()
+
+    def uninstall(self):
+        codeforces.get_client, codeforces.get_async_client = self._saved
+        get_cache().clear()
+
+class FakeClient(BaseClient):
+    def __init__(self, fake):
+        super().__init__()
+        self.fake = fake
+
+    def request(self, method, params=None):
+        started = time.monotonic()
+        time.sleep(self.fake.delay())
+        result = self.fake.call(method, params)
+        self._record(method, time.monotonic() - started, 0)
+        return result
+
+class AsyncFakeClient(FakeClient):
+    async def request(self, method, params=None):
+        started = time.monotonic()
+        await asyncio.sleep(self.fake.delay())
+        result = self.fake.call(method, params)
+        self._record(method, time.monotonic() - started, 0)
+        return result
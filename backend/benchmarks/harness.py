@@ -0,0 +1,144 @@
+"""
+Measurement helpers shared by the benchmarks: latency percentiles,
+throughput, database query counts and JSON baselines.
+"""
+import asyncio
+import json
+import math
+import threading
+import time
+
+PERCENTILES = (50, 90, 99)
+
+def percentile(sorted_values, p):
+    """
+    Nearest-rank percentile of an ascending list.
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(p / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+class QueryCounter:
+    """
+    Counts queries on every database connection of the process, including
+    those opened later by sync_to_async worker threads.
+    """
+    def __init__(self):
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        with self.lock:
+            self.count += 1
+        return execute(sql, params, many, context)
+
+    def attach(self, connection, **kwargs):
+        if self not in connection.execute_wrappers:
+            connection.execute_wrappers.append(self)
+
+    def install(self):
+        from django.db import connections
+        from django.db.backends.signals import connection_created
+        connection_created.connect(self.attach, weak=False)
+        for connection in connections.all():
+            self.attach(connection)
+
+class Result:
+    """
+    Latencies and counters of one scenario.
+    """
+    def __init__(self, name, latencies, elapsed, concurrency, queries, upstream_calls, errors):
+        self.name = name
+        self.latencies = sorted(latencies)
+        self.elapsed = elapsed
+        self.concurrency = concurrency
+        self.queries = queries
+        self.upstream_calls = upstream_calls
+        self.errors = errors
+
+    def as_dict(self):
+        requests = len(self.latencies)
+        data = {
+            'requests': requests,
+            'concurrency': self.concurrency,
+            'throughput': requests / self.elapsed if self.elapsed else 0.0,
+            'mean_ms': 1000 * sum(self.latencies) / requests if requests else 0.0,
+            'max_ms': 1000 * self.latencies[-1] if requests else 0.0,
+            'queries_per_request': self.queries / requests if requests else 0.0,
+            'upstream_calls': self.upstream_calls,
+            'errors': self.errors,
+        }
+        for p in PERCENTILES:
+            data[f'p{p}_ms'] = 1000 * percentile(self.latencies, p)
+        return data
+
+async def run_concurrently(call, requests, concurrency):
+    """
+    Awaits call(i) for i in range(requests) with at most `concurrency` in
+    flight. Returns (latencies, elapsed seconds, errors); a call counts as
+    an error when it raises or returns False.
+    """
+    latencies = []
+    errors = 0
+    next_request = 0
+
+    async def worker():
+        nonlocal errors, next_request
+        while next_request < requests:
+            i = next_request
+            next_request += 1
+            started = time.perf_counter()
+            try:
+                ok = await call(i)
+            except Exception:
+                ok = False
+            latencies.append(time.perf_counter() - started)
+            if ok is False:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, time.perf_counter() - started, errors
+
+def format_table(results):
+    columns = ['requests', 'concurrency', 'throughput', 'p50_ms', 'p90_ms', 'p99_ms', 'max_ms', 'queries_per_request', 'upstream_calls', 'errors']
+    headers = ['reqs', 'conc', 'req/s', 'p50 ms', 'p90 ms', 'p99 ms', 'max ms', 'queries', 'upstream', 'errors']
+    width = max([len('scenario')] + [len(name) for name in results])
+    lines = ['  '.join([f"{'scenario':<{width}}"] + [f'{h:>9}' for h in headers])]
+    for name, data in results.items():
+        cells = [f'{data[c]:>9.1f}' if isinstance(data[c], float) else f'{data[c]:>9}' for c in columns]
+        lines.append('  '.join([f'{name:<{width}}'] + cells))
+    return '\n'.join(lines)
+
+def save_baseline(path, results, meta):
+    with open(path, 'w') as f:
+        json.dump({'meta': meta, 'results': results}, f, indent=2, sort_keys=True)
+
+def load_baseline(path):
+    with open(path) as f:
+        return json.load(f)
+
+def compare_baseline(baseline, results, tolerance):
+    """
+    Regressions against a saved baseline: latency percentiles more than
+    `tolerance` (a fraction) slower, lower throughput by the same margin,
+    more queries per request or new errors. Returns a list of messages.
+    """
+    baseline = baseline['results']
+    regressions = []
+    for name, data in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        for key in [f'p{p}_ms' for p in PERCENTILES]:
+            if data[key] > before[key] * (1 + tolerance):
+                regressions.append(f'{name}: {key} {before[key]:.1f} -> {data[key]:.1f}')
+        if data['throughput'] < before['throughput'] / (1 + tolerance):
+            regressions.append(f"{name}: throughput {before['throughput']:.1f} -> {data['throughput']:.1f} req/s")
+        # Query counts are deterministic, any increase is a regression
+        if data['queries_per_request'] > before['queries_per_request'] + 0.01:
+            regressions.append(f"{name}: queries/request {before['queries_per_request']:.2f} -> {data['queries_per_request']:.2f}")
+        if data['errors'] > before['errors']:
+            regressions.append(f"{name}: errors {before['errors']} -> {data['errors']}")
+    return regressions
@@ -0,0 +1,47 @@
+"""
+Seeding of realistic data volumes for the endpoint benchmarks. Problems
+and submissions go through the real sync code against the fake
+Codeforces, chat messages are bulk inserted.
+"""
+from django.contrib.auth import get_user_model
+from chat.models import Conversation, Message
+from chat.unread import recount_unread, refresh_last_message
+from contests.sync import sync_contests
+from problems.sync import sync_problemset, sync_user_submissions
+
+User = get_user_model()
+
+MESSAGE_BATCH_SIZE = 5000
+
+def seed_problems():
+    return sync_problemset()
+
+def seed_contests():
+    return sync_contests()
+
+def seed_users(count, prefix='bench'):
+    """
+    Users with linked handles and their full submission history synced.
+    """
+    users = []
+    for i in range(count):
+        user = User.objects.create_user(f'{prefix}{i}', password='x', codeforces_handle=f'{prefix}_cf{i}', is_verified=True)
+        sync_user_submissions(user)
+        users.append(user)
+    return users
+
+def seed_conversation(user, other_user, count):
+    """
+    A direct conversation of `count` alternating messages.
+    """
+    conversation = Conversation.get_or_create_direct(user, other_user)
+    senders = (user.id, other_user.id)
+    for offset in range(0, count, MESSAGE_BATCH_SIZE):
+        messages = [
+            Message(conversation=conversation, sender_id=senders[i % 2], text=f'message {i}')
+            for i in range(offset, min(offset + MESSAGE_BATCH_SIZE, count))
+        ]
+        Message.objects.bulk_create(messages)
+    recount_unread(conversation.id)
+    refresh_last_message(conversation.id)
+    return conversation
@@ -0,0 +1,76 @@
+"""
+Websocket connects per second through JwtAuthMiddleware, comparing the
+previous double-decode implementation with the current one.
+
+    python -m benchmarks.ws_auth [--connects N] [--tokens N]
+"""
+import argparse
+import asyncio
+import time
+from . import setup_django
+
+async def run_connects(middleware, tokens, connects):
+    async def receive():
+        return {'type': 'websocket.connect'}
+
+    async def send(message):
+        pass
+
+    started = time.perf_counter()
+    for i in range(connects):
+        token = tokens[i % len(tokens)]
+        await middleware({'type': 'websocket', 'query_string': f'token={token}'.encode()}, receive, send)
+    return connects / (time.perf_counter() - started)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--connects', type=int, default=2000)
+    parser.add_argument('--tokens', type=int, default=50, help='Distinct users reconnecting')
+    args = parser.parse_args()
+
+    teardown = setup_django()
+    try:
+        from channels.db import database_sync_to_async
+        from django.conf import settings
+        from django.contrib.auth import get_user_model
+        from django.contrib.auth.models import AnonymousUser
+        from jwt import decode as jwt_decode
+        from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+        from rest_framework_simplejwt.tokens import AccessToken, UntypedToken
+        from bugsnug import middleware
+
+        User = get_user_model()
+
+        # The implementation before the single-decode rewrite
+        @database_sync_to_async
+        def legacy_get_user(token_key):
+            try:
+                UntypedToken(token_key)
+            except (InvalidToken, TokenError):
+                return AnonymousUser()
+            decoded_data = jwt_decode(token_key, settings.SECRET_KEY, algorithms=["HS256"])
+            return User.objects.get(id=decoded_data["user_id"])
+
+        class LegacyJwtAuthMiddleware(middleware.JwtAuthMiddleware):
+            async def __call__(self, scope, receive, send):
+                scope['user'] = await legacy_get_user(scope['query_string'].decode().split('=', 1)[1])
+                return await self.app(scope, receive, send)
+
+        users = [User.objects.create_user(f'bench{i}', password='x') for i in range(args.tokens)]
+        tokens = [str(AccessToken.for_user(user)) for user in users]
+
+        async def app(scope, receive, send):
+            assert scope['user'].is_authenticated
+
+        legacy = asyncio.run(run_connects(LegacyJwtAuthMiddleware(app), tokens, args.connects))
+        middleware.token_user_cache.clear()
+        current = asyncio.run(run_connects(middleware.JwtAuthMiddleware(app), tokens, args.connects))
+
+        print(f'{args.connects} connects over {args.tokens} users')
+        print(f'  before: {legacy:8.0f} connects/s')
+        print(f'  after:  {current:8.0f} connects/s ({current / legacy:.1f}x)')
+    finally:
+        teardown()
+
+if __name__ == '__main__':
+    main()
@@ -1,24 +1,94 @@
+import threading
+import time
+from collections import OrderedDict
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
 from channels.db import database_sync_to_async
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import AnonymousUser
-from rest_framework_simplejwt.tokens import UntypedToken
+from django.db.models.signals import post_delete, post_save
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
 from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
-from jwt import decode as jwt_decode
-from django.conf import settings
 from urllib.parse import parse_qs
+from utils import metrics
 
 User = get_user_model()
 
+class TokenUserCache:
+    """
+    Bounded LRU of authenticated users keyed by token jti. Entries live
+    for at most `ttl` seconds and never past the token's own expiry, so
+    reconnect storms skip the user lookup without extending a token.
+    """
+    def __init__(self, max_entries=4096, ttl=60):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            user, expires_at = entry
+            if expires_at <= time.time():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return user
+
+    def set(self, key, user, token_exp):
+        with self.lock:
+            self.entries[key] = (user, min(time.time() + self.ttl, token_exp))
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def evict_user(self, user_id):
+        with self.lock:
+            for key in [k for k, (user, _) in self.entries.items() if user.pk == user_id]:
+                del self.entries[key]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+token_user_cache = TokenUserCache()
+
+def evict_cached_user(sender, instance, **kwargs):
+    token_user_cache.evict_user(instance.pk)
+
+# Deleted or changed (e.g. deactivated) users must not stay authenticated
+post_delete.connect(evict_cached_user, sender=User, dispatch_uid='jwt_ws_evict_deleted_user')
+post_save.connect(evict_cached_user, sender=User, dispatch_uid='jwt_ws_evict_saved_user')
+
 @database_sync_to_async
-def get_user(token_key):
+def load_user(user_id):
+    user = User.objects.filter(**{api_settings.USER_ID_FIELD: user_id}).first()
+    if user is None or not user.is_active:
+        return None
+    return user
+
+async def get_user(token_key):
     try:
-        UntypedToken(token_key)
-    except (InvalidToken, TokenError) as e:
+        # Validates signature, expiry and token type in a single decode
+        token = AccessToken(token_key)
+    except (InvalidToken, TokenError):
+        return AnonymousUser()
+
+    user_id = token.get(api_settings.USER_ID_CLAIM)
+    if user_id is None:
         return AnonymousUser()
 
-    decoded_data = jwt_decode(token_key, settings.SECRET_KEY, algorithms=["HS256"])
-    user_id = decoded_data["user_id"]
-    return User.objects.get(id=user_id)
+    cache_key = token.get(api_settings.JTI_CLAIM) or token_key
+    user = token_user_cache.get(cache_key)
+    if user is None:
+        user = await load_user(user_id)
+        if user is None:
+            return AnonymousUser()
+        token_user_cache.set(cache_key, user, token['exp'])
+    return user
 
 class JwtAuthMiddleware:
     def __init__(self, app):
@@ -35,3 +105,49 @@ class JwtAuthMiddleware:
             scope["user"] = AnonymousUser()
 
         return await self.app(scope, receive, send)
+
+class MetricsMiddleware:
+    """
+    Records latency, status and the time spent in database queries and
+    Codeforces calls per route, exposed at /metrics. Goes first in
+    MIDDLEWARE so the whole stack is timed.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+        metrics.install_query_timer()
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats = metrics.RequestStats()
+        token = metrics.current_request.set(stats)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            metrics.current_request.reset(token)
+        self.record(request, response, time.perf_counter() - started, stats)
+        return response
+
+    async def __acall__(self, request):
+        stats = metrics.RequestStats()
+        token = metrics.current_request.set(stats)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            metrics.current_request.reset(token)
+        self.record(request, response, time.perf_counter() - started, stats)
+        return response
+
+    @staticmethod
+    def record(request, response, elapsed, stats):
+        # The URL pattern rather than the path keeps label values bounded
+        match = getattr(request, 'resolver_match', None)
+        route = match.route if match is not None else 'unmatched'
+        metrics.record_request(request.method, route, response.status_code, elapsed, stats)
@@ -54,6 +54,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'bugsnug.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -96,9 +97,22 @@ DATABASES = {
     )
 }
 
+# Shared cache for all workers when Redis is available, per-process otherwise
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+
+# Shared by every worker process on the host through a local SQLite file
 CHANNEL_LAYERS = {
     "default": {
-        "BACKEND": "channels.layers.InMemoryChannelLayer"
+        "BACKEND": "chat.layers.SQLiteChannelLayer",
+        "CONFIG": {
+            "path": os.environ.get('CHANNEL_LAYER_PATH'),
+        },
     }
 }
 # CHANNEL_LAYERS = {
@@ -112,7 +126,38 @@ CHANNEL_LAYERS = {
 
 AUTH_USER_MODEL = 'users.User'
 
+# Codeforces API client, see utils.codeforces.DEFAULT_CONFIG for all keys
+CODEFORCES_API = {
+    'CONNECT_TIMEOUT': float(os.environ.get('CODEFORCES_CONNECT_TIMEOUT', 3.05)),
+    'READ_TIMEOUT': float(os.environ.get('CODEFORCES_READ_TIMEOUT', 20)),
+    'MAX_RETRIES': int(os.environ.get('CODEFORCES_MAX_RETRIES', 3)),
+}
+
+# Response cache for Codeforces API calls, see utils.cache.DEFAULT_CONFIG.
+# BACKEND is one of memory, file or django (the CACHES alias in OPTIONS).
+CODEFORCES_CACHE = {
+    'BACKEND': os.environ.get('CODEFORCES_CACHE_BACKEND', 'django' if os.environ.get('REDIS_URL') else 'memory'),
+    'OPTIONS': {},
+}
+
+# Record/replay of Codeforces responses, see utils.recording.DEFAULT_CONFIG.
+# MODE record saves every response under PATH (run the sync commands to
+# capture a dataset), replay serves them from there without network access,
+# adding LATENCY/JITTER seconds and failing ERROR_RATE of the calls.
+CODEFORCES_TRANSPORT = {
+    'MODE': os.environ.get('CODEFORCES_TRANSPORT', 'live'),
+    'PATH': os.environ.get('CODEFORCES_RECORDINGS', str(BASE_DIR / 'recordings')),
+    'LATENCY': float(os.environ.get('CODEFORCES_REPLAY_LATENCY', 0)),
+    'JITTER': float(os.environ.get('CODEFORCES_REPLAY_JITTER', 0)),
+    'ERROR_RATE': float(os.environ.get('CODEFORCES_REPLAY_ERROR_RATE', 0)),
+}
+
+# Bearer token required by /metrics, which is only served in DEBUG when unset
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
 CORS_ALLOW_ALL_ORIGINS = True
+# Paginated list endpoints put their cursors in the Link header
+CORS_EXPOSE_HEADERS = ['Link']
 # CORS_ALLOWED_ORIGINS = [
 #     "http://localhost:5173",
 #     "http://127.0.0.1:5173",
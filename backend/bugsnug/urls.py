@@ -1,12 +1,30 @@
+import hmac
+from django.conf import settings
 from django.contrib import admin
 from django.urls import path, include
-from django.http import JsonResponse
+from django.http import Http404, HttpResponse, JsonResponse
+from utils.metrics import registry
 
 def api_root(request):
     return JsonResponse({"message": "Bugsnug API is running", "status": "OK"})
 
+def metrics(request):
+    """
+    Prometheus scrape target for this worker process. METRICS_TOKEN must
+    be sent as a bearer token; without one configured the endpoint only
+    exists in DEBUG.
+    """
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    if not token:
+        if not settings.DEBUG:
+            raise Http404
+    elif not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponse(status=401)
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 urlpatterns = [
     path('', api_root),
+    path('metrics', metrics),
     path('admin/', admin.site.urls),
     path('api/users/', include('users.urls')),
     path('api/contests/', include('contests.urls')),
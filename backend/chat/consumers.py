@@ -1,16 +1,35 @@
 import json
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
-from .models import Message, Conversation
+from .models import Conversation
+from .unread import mark_read, parse_message_id, post_message
 from django.contrib.auth import get_user_model
+from utils import metrics
 
 User = get_user_model()
 
 class ChatConsumer(AsyncWebsocketConsumer):
     async def connect(self):
         self.room_name = self.scope['url_route']['kwargs']['room_name']
-        self.room_group_name = f'chat_{self.room_name}'
+        self.room_group_name = None
 
+        # Resolve the sender and conversation once, messages reuse them
+        self.user = self.scope.get('user')
+        self.accepted = False
+        if self.user is None or not self.user.is_authenticated:
+            metrics.WEBSOCKET_CONNECTS.inc('rejected')
+            await self.close()
+            return
+
+        self.conversation_id = await self.get_conversation_id()
+        if self.conversation_id is None:
+            metrics.WEBSOCKET_CONNECTS.inc('rejected')
+            await self.close()
+            return
+
+        # Room names join usernames with '_', which usernames may contain
+        # too, so only the conversation identifies the room
+        self.room_group_name = f'chat_{self.conversation_id}'
         # Join room group
         await self.channel_layer.group_add(
             self.room_group_name,
@@ -18,33 +37,63 @@ class ChatConsumer(AsyncWebsocketConsumer):
         )
 
         await self.accept()
+        self.accepted = True
+        metrics.WEBSOCKET_CONNECTS.inc('accepted')
+        metrics.WEBSOCKET_OPEN.inc()
 
     async def disconnect(self, close_code):
+        if getattr(self, 'accepted', False):
+            metrics.WEBSOCKET_DISCONNECTS.inc()
+            metrics.WEBSOCKET_OPEN.dec()
         # Leave room group
-        await self.channel_layer.group_discard(
-            self.room_group_name,
-            self.channel_name
-        )
+        if self.room_group_name is not None:
+            await self.channel_layer.group_discard(
+                self.room_group_name,
+                self.channel_name
+            )
 
     # Receive message from WebSocket
     async def receive(self, text_data):
+        metrics.WEBSOCKET_MESSAGES.inc('received')
         text_data_json = json.loads(text_data)
+        if text_data_json.get('type') == 'read':
+            await self.receive_read(text_data_json)
+            return
+
         message = text_data_json['message']
-        sender_username = text_data_json.get('sender', 'Anonymous')
+        sender_username = self.user.username
         
         # Save message to database
-        await self.save_message(sender_username, message)
+        message_id = await self.save_message(message)
 
         # Send message to room group
         await self.channel_layer.group_send(
             self.room_group_name,
             {
                 'type': 'chat_message',
+                'id': message_id,
                 'message': message,
                 'sender': sender_username
             }
         )
 
+    async def receive_read(self, data):
+        # {"type": "read", "message_id": N} marks the conversation read up to N
+        try:
+            message_id = parse_message_id(data.get('message_id'))
+        except ValueError:
+            return
+        if await self.save_read(message_id):
+            # Lets the other side show a read receipt
+            await self.channel_layer.group_send(
+                self.room_group_name,
+                {
+                    'type': 'chat_read',
+                    'reader': self.user.username,
+                    'message_id': message_id,
+                }
+            )
+
     # Receive message from room group
     async def chat_message(self, event):
         message = event['message']
@@ -52,26 +101,47 @@ class ChatConsumer(AsyncWebsocketConsumer):
 
         # Send message to WebSocket
         await self.send(text_data=json.dumps({
+            'id': event.get('id'),
             'message': message,
             'sender': sender
         }))
+        metrics.WEBSOCKET_MESSAGES.inc('sent')
+
+    async def chat_read(self, event):
+        await self.send(text_data=json.dumps({
+            'type': 'read',
+            'reader': event['reader'],
+            'message_id': event['message_id'],
+        }))
+        metrics.WEBSOCKET_MESSAGES.inc('sent')
+
+    def get_peer_username(self):
+        # Room names are "<user1>_<user2>", usernames may contain "_" too
+        username = self.user.username
+        if self.room_name.startswith(f'{username}_'):
+            return self.room_name[len(username) + 1:]
+        if self.room_name.endswith(f'_{username}'):
+            return self.room_name[:-len(username) - 1]
+        return None
+
+    @database_sync_to_async
+    def get_conversation_id(self):
+        peer_username = self.get_peer_username()
+        if peer_username is None:
+            return None
+        try:
+            peer = User.objects.get(username=peer_username)
+        except User.DoesNotExist:
+            return None
+        return Conversation.get_or_create_direct(self.user, peer).id
 
     @database_sync_to_async
-    def save_message(self, username, message):
-        user = User.objects.get(username=username)
-        # Extract participants from room name (user1_user2)
+    def save_message(self, message):
         try:
-            participants = self.room_name.split('_')
-            other_username = participants[1] if participants[0] == username else participants[0]
-            other_user = User.objects.get(username=other_username)
-            
-            # Find or create conversation
-            conversation = Conversation.objects.filter(participants=user).filter(participants=other_user).first()
-            if not conversation:
-                conversation = Conversation.objects.create()
-                conversation.participants.add(user, other_user)
-                conversation.save()
-            
-            Message.objects.create(conversation=conversation, sender=user, text=message)
+            return post_message(self.conversation_id, self.user.id, message).id
         except Exception as e:
             print(f"Error saving message: {e}")
+
+    @database_sync_to_async
+    def save_read(self, message_id):
+        return mark_read(self.conversation_id, self.user.id, message_id)
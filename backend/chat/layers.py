@@ -0,0 +1,264 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from channels.exceptions import ChannelFull
+from channels.layers import BaseChannelLayer
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS channel_messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    channel TEXT NOT NULL,
+    expires REAL NOT NULL,
+    body TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS channel_messages_channel ON channel_messages (channel, id);
+CREATE TABLE IF NOT EXISTS channel_groups (
+    grp TEXT NOT NULL,
+    channel TEXT NOT NULL,
+    expires REAL NOT NULL,
+    PRIMARY KEY (grp, channel)
+);
+CREATE INDEX IF NOT EXISTS channel_groups_channel ON channel_groups (channel);
+"""
+
+# SQLite caps the number of bound parameters per statement
+MAX_PARAMS = 500
+# Longest pause between polls after repeated failures, in seconds
+MAX_POLL_BACKOFF = 5
+
+logger = logging.getLogger(__name__)
+
+def chunked(items, size=MAX_PARAMS):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+class SQLiteChannelLayer(BaseChannelLayer):
+    """
+    Channel layer shared by every process on the host through one SQLite
+    file in WAL mode, so daphne/uvicorn workers can be scaled out without
+    Redis. Messages must be JSON serializable.
+
+    All SQLite work runs on a single executor thread per process. Process
+    local channels ("...!xyz") are served by one poller task that fetches
+    messages for every waiting consumer in a single query.
+    """
+
+    extensions = ["groups", "flush"]
+
+    def __init__(
+        self,
+        path=None,
+        expiry=60,
+        group_expiry=86400,
+        capacity=100,
+        channel_capacity=None,
+        poll_interval=0.05,
+        cleanup_interval=10,
+        **kwargs,
+    ):
+        super().__init__(expiry=expiry, capacity=capacity, **kwargs)
+        self.channel_capacity = self.compile_capacities(channel_capacity or {})
+        self.path = path or os.path.join(tempfile.gettempdir(), 'bugsnug-channels.sqlite3')
+        self.group_expiry = group_expiry
+        self.poll_interval = poll_interval
+        self.cleanup_interval = cleanup_interval
+        self.client_prefix = uuid.uuid4().hex[:12]
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='sqlite-channel-layer')
+        self.conn = None
+        self.last_cleanup = 0
+        # Process-local receive state, channel -> queue / number of waiters
+        self.receive_buffers = {}
+        self.waiting = {}
+        self.poller = None
+
+    # SQLite helpers, only ever called on the executor thread
+
+    def _connection(self):
+        if self.conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self.conn = conn
+        return self.conn
+
+    def _transaction(self, fn, *args):
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = fn(conn, *args)
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return result
+
+    async def _run(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self._transaction, fn, *args)
+
+    def _cleanup(self, conn, now):
+        if now - self.last_cleanup < self.cleanup_interval:
+            return
+        self.last_cleanup = now
+        # A channel that let a message expire is gone, drop it from its groups
+        conn.execute(
+            "DELETE FROM channel_groups WHERE expires < ? OR channel IN "
+            "(SELECT DISTINCT channel FROM channel_messages WHERE expires < ?)",
+            (now, now),
+        )
+        conn.execute("DELETE FROM channel_messages WHERE expires < ?", (now,))
+
+    def _insert(self, conn, channels, body, raise_full):
+        now = time.time()
+        self._cleanup(conn, now)
+        queued = {}
+        for chunk in chunked(channels):
+            placeholders = ",".join("?" * len(chunk))
+            queued.update(conn.execute(
+                f"SELECT channel, COUNT(*) FROM channel_messages "
+                f"WHERE channel IN ({placeholders}) AND expires >= ? GROUP BY channel",
+                (*chunk, now),
+            ).fetchall())
+
+        rows = []
+        for channel in channels:
+            if queued.get(channel, 0) >= self.get_capacity(channel):
+                if raise_full:
+                    raise ChannelFull(channel)
+                continue
+            rows.append((channel, now + self.expiry, body))
+        conn.executemany("INSERT INTO channel_messages (channel, expires, body) VALUES (?, ?, ?)", rows)
+
+    def _pop(self, conn, channels):
+        """
+        Remove and return the oldest live message of each given channel.
+        """
+        now = time.time()
+        found = {}
+        for chunk in chunked(channels):
+            placeholders = ",".join("?" * len(chunk))
+            for message_id, channel, body in conn.execute(
+                f"SELECT id, channel, body FROM channel_messages "
+                f"WHERE channel IN ({placeholders}) AND expires >= ? ORDER BY id",
+                (*chunk, now),
+            ):
+                found.setdefault(channel, (message_id, body))
+        for chunk in chunked([message_id for message_id, _ in found.values()]):
+            conn.execute(f"DELETE FROM channel_messages WHERE id IN ({','.join('?' * len(chunk))})", chunk)
+        return [(channel, json.loads(body)) for channel, (_, body) in found.items()]
+
+    # Channel layer API
+
+    async def send(self, channel, message):
+        assert isinstance(message, dict), "message is not a dict"
+        assert self.valid_channel_name(channel), "Channel name not valid"
+        assert "__asgi_channel__" not in message
+        await self._run(self._insert, [channel], json.dumps(message), True)
+
+    async def receive(self, channel):
+        assert self.valid_channel_name(channel)
+        if "!" not in channel:
+            while True:
+                messages = await self._run(self._pop, [channel])
+                if messages:
+                    return messages[0][1]
+                await asyncio.sleep(self.poll_interval)
+
+        queue = self.receive_buffers.setdefault(channel, asyncio.Queue())
+        self.waiting[channel] = self.waiting.get(channel, 0) + 1
+        self._ensure_poller()
+        try:
+            return await queue.get()
+        finally:
+            self.waiting[channel] -= 1
+            if not self.waiting[channel]:
+                del self.waiting[channel]
+                if queue.empty():
+                    self.receive_buffers.pop(channel, None)
+
+    def _ensure_poller(self):
+        loop = asyncio.get_running_loop()
+        if self.poller is None or self.poller.done() or self.poller.get_loop() is not loop:
+            self.poller = loop.create_task(self._poll())
+
+    async def _poll(self):
+        failures = 0
+        while self.waiting:
+            # Only fetch for channels with an idle waiter, so buffers never
+            # hold messages nobody is going to read
+            channels = [
+                channel for channel, count in self.waiting.items()
+                if self.receive_buffers[channel].qsize() < count
+            ]
+            try:
+                delivered = await self._run(self._pop, channels) if channels else []
+            except Exception:
+                # Every receiver of the process depends on this task, so it
+                # must outlive e.g. "database is locked"
+                failures += 1
+                logger.exception("Channel layer poll failed (%d in a row)", failures)
+                await asyncio.sleep(min(self.poll_interval * 2 ** failures, MAX_POLL_BACKOFF))
+                continue
+            failures = 0
+            for channel, message in delivered:
+                self.receive_buffers.setdefault(channel, asyncio.Queue()).put_nowait(message)
+            if not delivered:
+                await asyncio.sleep(self.poll_interval)
+
+    async def new_channel(self, prefix="specific."):
+        return f"{prefix}.{self.client_prefix}!{uuid.uuid4().hex[:12]}"
+
+    # Flush extension
+
+    async def flush(self):
+        def flush(conn):
+            conn.execute("DELETE FROM channel_messages")
+            conn.execute("DELETE FROM channel_groups")
+        await self._run(flush)
+
+    async def close(self):
+        if self.poller is not None:
+            self.poller.cancel()
+            self.poller = None
+
+    # Groups extension
+
+    async def group_add(self, group, channel):
+        assert self.valid_group_name(group), "Group name not valid"
+        assert self.valid_channel_name(channel), "Channel name not valid"
+
+        def add(conn):
+            conn.execute(
+                "INSERT OR REPLACE INTO channel_groups (grp, channel, expires) VALUES (?, ?, ?)",
+                (group, channel, time.time() + self.group_expiry),
+            )
+        await self._run(add)
+
+    async def group_discard(self, group, channel):
+        assert self.valid_channel_name(channel), "Invalid channel name"
+        assert self.valid_group_name(group), "Invalid group name"
+
+        def discard(conn):
+            conn.execute("DELETE FROM channel_groups WHERE grp = ? AND channel = ?", (group, channel))
+        await self._run(discard)
+
+    async def group_send(self, group, message):
+        assert isinstance(message, dict), "Message is not a dict"
+        assert self.valid_group_name(group), "Invalid group name"
+        body = json.dumps(message)
+
+        def send(conn):
+            channels = [row[0] for row in conn.execute(
+                "SELECT channel FROM channel_groups WHERE grp = ? AND expires >= ?",
+                (group, time.time()),
+            )]
+            # Full channels are skipped, like the other layers do
+            self._insert(conn, channels, body, False)
+        await self._run(send)
@@ -0,0 +1,43 @@
+# Generated by Django 6.0.2 on 2026-10-18 14:58
+
+from django.db import migrations, models
+
+
+def backfill_participant_keys(apps, schema_editor):
+    Conversation = apps.get_model('chat', 'Conversation')
+    Message = apps.get_model('chat', 'Message')
+
+    keyed = {}
+    for conversation in Conversation.objects.order_by('id').prefetch_related('participants'):
+        user_ids = sorted(user.id for user in conversation.participants.all())
+        if len(user_ids) == 1:
+            user_ids *= 2
+        if len(user_ids) != 2:
+            continue
+
+        key = f"{user_ids[0]}:{user_ids[1]}"
+        if key in keyed:
+            # Fold duplicate conversations of the same pair into the oldest
+            Message.objects.filter(conversation=conversation).update(conversation_id=keyed[key])
+            conversation.delete()
+            continue
+
+        keyed[key] = conversation.id
+        conversation.participant_key = key
+        conversation.save(update_fields=['participant_key'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='participant_key',
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+        migrations.RunPython(backfill_participant_keys, migrations.RunPython.noop),
+    ]
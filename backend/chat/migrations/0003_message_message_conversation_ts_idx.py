@@ -0,0 +1,19 @@
+# Generated by Django 6.0.2 on 2026-10-18 14:57
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0002_conversation_participant_key'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['conversation', 'timestamp', 'id'], name='message_conversation_ts_idx'),
+        ),
+    ]
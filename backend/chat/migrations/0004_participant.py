@@ -0,0 +1,73 @@
+# Generated by Django 6.0.2 on 2026-10-18 15:29
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def mark_existing_read(apps, schema_editor):
+    # Nothing tracked reads so far, start everyone at the latest message
+    # instead of lighting up whole histories as unread
+    Message = apps.get_model('chat', 'Message')
+    Participant = apps.get_model('chat', 'Participant')
+    latest = (
+        Message.objects.filter(conversation_id=OuterRef('conversation_id'))
+        .values('conversation_id')
+        .annotate(latest=Max('id'))
+        .values('latest')
+    )
+    Participant.objects.update(last_read_message_id=Coalesce(Subquery(latest), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0003_message_message_conversation_ts_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # The table of the implicit many-to-many becomes the through model
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='Participant',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('conversation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='chat.conversation')),
+                        ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+                    ],
+                    options={
+                        'db_table': 'chat_conversation_participants',
+                        'unique_together': {('conversation', 'user')},
+                    },
+                ),
+                migrations.AlterField(
+                    model_name='conversation',
+                    name='participants',
+                    field=models.ManyToManyField(related_name='conversations', through='chat.Participant', to=settings.AUTH_USER_MODEL),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name='participant',
+            name='unread_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='participant',
+            name='last_read_message_id',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='participant',
+            index=models.Index(fields=['user', 'unread_count'], name='participant_user_unread_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['conversation', 'id'], name='message_conversation_id_idx'),
+        ),
+        migrations.RunPython(mark_existing_read, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,81 @@
+# Generated by Django 6.0.2 on 2026-10-18 15:33
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+from django.db.models.functions import Coalesce, Left
+
+
+def fill_inbox_columns(apps, schema_editor):
+    Conversation = apps.get_model('chat', 'Conversation')
+    Message = apps.get_model('chat', 'Message')
+    Participant = apps.get_model('chat', 'Participant')
+    latest = Message.objects.filter(conversation_id=OuterRef('id')).order_by('-id')
+    Conversation.objects.update(
+        last_message_id=Subquery(latest.values('id')[:1]),
+        last_message_sender_id=Subquery(latest.values('sender_id')[:1]),
+        last_message_text=Coalesce(Subquery(latest.annotate(snippet=Left('text', 120)).values('snippet')[:1]), models.Value('')),
+        last_message_at=Subquery(latest.values('timestamp')[:1]),
+    )
+    # Self-conversations have no other member and point at the user
+    others = Participant.objects.filter(conversation_id=OuterRef('conversation_id')).exclude(user_id=OuterRef('user_id'))
+    Participant.objects.update(
+        peer_id=Coalesce(Subquery(others.values('user_id')[:1]), 'user_id'),
+        last_activity_at=Coalesce(
+            Subquery(Conversation.objects.filter(id=OuterRef('conversation_id')).values('last_message_at')[:1]),
+            Subquery(Conversation.objects.filter(id=OuterRef('conversation_id')).values('created_at')[:1]),
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0004_participant'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='last_message_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='last_message_id',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='last_message_sender',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='last_message_text',
+            field=models.CharField(blank=True, max_length=120),
+        ),
+        migrations.AddField(
+            model_name='participant',
+            name='last_activity_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='participant',
+            name='peer',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='conversation',
+            name='participants',
+            field=models.ManyToManyField(related_name='conversations', through='chat.Participant', through_fields=('conversation', 'user'), to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='participant',
+            index=models.Index(fields=['user', '-last_activity_at', '-id'], name='participant_user_activity_idx'),
+        ),
+        migrations.RunPython(fill_inbox_columns, migrations.RunPython.noop),
+    ]
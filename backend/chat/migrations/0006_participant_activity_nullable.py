@@ -0,0 +1,26 @@
+# Generated by Django 6.0.2 on 2026-10-18 15:41
+
+from django.db import migrations, models
+
+
+def clear_empty_activity(apps, schema_editor):
+    # Conversations without messages were dated by creation, keep them
+    # out of the inbox until something is sent
+    Participant = apps.get_model('chat', 'Participant')
+    Participant.objects.filter(conversation__last_message_id__isnull=True).update(last_activity_at=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0005_conversation_inbox'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='participant',
+            name='last_activity_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(clear_empty_activity, migrations.RunPython.noop),
+    ]
@@ -1,14 +1,69 @@
 from django.db import models
 from django.conf import settings
 
+# Characters of the last message kept on the conversation for previews
+SNIPPET_LENGTH = 120
+
 class Conversation(models.Model):
-    participants = models.ManyToManyField(settings.AUTH_USER_MODEL, related_name='conversations')
+    participants = models.ManyToManyField(settings.AUTH_USER_MODEL, through='Participant', through_fields=('conversation', 'user'), related_name='conversations')
+    # "<low user id>:<high user id>" for direct messages, one row per pair
+    participant_key = models.CharField(max_length=64, unique=True, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Copy of the latest message for inbox previews, see chat.unread.post_message
+    last_message_id = models.BigIntegerField(null=True, blank=True)
+    last_message_sender = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    last_message_text = models.CharField(max_length=SNIPPET_LENGTH, blank=True)
+    last_message_at = models.DateTimeField(null=True, blank=True)
 
     def __str__(self):
         return f"Conversation {self.id}"
 
+    @staticmethod
+    def direct_key(user_id, other_user_id):
+        low, high = sorted((user_id, other_user_id))
+        return f"{low}:{high}"
+
+    @classmethod
+    def get_or_create_direct(cls, user, other_user):
+        conversation, created = cls.objects.get_or_create(participant_key=cls.direct_key(user.id, other_user.id))
+        if created:
+            members = [Participant(conversation=conversation, user=user, peer=other_user)]
+            if other_user.id != user.id:
+                members.append(Participant(conversation=conversation, user=other_user, peer=user))
+            Participant.objects.bulk_create(members, ignore_conflicts=True)
+        return conversation
+
+class Participant(models.Model):
+    """
+    A user's membership of a conversation and their read state. unread_count
+    is kept in step with message inserts, see chat.unread.
+    """
+    conversation = models.ForeignKey(Conversation, on_delete=models.CASCADE)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    unread_count = models.PositiveIntegerField(default=0)
+    # Messages up to this id have been read
+    last_read_message_id = models.BigIntegerField(default=0)
+    # The other side of a direct conversation, so the inbox needs no second lookup
+    peer = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    # Time of the latest message, the inbox sort key. Null until the first
+    # message so opening a chat window doesn't put it in the peer's inbox
+    last_activity_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        # The table the plain many-to-many used to create
+        db_table = 'chat_conversation_participants'
+        unique_together = ('conversation', 'user')
+        indexes = [
+            # Unread totals only visit the user's conversations with unread messages
+            models.Index(fields=['user', 'unread_count'], name='participant_user_unread_idx'),
+            # Inbox pages are keyset-paginated on (last_activity_at, id)
+            models.Index(fields=['user', '-last_activity_at', '-id'], name='participant_user_activity_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user} in {self.conversation}"
+
 class Message(models.Model):
     conversation = models.ForeignKey(Conversation, on_delete=models.CASCADE, related_name='messages')
     sender = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='sent_messages')
@@ -18,6 +73,12 @@ class Message(models.Model):
 
     class Meta:
         ordering = ['timestamp']
+        # History pages are keyset-paginated on (timestamp, id)
+        indexes = [
+            models.Index(fields=['conversation', 'timestamp', 'id'], name='message_conversation_ts_idx'),
+            # Unread ranges are counted by id
+            models.Index(fields=['conversation', 'id'], name='message_conversation_id_idx'),
+        ]
 
     def __str__(self):
         return f"Message {self.id} from {self.sender}"
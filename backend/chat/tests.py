@@ -0,0 +1,325 @@
+import asyncio
+import multiprocessing
+import os
+import sqlite3
+import tempfile
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest import mock
+import django
+
+# Chat workers spawned below import this module in a fresh interpreter
+django.setup()
+
+from asgiref.sync import async_to_sync
+from channels.exceptions import ChannelFull
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from .layers import SQLiteChannelLayer
+from .models import SNIPPET_LENGTH, Conversation, Message, Participant
+from .unread import mark_read, post_message, recount_unread, unread_total
+
+User = get_user_model()
+
+ROOM = 'alice_bob'
+
+def run_chat_worker(layer_path, username, user_id, ready, go, results):
+    """
+    Runs one ChatConsumer in its own process, the way a separate daphne
+    worker would, sharing only the SQLite layer file with the others.
+    """
+    from channels.layers import channel_layers
+    from channels.routing import URLRouter
+    from channels.testing import WebsocketCommunicator
+    from chat.consumers import ChatConsumer
+    from chat.routing import websocket_urlpatterns
+
+    channel_layers.set('default', SQLiteChannelLayer(path=layer_path, poll_interval=0.01))
+    user = SimpleNamespace(id=user_id, username=username, is_authenticated=True)
+
+    async def chat():
+        communicator = WebsocketCommunicator(URLRouter(websocket_urlpatterns), f'/ws/chat/{ROOM}/')
+        communicator.scope['user'] = user
+        connected, _ = await communicator.connect()
+        ready.set()
+        await asyncio.get_running_loop().run_in_executor(None, go.wait, 10)
+        if username == 'bob':
+            await communicator.send_json_to({'message': 'hi from bob'})
+        results.put((username, connected, await communicator.receive_json_from(timeout=10)))
+        await communicator.disconnect()
+
+    with mock.patch.object(ChatConsumer, 'get_conversation_id', return_value=1), \
+            mock.patch.object(ChatConsumer, 'save_message', return_value=7):
+        asyncio.run(chat())
+
+class SQLiteChannelLayerTests(SimpleTestCase):
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(handle)
+        self.addCleanup(os.remove, self.path)
+
+    def test_group_messages_reach_consumers_in_other_processes(self):
+        context = multiprocessing.get_context('spawn')
+        go = context.Event()
+        results = context.Queue()
+        workers = []
+        for user_id, username in enumerate(['alice', 'bob'], start=1):
+            ready = context.Event()
+            process = context.Process(
+                target=run_chat_worker,
+                args=(self.path, username, user_id, ready, go, results),
+            )
+            process.start()
+            workers.append((process, ready))
+
+        for _, ready in workers:
+            self.assertTrue(ready.wait(30))
+        go.set()
+        received = sorted(results.get(timeout=30) for _ in workers)
+        for process, _ in workers:
+            process.join(10)
+
+        self.assertEqual(received, [
+            ('alice', True, {'id': 7, 'message': 'hi from bob', 'sender': 'bob'}),
+            ('bob', True, {'id': 7, 'message': 'hi from bob', 'sender': 'bob'}),
+        ])
+
+    def test_send_respects_capacity(self):
+        layer = SQLiteChannelLayer(path=self.path, capacity=2)
+        async_to_sync(layer.send)('worker', {'type': 'a'})
+        async_to_sync(layer.send)('worker', {'type': 'b'})
+        with self.assertRaises(ChannelFull):
+            async_to_sync(layer.send)('worker', {'type': 'c'})
+        self.assertEqual(async_to_sync(layer.receive)('worker'), {'type': 'a'})
+
+    def test_expired_messages_are_dropped(self):
+        layer = SQLiteChannelLayer(path=self.path, expiry=-1)
+        async_to_sync(layer.send)('worker', {'type': 'stale'})
+        layer.expiry = 60
+        async_to_sync(layer.send)('worker', {'type': 'fresh'})
+        self.assertEqual(async_to_sync(layer.receive)('worker'), {'type': 'fresh'})
+
+    def test_poller_survives_database_errors(self):
+        layer = SQLiteChannelLayer(path=self.path, poll_interval=0.01)
+        pop = layer._pop
+        failures = [sqlite3.OperationalError('database is locked')]
+
+        def flaky_pop(conn, channels):
+            if failures:
+                raise failures.pop()
+            return pop(conn, channels)
+
+        async def scenario():
+            channel = await layer.new_channel()
+            with mock.patch.object(layer, '_pop', flaky_pop), self.assertLogs('chat.layers', 'ERROR'):
+                receiving = asyncio.ensure_future(layer.receive(channel))
+                await layer.send(channel, {'type': 'after_error'})
+                message = await asyncio.wait_for(receiving, 5)
+            self.assertFalse(failures)
+            await layer.close()
+            return message
+
+        self.assertEqual(async_to_sync(scenario)(), {'type': 'after_error'})
+
+    def test_group_send_skips_discarded_channels(self):
+        layer = SQLiteChannelLayer(path=self.path)
+
+        async def scenario():
+            first = await layer.new_channel()
+            second = await layer.new_channel()
+            await layer.group_add('room', first)
+            await layer.group_add('room', second)
+            await layer.group_discard('room', second)
+            await layer.group_send('room', {'type': 'chat_message'})
+            message = await asyncio.wait_for(layer.receive(first), 5)
+            with self.assertRaises(asyncio.TimeoutError):
+                await asyncio.wait_for(layer.receive(second), 0.3)
+            await layer.close()
+            return message
+
+        self.assertEqual(async_to_sync(scenario)(), {'type': 'chat_message'})
+
+    def test_rooms_with_the_same_name_stay_apart(self):
+        from channels.layers import channel_layers
+        from channels.routing import URLRouter
+        from channels.testing import WebsocketCommunicator
+        from chat.consumers import ChatConsumer
+        from chat.routing import websocket_urlpatterns
+
+        previous = channel_layers.set('default', SQLiteChannelLayer(path=self.path, poll_interval=0.01))
+        self.addCleanup(channel_layers.set, 'default', previous)
+
+        async def scenario():
+            # 'a_b' chatting with 'c' and 'a' with 'b_c' both open room 'a_b_c'
+            communicators = []
+            for user_id, username in ((1, 'a_b'), (2, 'a')):
+                communicator = WebsocketCommunicator(URLRouter(websocket_urlpatterns), '/ws/chat/a_b_c/')
+                communicator.scope['user'] = SimpleNamespace(id=user_id, username=username, is_authenticated=True)
+                connected, _ = await communicator.connect()
+                self.assertTrue(connected)
+                communicators.append(communicator)
+            first, second = communicators
+            await first.send_json_to({'message': 'hi c'})
+            received = await first.receive_json_from(timeout=5)
+            self.assertTrue(await second.receive_nothing(0.3))
+            for communicator in communicators:
+                await communicator.disconnect()
+            return received
+
+        with mock.patch.object(ChatConsumer, 'get_conversation_id', side_effect=[1, 2]), \
+                mock.patch.object(ChatConsumer, 'save_message', return_value=7):
+            self.assertEqual(async_to_sync(scenario)(), {'id': 7, 'message': 'hi c', 'sender': 'a_b'})
+
+class UnreadCounterTests(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user('alice', password='x')
+        self.bob = User.objects.create_user('bob', password='x')
+        self.conversation = Conversation.get_or_create_direct(self.alice, self.bob)
+
+    def unread(self, user):
+        return Participant.objects.get(conversation=self.conversation, user=user).unread_count
+
+    def post(self, sender, count=1):
+        return [post_message(self.conversation.id, sender.id, f'message {i}') for i in range(count)]
+
+    def test_messages_count_for_the_recipient_only(self):
+        self.post(self.alice, 3)
+        self.post(self.bob)
+        self.assertEqual(self.unread(self.bob), 3)
+        self.assertEqual(self.unread(self.alice), 1)
+
+    def test_self_chat_counts_nothing(self):
+        conversation = Conversation.get_or_create_direct(self.alice, self.alice)
+        post_message(conversation.id, self.alice.id, 'note to self')
+        self.assertEqual(Participant.objects.get(conversation=conversation).unread_count, 0)
+
+    def test_mark_read_counts_only_the_newly_read_range(self):
+        messages = self.post(self.alice, 5)
+        self.post(self.bob)
+
+        self.assertTrue(mark_read(self.conversation.id, self.bob.id, messages[1].id))
+        self.assertEqual(self.unread(self.bob), 3)
+        self.assertTrue(mark_read(self.conversation.id, self.bob.id, messages[4].id))
+        self.assertEqual(self.unread(self.bob), 0)
+        self.assertEqual(Participant.objects.get(conversation=self.conversation, user=self.bob).last_read_message_id, messages[4].id)
+
+    def test_mark_read_no_ops(self):
+        messages = self.post(self.alice, 3)
+        mark_read(self.conversation.id, self.bob.id, messages[1].id)
+        other = Conversation.get_or_create_direct(self.alice, User.objects.create_user('carol', password='x'))
+        elsewhere = post_message(other.id, self.alice.id, 'hi carol')
+
+        # Backwards, another conversation's message and an id not sent yet
+        for message_id in (messages[0].id, elsewhere.id, messages[2].id + 100):
+            self.assertFalse(mark_read(self.conversation.id, self.bob.id, message_id))
+        participant = Participant.objects.get(conversation=self.conversation, user=self.bob)
+        self.assertEqual((participant.unread_count, participant.last_read_message_id), (1, messages[1].id))
+
+    def test_unread_total_and_recount(self):
+        self.post(self.alice, 2)
+        other = Conversation.get_or_create_direct(self.bob, User.objects.create_user('carol', password='x'))
+        Message.objects.bulk_create([Message(conversation=other, sender=other.participants.exclude(id=self.bob.id).get(), text='bulk') for _ in range(4)])
+        self.assertEqual(unread_total(self.bob.id), 2)
+
+        recount_unread(other.id)
+        self.assertEqual(unread_total(self.bob.id), 6)
+
+    def test_last_message_is_copied_to_the_conversation(self):
+        self.post(self.alice)
+        last = post_message(self.conversation.id, self.bob.id, 'x' * (SNIPPET_LENGTH + 10))
+        self.conversation.refresh_from_db()
+        self.assertEqual(self.conversation.last_message_id, last.id)
+        self.assertEqual(self.conversation.last_message_sender_id, self.bob.id)
+        self.assertEqual(self.conversation.last_message_text, 'x' * SNIPPET_LENGTH)
+        self.assertEqual(self.conversation.last_message_at, last.timestamp)
+
+class InboxTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('me', password='x')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.start = timezone.now()
+
+    def chat(self, peer, sender, minutes):
+        # Distinct, increasing timestamps so the expected order is unambiguous
+        conversation = Conversation.get_or_create_direct(self.user, peer)
+        with mock.patch('django.utils.timezone.now', return_value=self.start + timedelta(minutes=minutes)):
+            return post_message(conversation.id, sender.id, f'{sender.username} at {minutes}')
+
+    def test_pages_are_ordered_by_last_activity(self):
+        peers = [User.objects.create_user(f'peer{i}', password='x') for i in range(5)]
+        for minutes, peer in enumerate(peers):
+            self.chat(peer, peer, minutes)
+        # Replying moves the oldest conversation to the top
+        self.chat(peers[0], self.user, 10)
+        # Conversations without messages are left out
+        Conversation.get_or_create_direct(self.user, User.objects.create_user('lurker', password='x'))
+
+        response = self.client.get('/api/chat/inbox/', {'limit': 2})
+        pages = [response.json()]
+        while 'rel="next"' in response.get('Link', ''):
+            url = response['Link'].split('<')[1].split('>')[0]
+            self.assertIn('before=', url)
+            response = self.client.get(url)
+            pages.append(response.json())
+
+        self.assertEqual([[entry['username'] for entry in page] for page in pages], [
+            ['peer0', 'peer4'], ['peer3', 'peer2'], ['peer1'],
+        ])
+        first = pages[0][0]
+        self.assertEqual(first['last_message']['sender'], 'me')
+        self.assertEqual(first['last_message']['message'], 'me at 10')
+        # peer0's message stays unread after replying without reading it
+        self.assertEqual([entry['unread'] for entry in pages[0]], [1, 1])
+
+    def test_single_query(self):
+        for minutes in range(3):
+            self.chat(User.objects.create_user(f'peer{minutes}', password='x'), self.user, minutes)
+        with self.assertNumQueries(1):
+            self.assertEqual(len(self.client.get('/api/chat/inbox/').json()), 3)
+
+    def test_malformed_cursor(self):
+        self.assertEqual(self.client.get('/api/chat/inbox/', {'before': 'MQ'}).status_code, 400)
+
+class InboxMigrationTests(TransactionTestCase):
+    before = [('chat', '0003_message_message_conversation_ts_idx')]
+    after = [('chat', '0006_participant_activity_nullable')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+    def test_backfill(self):
+        apps = self.migrate(self.before)
+        OldUser = apps.get_model('users', 'User')
+        OldConversation = apps.get_model('chat', 'Conversation')
+        OldMessage = apps.get_model('chat', 'Message')
+        alice, bob, carol = (OldUser.objects.create(username=name) for name in ('alice', 'bob', 'carol'))
+        talked = OldConversation.objects.create(participant_key=f'{alice.id}:{bob.id}')
+        talked.participants.add(alice, bob)
+        silent = OldConversation.objects.create(participant_key=f'{alice.id}:{carol.id}')
+        silent.participants.add(alice, carol)
+        OldMessage.objects.create(conversation=talked, sender=alice, text='first')
+        last = OldMessage.objects.create(conversation=talked, sender=bob, text='second')
+
+        self.migrate(self.after)
+        talked = Conversation.objects.get(id=talked.id)
+        self.assertEqual((talked.last_message_id, talked.last_message_sender_id, talked.last_message_text), (last.id, bob.id, 'second'))
+        rows = {row.user_id: row for row in Participant.objects.filter(conversation=talked)}
+        self.assertEqual((rows[alice.id].peer_id, rows[bob.id].peer_id), (bob.id, alice.id))
+        # Existing history starts out read
+        self.assertEqual({row.last_read_message_id for row in rows.values()}, {last.id})
+        self.assertEqual({row.last_activity_at for row in rows.values()}, {last.timestamp})
+
+        silent_rows = Participant.objects.filter(conversation_id=silent.id)
+        self.assertEqual({row.last_activity_at for row in silent_rows}, {None})
+        self.assertEqual({row.peer_id for row in silent_rows}, {alice.id, carol.id})
@@ -0,0 +1,119 @@
+from django.db import transaction
+from django.db.models import Case, Count, Exists, F, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, Greatest
+from .models import SNIPPET_LENGTH, Conversation, Message, Participant
+
+# Largest value of the BigIntegerField message ids are compared against
+MAX_MESSAGE_ID = 2 ** 63 - 1
+
+def parse_message_id(value):
+    """
+    A client supplied message id as int, ValueError unless it is a
+    positive integer the database can compare.
+    """
+    try:
+        message_id = int(value)
+    except (TypeError, ValueError):
+        raise ValueError('message_id required')
+    if not 0 < message_id <= MAX_MESSAGE_ID:
+        raise ValueError('message_id out of range')
+    return message_id
+
+def post_message(conversation_id, sender_id, text):
+    """
+    Store a message, copy it to the conversation's inbox columns and
+    count it as unread for everyone else in the conversation, in one
+    transaction so the counters never drift.
+    """
+    with transaction.atomic():
+        message = Message.objects.create(conversation_id=conversation_id, sender_id=sender_id, text=text)
+        set_last_message(message)
+        Participant.objects.filter(conversation_id=conversation_id).update(
+            unread_count=Case(
+                When(user_id=sender_id, then=F('unread_count')),
+                default=F('unread_count') + 1,
+            ),
+            last_activity_at=Value(message.timestamp),
+        )
+    return message
+
+def set_last_message(message):
+    """
+    Copy a message to its conversation's last_message_* columns, unless
+    a newer one is already there.
+    """
+    Conversation.objects.filter(id=message.conversation_id).exclude(last_message_id__gt=message.id).update(
+        last_message_id=message.id,
+        last_message_sender_id=message.sender_id,
+        last_message_text=message.text[:SNIPPET_LENGTH],
+        last_message_at=message.timestamp,
+        updated_at=message.timestamp,
+    )
+
+def unread_after(up_to=None):
+    """
+    Number of messages from others in a Participant row's conversation
+    past its last_read_message_id (and up to `up_to`), for updates of
+    Participant rows.
+    """
+    messages = Message.objects.filter(conversation_id=OuterRef('conversation_id'), id__gt=OuterRef('last_read_message_id'))
+    if up_to is not None:
+        messages = messages.filter(id__lte=up_to)
+    return Coalesce(
+        Subquery(
+            messages.exclude(sender_id=OuterRef('user_id'))
+            .values('conversation_id')
+            .annotate(count=Count('id'))
+            .values('count')
+        ),
+        0,
+    )
+
+def mark_read(conversation_id, user_id, message_id):
+    """
+    Mark the conversation read up to message_id with a single UPDATE.
+    Only the newly read range is counted, through the (conversation, id)
+    index, and moving backwards or to a message of another conversation
+    is a no-op. Returns whether anything changed.
+    """
+    updated = Participant.objects.filter(
+        conversation_id=conversation_id,
+        user_id=user_id,
+        last_read_message_id__lt=message_id,
+    ).filter(
+        Exists(Message.objects.filter(conversation_id=OuterRef('conversation_id'), id=message_id)),
+    ).update(
+        # Listed first: MySQL evaluates SET left to right with new values
+        unread_count=Greatest(F('unread_count') - unread_after(message_id), 0),
+        last_read_message_id=message_id,
+    )
+    return bool(updated)
+
+def unread_total(user_id):
+    """
+    Sum over the user's conversations with unread messages, reading only
+    those rows of the (user, unread_count) index.
+    """
+    return Participant.objects.filter(user_id=user_id, unread_count__gt=0).aggregate(
+        total=Coalesce(Sum('unread_count'), 0),
+    )['total']
+
+def recount_unread(conversation_id):
+    """
+    Recompute the counters of a conversation from last_read_message_id,
+    e.g. after messages were bulk inserted.
+    """
+    return Participant.objects.filter(conversation_id=conversation_id).update(
+        unread_count=unread_after(),
+    )
+
+def refresh_last_message(conversation_id):
+    """
+    Recompute the inbox columns of a conversation from its latest message,
+    e.g. after messages were bulk inserted.
+    """
+    message = Message.objects.filter(conversation_id=conversation_id).order_by('-id').first()
+    if message is None:
+        return
+    set_last_message(message)
+    Participant.objects.filter(conversation_id=conversation_id).update(last_activity_at=message.timestamp)
@@ -3,4 +3,7 @@ from . import views
 
 urlpatterns = [
     path('history/<str:other_username>/', views.get_chat_history, name='chat-history'),
+    path('read/<str:other_username>/', views.mark_conversation_read, name='chat-read'),
+    path('inbox/', views.get_inbox, name='chat-inbox'),
+    path('unread/', views.get_unread_total, name='chat-unread'),
 ]
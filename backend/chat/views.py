@@ -2,28 +2,200 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from django.contrib.auth import get_user_model
-from .models import Conversation, Message
+from django.utils.dateparse import parse_datetime
+from utils.pagination import decode_cursor, encode_cursor, set_link
+from .models import Conversation, Message, Participant
+from .unread import mark_read, parse_message_id, unread_total
 from django.db.models import Q
 
 User = get_user_model()
 
+HISTORY_PAGE_SIZE = 50
+HISTORY_MAX_PAGE_SIZE = 200
+INBOX_PAGE_SIZE = 20
+INBOX_MAX_PAGE_SIZE = 100
+
+INBOX_FIELDS = [
+    'id', 'unread_count', 'last_activity_at',
+    'peer__username', 'peer__codeforces_handle', 'peer__avatar', 'peer__rating', 'peer__rank',
+    'conversation__last_message_id', 'conversation__last_message_text',
+    'conversation__last_message_at', 'conversation__last_message_sender__username',
+]
+
+def history_cursor(message):
+    return encode_cursor(message['timestamp'].isoformat(), message['id'])
+
+def parse_history_cursor(cursor):
+    timestamp, message_id = decode_cursor(cursor, (str, int))
+    timestamp = parse_datetime(timestamp)
+    if timestamp is None:
+        raise ValueError(f'Invalid cursor: {cursor}')
+    return timestamp, message_id
+
+def inbox_cursor(row):
+    return encode_cursor(row['last_activity_at'].isoformat(), row['id'])
+
+def inbox_entry(row):
+    last_message = None
+    if row['conversation__last_message_id'] is not None:
+        last_message = {
+            'id': row['conversation__last_message_id'],
+            'sender': row['conversation__last_message_sender__username'],
+            'message': row['conversation__last_message_text'],
+            'timestamp': row['conversation__last_message_at'],
+        }
+    return {
+        'username': row['peer__username'],
+        'peer': {
+            'username': row['peer__username'],
+            'codeforces_handle': row['peer__codeforces_handle'],
+            'avatar': row['peer__avatar'],
+            'rating': row['peer__rating'],
+            'rank': row['peer__rank'],
+        },
+        'last_message': last_message,
+        'unread': row['unread_count'],
+    }
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_chat_history(request, other_username):
+    """
+    One page of a direct conversation, oldest first. Without a cursor the
+    latest page is returned; before/after cursors from the Link header
+    walk to older/newer pages.
+    """
     try:
         if request.method == 'GET':
             user = request.user
             other_user = User.objects.get(username=other_username)
 
-            conversation = Conversation.objects.filter(participants=user).filter(participants=other_user).first()
+            conversation = Conversation.objects.filter(participant_key=Conversation.direct_key(user.id, other_user.id)).first()
             
             if conversation:
-                messages = conversation.messages.all().order_by('timestamp')
-                data = [{'sender': msg.sender.username, 'message': msg.text, 'timestamp': msg.timestamp} for msg in messages]
-                return Response(data)
+                limit = int(request.query_params.get('limit', HISTORY_PAGE_SIZE))
+                limit = max(1, min(limit, HISTORY_MAX_PAGE_SIZE))
+                before = request.query_params.get('before')
+                after = request.query_params.get('after')
+
+                messages = Message.objects.filter(conversation=conversation)
+                if after:
+                    timestamp, message_id = parse_history_cursor(after)
+                    messages = messages.filter(Q(timestamp__gt=timestamp) | Q(timestamp=timestamp, id__gt=message_id))
+                    messages = messages.order_by('timestamp', 'id')
+                else:
+                    if before:
+                        timestamp, message_id = parse_history_cursor(before)
+                        messages = messages.filter(Q(timestamp__lt=timestamp) | Q(timestamp=timestamp, id__lt=message_id))
+                    messages = messages.order_by('-timestamp', '-id')
+
+                page = list(messages.values('id', 'text', 'timestamp', 'sender__username')[:limit + 1])
+                has_more = len(page) > limit
+                page = page[:limit]
+                if not after:
+                    page.reverse()
+
+                data = [{'id': msg['id'], 'sender': msg['sender__username'], 'message': msg['text'], 'timestamp': msg['timestamp']} for msg in page]
+                response = Response(data)
+                # Walking one way, the other direction always has the cursor row
+                has_older = has_more if not after else True
+                has_newer = has_more if after else bool(before)
+                if page and has_older:
+                    set_link(response, request, 'prev', before=history_cursor(page[0]), after=None)
+                if page and has_newer:
+                    set_link(response, request, 'next', after=history_cursor(page[-1]), before=None)
+                return response
             else:
                 return Response([])
     except User.DoesNotExist:
         return Response({'error': 'User not found'}, status=404)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=400)
+    except Exception as e:
+        return Response({'error': str(e)}, status=500)
+
+@api_view(['GET', 'POST'])
+@permission_classes([IsAuthenticated])
+def mark_conversation_read(request, other_username):
+    """
+    Read state of the conversation: how many messages are left unread and
+    how far each side has read, so receipts survive a reload. POST marks
+    the conversation read up to message_id first.
+    """
+    message_id = None
+    if request.method == 'POST':
+        try:
+            message_id = parse_message_id(request.data.get('message_id'))
+        except ValueError as e:
+            return Response({'error': str(e)}, status=400)
+
+    try:
+        user = request.user
+        other_user = User.objects.get(username=other_username)
+        conversation = Conversation.objects.filter(participant_key=Conversation.direct_key(user.id, other_user.id)).first()
+        if conversation is None:
+            return Response({'error': 'Conversation not found'}, status=404)
+
+        if message_id is not None:
+            mark_read(conversation.id, user.id, message_id)
+        rows = {
+            row['user_id']: row
+            for row in Participant.objects.filter(conversation=conversation).values('user_id', 'unread_count', 'last_read_message_id')
+        }
+        participant = rows.get(user.id)
+        if participant is None:
+            return Response({'error': 'Conversation not found'}, status=404)
+        # A self-chat has a single row
+        peer = rows.get(other_user.id, participant)
+        return Response({
+            'unread': participant['unread_count'],
+            'last_read_message_id': participant['last_read_message_id'],
+            'peer_last_read_message_id': peer['last_read_message_id'],
+        })
+    except User.DoesNotExist:
+        return Response({'error': 'User not found'}, status=404)
+    except Exception as e:
+        return Response({'error': str(e)}, status=500)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_unread_total(request):
+    """
+    Unread messages across all of the user's conversations, for badges.
+    """
+    try:
+        return Response({'total': unread_total(request.user.id)})
+    except Exception as e:
+        return Response({'error': str(e)}, status=500)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_inbox(request):
+    """
+    The user's conversations with messages, most recently active first,
+    with the peer's profile, a snippet of the last message and the unread
+    count. Served from the denormalized Participant and Conversation
+    columns in one query; the before cursor from the Link header walks to
+    older pages.
+    """
+    try:
+        limit = int(request.query_params.get('limit', INBOX_PAGE_SIZE))
+        limit = max(1, min(limit, INBOX_MAX_PAGE_SIZE))
+        before = request.query_params.get('before')
+
+        rows = Participant.objects.filter(user=request.user, last_activity_at__isnull=False)
+        if before:
+            timestamp, participant_id = parse_history_cursor(before)
+            rows = rows.filter(Q(last_activity_at__lt=timestamp) | Q(last_activity_at=timestamp, id__lt=participant_id))
+        page = list(rows.order_by('-last_activity_at', '-id').values(*INBOX_FIELDS)[:limit + 1])
+        has_more = len(page) > limit
+        page = page[:limit]
+
+        response = Response([inbox_entry(row) for row in page])
+        if has_more:
+            set_link(response, request, 'next', before=inbox_cursor(page[-1]))
+        return response
+    except ValueError as e:
+        return Response({'error': str(e)}, status=400)
     except Exception as e:
         return Response({'error': str(e)}, status=500)
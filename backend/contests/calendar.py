@@ -0,0 +1,66 @@
+from datetime import timedelta
+from .models import Contest
+
+# Running contests stay on the calendar until they end
+CALENDAR_PHASES = ('BEFORE', 'CODING')
+CONTEST_URL = 'https://codeforces.com/contests/{}'
+
+def escape(text):
+    return text.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,').replace('\n', '\\n')
+
+def fold(line):
+    """
+    Split a content line into 75 octet chunks as RFC 5545 requires.
+    """
+    data = line.encode()
+    chunks = []
+    while len(data) > 75:
+        cut = 75 if not chunks else 74
+        # Never split a UTF-8 sequence
+        while data[cut] & 0xC0 == 0x80:
+            cut -= 1
+        chunks.append(data[:cut].decode())
+        data = data[cut:]
+    chunks.append(data.decode())
+    return '\r\n '.join(chunks) + '\r\n'
+
+def format_time(value):
+    return value.strftime('%Y%m%dT%H%M%SZ')
+
+def calendar_header():
+    return ''.join(fold(line) for line in [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        'PRODID:-//bugsnug//Codeforces contests//EN',
+        'CALSCALE:GREGORIAN',
+        'X-WR-CALNAME:Codeforces contests',
+    ])
+
+def calendar_event(contest):
+    return ''.join(fold(line) for line in [
+        'BEGIN:VEVENT',
+        f'UID:codeforces-contest-{contest.contest_id}@bugsnug',
+        f'DTSTAMP:{format_time(contest.updated_at)}',
+        f'DTSTART:{format_time(contest.start_time)}',
+        f'DTEND:{format_time(contest.start_time + timedelta(seconds=contest.duration_seconds))}',
+        f'SUMMARY:{escape(contest.name)}',
+        f'URL:{CONTEST_URL.format(contest.contest_id)}',
+        'END:VEVENT',
+    ])
+
+def calendar_footer():
+    return 'END:VCALENDAR\r\n'
+
+async def stream_calendar():
+    """
+    The calendar one event at a time, read from the Contest table only.
+    """
+    yield calendar_header()
+    contests = (
+        Contest.objects
+        .filter(phase__in=CALENDAR_PHASES, start_time__isnull=False)
+        .order_by('start_time')
+    )
+    async for contest in contests:
+        yield calendar_event(contest)
+    yield calendar_footer()
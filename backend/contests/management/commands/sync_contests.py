@@ -0,0 +1,22 @@
+import time
+from django.core.management.base import BaseCommand
+from contests.sync import sync_contests
+
+class Command(BaseCommand):
+    help = 'Mirrors the Codeforces contest list into the local Contest table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=int, default=None,
+                            help='Keep running, syncing every this many seconds')
+
+    def handle(self, *args, **options):
+        while True:
+            try:
+                count = sync_contests()
+                self.stdout.write(self.style.SUCCESS(f'Synced {count} contests'))
+            except Exception as e:
+                self.stdout.write(self.style.ERROR(f'Contest sync failed: {e}'))
+
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,31 @@
+# Generated by Django 6.0.2 on 2026-10-18 15:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Contest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('contest_id', models.IntegerField(unique=True)),
+                ('name', models.CharField(max_length=255)),
+                ('type', models.CharField(blank=True, max_length=20)),
+                ('phase', models.CharField(max_length=30)),
+                ('frozen', models.BooleanField(default=False)),
+                ('duration_seconds', models.IntegerField(default=0)),
+                ('start_time', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['phase', 'start_time'], name='contest_phase_start_idx')],
+            },
+        ),
+    ]
@@ -1,3 +1,23 @@
 from django.db import models
 
-# Create your models here.
+class Contest(models.Model):
+    """
+    Local mirror of contest.list, refreshed by the sync_contests command.
+    """
+    contest_id = models.IntegerField(unique=True)
+    name = models.CharField(max_length=255)
+    type = models.CharField(max_length=20, blank=True)
+    phase = models.CharField(max_length=30)
+    frozen = models.BooleanField(default=False)
+    duration_seconds = models.IntegerField(default=0)
+    start_time = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Upcoming contests in start order, for the list and the calendar
+            models.Index(fields=['phase', 'start_time'], name='contest_phase_start_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.contest_id} - {self.name}"
@@ -0,0 +1,55 @@
+from datetime import datetime, timezone as dt_timezone
+from django.db import transaction
+from utils.codeforces import get_contest_list
+from utils.versions import bump_version
+from .models import Contest
+
+CONTESTS_VERSION = 'contests'
+SYNC_BATCH_SIZE = 500
+
+def contest_from_api(c):
+    start = c.get('startTimeSeconds')
+    return Contest(
+        contest_id=c['id'],
+        name=c['name'],
+        type=c.get('type', ''),
+        phase=c['phase'],
+        frozen=c.get('frozen', False),
+        duration_seconds=c.get('durationSeconds', 0),
+        start_time=datetime.fromtimestamp(start, tz=dt_timezone.utc) if start is not None else None,
+    )
+
+def sync_contests():
+    """
+    Mirror contest.list into the Contest table.
+    Returns the number of contests written.
+    """
+    contests = [contest_from_api(c) for c in get_contest_list(use_cache=False)]
+    with transaction.atomic():
+        Contest.objects.bulk_create(
+            contests,
+            batch_size=SYNC_BATCH_SIZE,
+            update_conflicts=True,
+            unique_fields=['contest_id'],
+            update_fields=['name', 'type', 'phase', 'frozen', 'duration_seconds', 'start_time', 'updated_at'],
+        )
+    bump_version(CONTESTS_VERSION)
+    return len(contests)
+
+def contest_to_api(contest):
+    """
+    Contest in the contest.list shape the frontend already consumes.
+    relativeTimeSeconds is left out so the representation only changes
+    when a sync does, which keeps it cacheable by ETag.
+    """
+    data = {
+        'id': contest.contest_id,
+        'name': contest.name,
+        'type': contest.type,
+        'phase': contest.phase,
+        'frozen': contest.frozen,
+        'durationSeconds': contest.duration_seconds,
+    }
+    if contest.start_time is not None:
+        data['startTimeSeconds'] = int(contest.start_time.timestamp())
+    return data
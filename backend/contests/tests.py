@@ -1,3 +1,30 @@
+import time
+from unittest import mock
+from django.contrib.auth import get_user_model
 from django.test import TestCase
+from rest_framework.test import APIClient
+from .models import Contest
 
-# Create your tests here.
+class ContestListTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create_user('viewer', password='x'))
+        self.fetched = [{
+            'id': 2000,
+            'name': 'Codeforces Round',
+            'type': 'CF',
+            'phase': 'BEFORE',
+            'frozen': False,
+            'durationSeconds': 7200,
+            'startTimeSeconds': int(time.time()) + 86400,
+        }]
+
+    def test_empty_mirror_is_filled_with_the_usual_validators(self):
+        with mock.patch('contests.sync.get_contest_list', return_value=self.fetched) as fetch:
+            first = self.client.get('/api/contests/')
+            second = self.client.get('/api/contests/')
+        self.assertEqual(fetch.call_count, 1)
+        self.assertEqual(Contest.objects.count(), 1)
+        self.assertEqual([c['id'] for c in first.json()], [2000])
+        # The next start is part of the ETag from the very first response
+        self.assertEqual(first['ETag'], second['ETag'])
@@ -1,6 +1,7 @@
 from django.urls import path
-from .views import ContestListView
+from .views import ContestListView, contest_calendar
 
 urlpatterns = [
     path('', ContestListView.as_view(), name='contest_list'),
+    path('calendar.ics', contest_calendar, name='contest_calendar'),
 ]
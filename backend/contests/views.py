@@ -1,21 +1,46 @@
-from rest_framework.views import APIView
+from asgiref.sync import sync_to_async
+from django.http import StreamingHttpResponse
+from django.utils import timezone
 from rest_framework.response import Response
 from rest_framework import permissions
-from utils.codeforces import get_contest_list
-import time
+from utils.conditional import Validators
+from utils.views import AsyncAPIView
+from .calendar import stream_calendar
+from .models import Contest
+from .sync import CONTESTS_VERSION, contest_to_api, sync_contests
 
-class ContestListView(APIView):
+class ContestListView(AsyncAPIView):
     permission_classes = (permissions.IsAuthenticated,)
 
-    def get(self, request):
+    async def get(self, request):
         try:
-            # Fetch all contests
-            contests = get_contest_list()
-            # Filter upcoming contests
-            current_time = int(time.time())
-            upcoming = [c for c in contests if c['phase'] == 'BEFORE']
-            # Sort by start time
-            upcoming.sort(key=lambda x: x['startTimeSeconds'])
-            return Response(upcoming)
+            # Fill an empty mirror once, after that the sync job keeps it fresh
+            if not await Contest.objects.aexists():
+                await sync_to_async(sync_contests)()
+
+            # The phase is only as fresh as the last sync, the start time decides
+            upcoming = Contest.objects.filter(phase='BEFORE', start_time__gt=timezone.now()).order_by('start_time')
+            # The list changes when its first contest starts, not only on syncs
+            next_start = await upcoming.values_list('start_time', flat=True).afirst()
+            validators = await sync_to_async(Validators)([CONTESTS_VERSION], extra=[next_start])
+            not_modified = validators.not_modified(request)
+            if not_modified is not None:
+                return not_modified
+
+            return validators.apply(Response([contest_to_api(c) async for c in upcoming]))
         except Exception as e:
             return Response({'error': str(e)}, status=500)
+
+async def contest_calendar(request):
+    """
+    Upcoming contests as an iCalendar feed. Public, since calendar
+    clients cannot send a JWT.
+    """
+    validators = await sync_to_async(Validators)([CONTESTS_VERSION], private=False)
+    not_modified = validators.not_modified(request)
+    if not_modified is not None:
+        return not_modified
+
+    response = StreamingHttpResponse(stream_calendar(), content_type='text/calendar; charset=utf-8')
+    response['Content-Disposition'] = 'inline; filename="codeforces-contests.ics"'
+    return validators.apply(response)
@@ -0,0 +1,232 @@
+import re
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from utils.versions import get_version
+from .models import Problem
+
+# Rebuild at least this often even without a version bump, in case the
+# version counter lives in a per-process cache
+INDEX_MAX_AGE = 300
+PROBLEMS_VERSION = 'problems'
+
+SORT_KEYS = {
+    'rating': lambda p: p['rating'],
+    'solvedCount': lambda p: p['solvedCount'],
+    'contestId': lambda p: (p['contestId'], p['index']),
+}
+DEFAULT_SORT = '-contestId'
+# Order of name searches unless another sort is requested
+RELEVANCE_SORT = 'relevance'
+
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+class ProblemIndex:
+    """
+    Immutable in-memory index over the problemset.
+
+    Documents are numbered in ascending rating order (unrated last), so a
+    rating range is a contiguous run of doc ids. Tag postings are bitsets
+    stored as Python ints, and each sort order is a precomputed list of
+    doc ids that is scanned only until the requested page is filled.
+    """
+    def __init__(self, problems, version=None):
+        problems = sorted(problems, key=lambda p: (p['rating'] is None, p['rating'] or 0, -p['contestId'], p['index']))
+        self.version = version
+        self.built_at = time.monotonic()
+        # Problem ids stay out of the rows, which keep the Codeforces shape
+        self.doc_ids = [p.get('id') for p in problems]
+        problems = [{key: value for key, value in p.items() if key != 'id'} for p in problems]
+        self.problem_ids = {(p['contestId'], p['index']): pk for p, pk in zip(problems, self.doc_ids)}
+        self.docs_by_id = {pk: doc for doc, pk in enumerate(self.doc_ids)}
+        self.problems = problems
+        self.size = len(problems)
+        self.all = (1 << self.size) - 1
+        self.ratings = [p['rating'] for p in problems if p['rating'] is not None]
+
+        self.tags = {}
+        for doc, problem in enumerate(problems):
+            for tag in problem['tags']:
+                self.tags[tag] = self.tags.get(tag, 0) | (1 << doc)
+
+        # Inverted index over name and tag tokens, sorted so every token
+        # sharing a prefix is one contiguous run
+        self.names = [problem['name'].lower() for problem in problems]
+        self.name_tokens = [frozenset(tokenize(name)) for name in self.names]
+        postings = {}
+        for doc, problem in enumerate(problems):
+            tokens = self.name_tokens[doc].union(*(tokenize(tag) for tag in problem['tags']))
+            for token in tokens:
+                postings[token] = postings.get(token, 0) | (1 << doc)
+        self.tokens = sorted(postings)
+        self.postings = [postings[token] for token in self.tokens]
+
+        self.orders = {}
+        for name, key in SORT_KEYS.items():
+            # Unrated problems sort last in both directions
+            docs = [d for d in range(self.size) if key(problems[d]) is not None]
+            missing = [d for d in range(self.size) if key(problems[d]) is None]
+            docs.sort(key=lambda d: key(problems[d]))
+            self.orders[name] = docs + missing
+            self.orders['-' + name] = docs[::-1] + missing
+
+        # Position in the default order, breaks relevance ties
+        self.default_rank = [0] * self.size
+        for position, doc in enumerate(self.orders[DEFAULT_SORT]):
+            self.default_rank[doc] = position
+
+    @classmethod
+    def build(cls, version=None):
+        rows = Problem.objects.filter(in_problemset=True).values_list('id', 'contest_id', 'index', 'name', 'rating', 'tags', 'solved_count')
+        problems = [
+            {'id': pk, 'contestId': c, 'index': i, 'name': n, 'rating': r, 'tags': t, 'solvedCount': s}
+            for pk, c, i, n, r, t, s in rows.iterator(chunk_size=2000)
+        ]
+        return cls(problems, version)
+
+    def tag_mask(self, tags, match_all=True):
+        if not tags:
+            return self.all
+        masks = [self.tags.get(tag, 0) for tag in tags]
+        mask = masks[0]
+        for other in masks[1:]:
+            mask = mask & other if match_all else mask | other
+        return mask
+
+    def rating_mask(self, min_rating=None, max_rating=None):
+        if min_rating is None and max_rating is None:
+            return self.all
+        lo = bisect_left(self.ratings, min_rating) if min_rating is not None else 0
+        hi = bisect_right(self.ratings, max_rating) if max_rating is not None else len(self.ratings)
+        if hi <= lo:
+            return 0
+        return ((1 << hi) - 1) ^ ((1 << lo) - 1)
+
+    def problem_id(self, contest_id, index):
+        return self.problem_ids.get((contest_id, index))
+
+    def id_mask(self, problem_ids):
+        """
+        Docs of the given Problem ids, e.g. a user's solved problems.
+        """
+        bits = bytearray((self.size + 7) // 8 or 1)
+        for pk in problem_ids:
+            doc = self.docs_by_id.get(pk)
+            if doc is not None:
+                bits[doc >> 3] |= 1 << (doc & 7)
+        return int.from_bytes(bits, 'little')
+
+    def text_mask(self, terms):
+        """
+        Docs whose name or tags have a token starting with every term.
+        """
+        mask = self.all
+        for term in terms:
+            lo = bisect_left(self.tokens, term)
+            term_mask = 0
+            for position in range(lo, len(self.tokens)):
+                if not self.tokens[position].startswith(term):
+                    break
+                term_mask |= self.postings[position]
+            mask &= term_mask
+            if not mask:
+                break
+        return mask
+
+    def docs(self, mask):
+        bits = mask.to_bytes((self.size + 7) // 8 or 1, 'little')
+        for byte_index, byte in enumerate(bits):
+            while byte:
+                low = byte & -byte
+                yield (byte_index << 3) + low.bit_length() - 1
+                byte ^= low
+
+    def score(self, doc, terms, phrase):
+        """
+        Whole-word name matches beat name prefixes, which beat tag-only
+        matches, and names containing the query as typed rank first.
+        """
+        tokens = self.name_tokens[doc]
+        score = 0
+        for term in terms:
+            if term in tokens:
+                score += 3
+            elif any(token.startswith(term) for token in tokens):
+                score += 2
+            else:
+                score += 1
+        name = self.names[doc]
+        if name.startswith(phrase):
+            score += 2 * len(terms)
+        elif phrase in name:
+            score += len(terms)
+        return score
+
+    def ranked(self, mask, terms, offset=0, limit=20):
+        phrase = ' '.join(terms)
+        docs = sorted(self.docs(mask), key=lambda doc: (-self.score(doc, terms, phrase), self.default_rank[doc]))
+        return [self.problems[doc] for doc in docs[offset:offset + limit]]
+
+    def page(self, mask, sort=DEFAULT_SORT, offset=0, limit=20):
+        """
+        Problems in `mask` in `sort` order, skipping `offset` matches.
+        """
+        order = self.orders[sort]
+        if mask == self.all:
+            return [self.problems[d] for d in order[offset:offset + limit]]
+
+        bits = mask.to_bytes((self.size + 7) // 8 or 1, 'little')
+        results = []
+        for doc in order:
+            if bits[doc >> 3] >> (doc & 7) & 1:
+                if offset:
+                    offset -= 1
+                    continue
+                results.append(self.problems[doc])
+                if len(results) == limit:
+                    break
+        return results
+
+    def search(self, tags=None, match_all=True, min_rating=None, max_rating=None, query=None, exclude=0, sort=None, offset=0, limit=20):
+        """
+        Returns (total matches, page of problems). Docs in the `exclude`
+        mask are left out. A text query defaults to relevance order,
+        anything else to DEFAULT_SORT.
+        """
+        terms = tokenize(query) if query else []
+        mask = self.tag_mask(tags, match_all) & self.rating_mask(min_rating, max_rating) & ~exclude
+        if terms:
+            mask &= self.text_mask(terms)
+        sort = sort or (RELEVANCE_SORT if terms else DEFAULT_SORT)
+        if sort == RELEVANCE_SORT:
+            if not terms:
+                return mask.bit_count(), self.page(mask, DEFAULT_SORT, offset, limit)
+            return mask.bit_count(), self.ranked(mask, terms, offset, limit)
+        return mask.bit_count(), self.page(mask, sort, offset, limit)
+
+_index = None
+_build_lock = threading.Lock()
+
+def get_problem_index():
+    """
+    Current index, rebuilt when the problemset version changes. The new
+    index replaces the old one in a single reference swap, and requests
+    arriving during a rebuild keep using the previous index.
+    """
+    global _index
+    version = get_version(PROBLEMS_VERSION)
+    index = _index
+    if index is not None and index.version == version and time.monotonic() - index.built_at < INDEX_MAX_AGE:
+        return index
+
+    if not _build_lock.acquire(blocking=index is None):
+        return index
+    try:
+        if _index is None or _index is index:
+            _index = ProblemIndex.build(version)
+        return _index
+    finally:
+        _build_lock.release()
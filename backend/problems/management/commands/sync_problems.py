@@ -0,0 +1,22 @@
+import time
+from django.core.management.base import BaseCommand
+from problems.sync import sync_problemset
+
+class Command(BaseCommand):
+    help = 'Mirrors the Codeforces problemset into the local Problem table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=int, default=None,
+                            help='Keep running, syncing every this many seconds')
+
+    def handle(self, *args, **options):
+        while True:
+            try:
+                count = sync_problemset()
+                self.stdout.write(self.style.SUCCESS(f'Synced {count} problems'))
+            except Exception as e:
+                self.stdout.write(self.style.ERROR(f'Problemset sync failed: {e}'))
+
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
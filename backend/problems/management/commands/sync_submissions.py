@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from django.contrib.auth import get_user_model
+from problems.sync import sync_user_submissions
+
+User = get_user_model()
+
+class Command(BaseCommand):
+    help = 'Fetches new Codeforces submissions of every user with a linked handle'
+
+    def add_arguments(self, parser):
+        parser.add_argument('handles', nargs='*', help='Only sync these handles')
+
+    def handle(self, *args, **options):
+        users = User.objects.exclude(codeforces_handle__isnull=True).exclude(codeforces_handle='')
+        if options['handles']:
+            users = users.filter(codeforces_handle__in=options['handles'])
+
+        for user in users.order_by('submissions_synced_at'):
+            try:
+                submissions = sync_user_submissions(user)
+            except Exception as e:
+                self.stdout.write(self.style.ERROR(f'{user.codeforces_handle}: {e}'))
+                continue
+            self.stdout.write(f'{user.codeforces_handle}: {len(submissions)} new or updated submissions')
+
+        self.stdout.write(self.style.SUCCESS('Submission sync finished'))
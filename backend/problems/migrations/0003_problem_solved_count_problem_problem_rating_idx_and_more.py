@@ -0,0 +1,26 @@
+# Generated by Django 6.0.2 on 2026-10-18 14:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('problems', '0002_bookmark'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='problem',
+            name='solved_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='problem',
+            index=models.Index(fields=['rating'], name='problem_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='problem',
+            index=models.Index(fields=['-solved_count'], name='problem_solved_count_idx'),
+        ),
+    ]
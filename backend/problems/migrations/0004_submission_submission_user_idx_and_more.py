@@ -0,0 +1,23 @@
+# Generated by Django 6.0.2 on 2026-10-18 14:52
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('problems', '0003_problem_solved_count_problem_problem_rating_idx_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='submission',
+            index=models.Index(fields=['user', '-submission_id'], name='submission_user_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='submission',
+            index=models.Index(fields=['user', 'verdict', '-submission_id'], name='submission_user_verdict_idx'),
+        ),
+    ]
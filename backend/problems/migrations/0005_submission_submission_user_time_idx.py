@@ -0,0 +1,19 @@
+# Generated by Django 6.0.2 on 2026-10-18 14:59
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('problems', '0004_submission_submission_user_idx_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='submission',
+            index=models.Index(fields=['user', '-creation_time_seconds', '-submission_id'], name='submission_user_time_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 6.0.2 on 2026-10-18 15:56
+
+from django.db import migrations, models
+
+# Gym contest ids start here
+GYM_CONTEST_ID = 100000
+
+
+def mark_problemset(apps, schema_editor):
+    # Best guess until the next sync_problemset sets the flag exactly
+    Problem = apps.get_model('problems', 'Problem')
+    Problem.objects.filter(contest_id__lt=GYM_CONTEST_ID).update(in_problemset=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('problems', '0005_submission_submission_user_time_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='problem',
+            name='in_problemset',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(mark_problemset, migrations.RunPython.noop),
+    ]
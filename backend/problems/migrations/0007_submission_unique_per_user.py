@@ -0,0 +1,43 @@
+# Generated by Django 6.0.2 on 2026-10-18 15:57
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import Lower
+
+
+def resync_shared_handles(apps, schema_editor):
+    # Accounts sharing a handle lost the submissions the first one owned,
+    # yet their sync mark moved on. A full resync restores them; already
+    # stored accepts are not counted twice
+    User = apps.get_model('users', 'User')
+    shared = (
+        User.objects.exclude(codeforces_handle__isnull=True).exclude(codeforces_handle='')
+        .values(handle=Lower('codeforces_handle'))
+        .annotate(accounts=Count('id'))
+        .filter(accounts__gt=1)
+        .values('handle')
+    )
+    User.objects.annotate(handle=Lower('codeforces_handle')).filter(handle__in=shared).update(last_submission_id=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('problems', '0006_problem_in_problemset'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('users', '0004_user_last_submission_id_user_submissions_synced_at'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='submission',
+            name='submission_id',
+            field=models.IntegerField(),
+        ),
+        migrations.AlterUniqueTogether(
+            name='submission',
+            unique_together={('user', 'submission_id')},
+        ),
+        migrations.RunPython(resync_shared_handles, migrations.RunPython.noop),
+    ]
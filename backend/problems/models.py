@@ -7,9 +7,18 @@ class Problem(models.Model):
     name = models.CharField(max_length=255)
     rating = models.IntegerField(null=True, blank=True)
     tags = models.JSONField(default=list)
-    
+    solved_count = models.IntegerField(default=0)
+    # Listed by problemset.problems. Rows only created for submissions
+    # (gym and other problems) stay out of the problem list
+    in_problemset = models.BooleanField(default=False)
+
     class Meta:
+        # The unique (contest_id, index) index also serves contest lookups.
         unique_together = ('contest_id', 'index')
+        indexes = [
+            models.Index(fields=['rating'], name='problem_rating_idx'),
+            models.Index(fields=['-solved_count'], name='problem_solved_count_idx'),
+        ]
 
     def __str__(self):
         return f"{self.contest_id}{self.index} - {self.name}"
@@ -17,11 +26,22 @@ class Problem(models.Model):
 class Submission(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='submissions')
     problem = models.ForeignKey(Problem, on_delete=models.CASCADE, related_name='submissions')
-    submission_id = models.IntegerField(unique=True)
+    submission_id = models.IntegerField()
     verdict = models.CharField(max_length=50)
     creation_time_seconds = models.IntegerField()
     programming_language = models.CharField(max_length=50)
-    
+
+    class Meta:
+        # Per user, since nothing stops two accounts from linking one handle
+        unique_together = ('user', 'submission_id')
+        # Keyset pagination walks submission_id downwards per user
+        indexes = [
+            models.Index(fields=['user', '-submission_id'], name='submission_user_idx'),
+            models.Index(fields=['user', 'verdict', '-submission_id'], name='submission_user_verdict_idx'),
+            # Per-user time-ordered streams merged by the friends feed
+            models.Index(fields=['user', '-creation_time_seconds', '-submission_id'], name='submission_user_time_idx'),
+        ]
+
     def __str__(self):
         return f"{self.submission_id} - {self.user.username}"
 
@@ -0,0 +1,131 @@
+import threading
+import numpy as np
+from django.core.cache import cache
+from utils.versions import get_version
+from .index import get_problem_index
+from .models import Submission
+from .status import get_problem_status
+from .sync import submissions_version
+
+# Target for users without a rating or solved rated problems
+DEFAULT_RATING = 1200
+# Recommend slightly above the user's level
+RATING_OFFSET = 100
+RATING_SPREAD = 200
+PROFILE_CACHE_TIMEOUT = 3600
+
+class ProblemFeatures:
+    """
+    Feature matrix over the problem index, one row per doc: rating,
+    normalised popularity and a 0/1 tag matrix. Built once per index so
+    scoring a user is a handful of array operations.
+    """
+    def __init__(self, index):
+        self.index = index
+        self.tags = sorted(index.tags)
+        tag_columns = {tag: column for column, tag in enumerate(self.tags)}
+
+        self.ids = np.array([pk if pk is not None else -1 for pk in index.doc_ids], dtype=np.int64)
+        self.ratings = np.array(
+            [p['rating'] if p['rating'] is not None else np.nan for p in index.problems],
+            dtype=np.float64,
+        )
+        popularity = np.log1p(np.array([p['solvedCount'] or 0 for p in index.problems], dtype=np.float64))
+        self.popularity = popularity / popularity.max() if index.size and popularity.max() > 0 else popularity
+
+        self.tag_matrix = np.zeros((index.size, len(self.tags)), dtype=np.float32)
+        for doc, problem in enumerate(index.problems):
+            for tag in problem['tags']:
+                self.tag_matrix[doc, tag_columns[tag]] = 1
+        self.tag_counts = self.tag_matrix.sum(axis=1)
+
+        # Problem id -> doc lookup table, -1 for ids not in the index
+        self.doc_of = np.full(int(self.ids.max(initial=0)) + 1, -1, dtype=np.int64)
+        self.doc_of[self.ids[self.ids >= 0]] = np.flatnonzero(self.ids >= 0)
+
+    def docs(self, problem_ids):
+        """
+        Docs of the given Problem ids, -1 for problems missing from the index.
+        """
+        ids = np.fromiter(problem_ids, dtype=np.int64)
+        docs = np.full(ids.shape, -1, dtype=np.int64)
+        inside = (ids >= 0) & (ids < self.doc_of.size)
+        docs[inside] = self.doc_of[ids[inside]]
+        return docs
+
+_features = None
+_features_lock = threading.Lock()
+
+def get_features():
+    """
+    Features of the current problem index, rebuilt whenever a problemset
+    sync replaces the index.
+    """
+    global _features
+    index = get_problem_index()
+    features = _features
+    if features is not None and features.index is index:
+        return features
+    with _features_lock:
+        if _features is None or _features.index is not index:
+            _features = ProblemFeatures(index)
+        return _features
+
+def tag_accept_rates(user, features):
+    """
+    Laplace-smoothed share of accepted submissions per tag, cached until
+    the user's submissions change.
+    """
+    key = f'tag-accept:{user.id}:{get_version(submissions_version(user.id))}:{features.index.version}'
+    rates = cache.get(key)
+    if rates is not None:
+        return rates
+
+    rows = list(Submission.objects.filter(user=user).values_list('problem_id', 'verdict'))
+    docs = features.docs(pk for pk, _ in rows)
+    accepted = np.array([verdict == 'OK' for _, verdict in rows], dtype=np.float32)
+    known = docs >= 0
+    tried = features.tag_matrix[docs[known]]
+    rates = (accepted[known] @ tried + 1) / (tried.sum(axis=0) + 2)
+    cache.set(key, rates, PROFILE_CACHE_TIMEOUT)
+    return rates
+
+def target_rating(user, features, solved_docs):
+    if user.rating:
+        return user.rating
+    ratings = features.ratings[solved_docs]
+    ratings = ratings[~np.isnan(ratings)]
+    return float(np.median(ratings)) if ratings.size else DEFAULT_RATING
+
+def recommend(user, count=10):
+    """
+    Unsolved problems scored by closeness to the user's level, weakness
+    in their tags and popularity. Returns rows shaped like the problem
+    list, best first.
+    """
+    features = get_features()
+    if not features.index.size:
+        return []
+    status = get_problem_status(user)
+    solved_docs = features.docs(status.solved_ids)
+    solved_docs = solved_docs[solved_docs >= 0]
+
+    target = target_rating(user, features, solved_docs) + RATING_OFFSET
+    closeness = np.exp(-0.5 * ((features.ratings - target) / RATING_SPREAD) ** 2)
+    weakness = 1 - tag_accept_rates(user, features)
+    tag_weakness = (features.tag_matrix @ weakness) / np.maximum(features.tag_counts, 1)
+    tag_weakness[features.tag_counts == 0] = weakness.mean() if weakness.size else 0.5
+
+    scores = closeness * (1 + 2 * tag_weakness) * (0.25 + features.popularity)
+    scores = np.nan_to_num(scores, nan=-np.inf)
+    scores[solved_docs] = -np.inf
+
+    count = min(count, int(np.isfinite(scores).sum()))
+    if count <= 0:
+        return []
+    top = np.argpartition(-scores, count - 1)[:count]
+    top = top[np.argsort(-scores[top], kind='stable')]
+    return [
+        {**features.index.problems[doc], 'status': status.status(int(features.ids[doc]))}
+        for doc in top.tolist()
+    ]
@@ -1,5 +1,26 @@
 from rest_framework import serializers
-from .models import Bookmark
+from .models import Bookmark, Problem, Submission
+
+class ProblemSerializer(serializers.ModelSerializer):
+    # Keep the Codeforces field names the frontend already consumes
+    contestId = serializers.IntegerField(source='contest_id')
+    solvedCount = serializers.IntegerField(source='solved_count')
+
+    class Meta:
+        model = Problem
+        fields = ['contestId', 'index', 'name', 'rating', 'tags', 'solvedCount']
+
+class SubmissionSerializer(serializers.ModelSerializer):
+    # Same shape as a Codeforces user.status entry
+    id = serializers.IntegerField(source='submission_id')
+    contestId = serializers.IntegerField(source='problem.contest_id')
+    creationTimeSeconds = serializers.IntegerField(source='creation_time_seconds')
+    programmingLanguage = serializers.CharField(source='programming_language')
+    problem = ProblemSerializer()
+
+    class Meta:
+        model = Submission
+        fields = ['id', 'contestId', 'creationTimeSeconds', 'problem', 'programmingLanguage', 'verdict']
 
 class BookmarkSerializer(serializers.ModelSerializer):
     class Meta:
@@ -0,0 +1,60 @@
+from django.core.cache import cache
+from utils.versions import get_version
+from .models import Submission
+from .sync import submissions_version
+
+SOLVED = 'solved'
+ATTEMPTED = 'attempted'
+STATUS_CACHE_TIMEOUT = 3600
+
+def bitmap(problem_ids):
+    if not problem_ids:
+        return b''
+    bits = bytearray(max(problem_ids) // 8 + 1)
+    for problem_id in problem_ids:
+        bits[problem_id >> 3] |= 1 << (problem_id & 7)
+    return bytes(bits)
+
+def has_bit(bits, problem_id):
+    byte = problem_id >> 3
+    return byte < len(bits) and bits[byte] >> (problem_id & 7) & 1
+
+class ProblemStatus:
+    """
+    A user's solved and attempted problems as bitmaps over Problem ids.
+    Problems with an accepted submission count as solved only.
+    """
+    def __init__(self, solved=(), attempted=()):
+        self.solved_ids = sorted(solved)
+        self.solved = bitmap(self.solved_ids)
+        self.attempted = bitmap(set(attempted) - set(solved))
+
+    @classmethod
+    def build(cls, user):
+        solved, attempted = set(), set()
+        for problem_id, verdict in Submission.objects.filter(user=user).values_list('problem_id', 'verdict').distinct():
+            (solved if verdict == 'OK' else attempted).add(problem_id)
+        return cls(solved, attempted)
+
+    def status(self, problem_id):
+        """
+        'solved', 'attempted' or None for an untouched problem.
+        """
+        if problem_id is None:
+            return None
+        if has_bit(self.solved, problem_id):
+            return SOLVED
+        if has_bit(self.attempted, problem_id):
+            return ATTEMPTED
+        return None
+
+def get_problem_status(user):
+    """
+    Status of the user, cached until a sync writes their submissions.
+    """
+    key = f'problem-status:{user.id}:{get_version(submissions_version(user.id))}'
+    status = cache.get(key)
+    if status is None:
+        status = ProblemStatus.build(user)
+        cache.set(key, status, STATUS_CACHE_TIMEOUT)
+    return status
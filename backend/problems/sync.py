@@ -0,0 +1,179 @@
+from datetime import timedelta
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.utils import timezone
+from utils.codeforces import aget_user_status, get_problems, get_user_status
+from utils.versions import bump_version
+from users.stats import lock_stats, newly_accepted, record_solves
+from .index import PROBLEMS_VERSION
+from .models import Problem, Submission
+
+SYNC_BATCH_SIZE = 500
+
+def sync_problemset():
+    """
+    Mirror problemset.problems into the Problem table.
+    Existing rows are updated in place, new ones are inserted.
+    Returns the number of problems written.
+    """
+    data = get_problems(use_cache=False)
+    solved_counts = {
+        (s['contestId'], s['index']): s.get('solvedCount', 0)
+        for s in data['problemStatistics']
+    }
+
+    problems = [
+        Problem(
+            contest_id=p['contestId'],
+            index=p['index'],
+            name=p['name'],
+            rating=p.get('rating'),
+            tags=p.get('tags', []),
+            solved_count=solved_counts.get((p['contestId'], p['index']), 0),
+            in_problemset=True,
+        )
+        for p in data['problems']
+        if 'contestId' in p
+    ]
+
+    with transaction.atomic():
+        Problem.objects.bulk_create(
+            problems,
+            batch_size=SYNC_BATCH_SIZE,
+            update_conflicts=True,
+            unique_fields=['contest_id', 'index'],
+            update_fields=['name', 'rating', 'tags', 'solved_count', 'in_problemset'],
+        )
+    bump_version(PROBLEMS_VERSION)
+    return len(problems)
+
+def submissions_version(user_id):
+    """
+    Version name bumped whenever a sync writes submissions of the user.
+    """
+    return f'submissions:{user_id}'
+
+# Verdicts that can still change, a submission is final once it has another
+PENDING_VERDICTS = {None, 'TESTING'}
+FULL_SYNC_PAGE_SIZE = 1000
+INCREMENTAL_PAGE_SIZE = 100
+# Minimum seconds between on-demand syncs of the same user
+SUBMISSION_SYNC_INTERVAL = 60
+
+def fetch_new_submissions(handle, last_submission_id):
+    """
+    Page through user.status (newest first) until reaching a submission
+    at or below the high-water mark.
+    """
+    page_size = INCREMENTAL_PAGE_SIZE if last_submission_id else FULL_SYNC_PAGE_SIZE
+    submissions = []
+    from_index = 1
+    while True:
+        page = get_user_status(handle, from_index=from_index, count=page_size)
+        submissions.extend(s for s in page if s['id'] > last_submission_id)
+        if len(page) < page_size or page[-1]['id'] <= last_submission_id:
+            return submissions
+        from_index += page_size
+
+async def afetch_new_submissions(handle, last_submission_id):
+    """
+    Async fetch_new_submissions.
+    """
+    page_size = INCREMENTAL_PAGE_SIZE if last_submission_id else FULL_SYNC_PAGE_SIZE
+    submissions = []
+    from_index = 1
+    while True:
+        page = await aget_user_status(handle, from_index=from_index, count=page_size)
+        submissions.extend(s for s in page if s['id'] > last_submission_id)
+        if len(page) < page_size or page[-1]['id'] <= last_submission_id:
+            return submissions
+        from_index += page_size
+
+def get_problem_ids(problems):
+    """
+    Map (contest_id, index) to Problem ids, creating rows for problems
+    missing from the mirror (e.g. gym problems). Those are created
+    outside the problemset and never listed.
+    """
+    Problem.objects.bulk_create(
+        [
+            Problem(
+                contest_id=p['contestId'],
+                index=p['index'],
+                name=p.get('name', ''),
+                rating=p.get('rating'),
+                tags=p.get('tags', []),
+            )
+            for p in problems.values()
+        ],
+        batch_size=SYNC_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+    contest_ids = {contest_id for contest_id, _ in problems}
+    return {
+        (contest_id, index): pk
+        for pk, contest_id, index in Problem.objects.filter(contest_id__in=contest_ids).values_list('id', 'contest_id', 'index')
+        if (contest_id, index) in problems
+    }
+
+def sync_user_submissions(user):
+    """
+    Fetch the user's submissions newer than user.last_submission_id and
+    upsert them into Submission. Returns the submissions written.
+    """
+    fetched = fetch_new_submissions(user.codeforces_handle, user.last_submission_id or 0)
+    return store_submissions(user, fetched)
+
+async def async_user_submissions(user):
+    """
+    sync_user_submissions with the Codeforces calls made on the event loop.
+    """
+    fetched = await afetch_new_submissions(user.codeforces_handle, user.last_submission_id or 0)
+    return await sync_to_async(store_submissions)(user, fetched)
+
+def store_submissions(user, fetched):
+    """
+    Upsert fetched user.status entries and advance the user's sync state.
+    """
+    # user.status offsets shift when new submissions arrive between pages,
+    # so an id can be fetched twice; the later copy has the newer verdict
+    fetched = list({s['id']: s for s in fetched if 'contestId' in s['problem']}.values())
+    submissions = []
+    if fetched:
+        problem_ids = get_problem_ids({(s['problem']['contestId'], s['problem']['index']): s['problem'] for s in fetched})
+        submissions = [
+            Submission(
+                user=user,
+                problem_id=problem_ids[(s['problem']['contestId'], s['problem']['index'])],
+                submission_id=s['id'],
+                verdict=s.get('verdict') or 'TESTING',
+                creation_time_seconds=s['creationTimeSeconds'],
+                programming_language=s['programmingLanguage'][:50],
+            )
+            for s in fetched
+        ]
+        with transaction.atomic():
+            stats = lock_stats(user)
+            accepted = newly_accepted(user, submissions)
+            Submission.objects.bulk_create(
+                submissions,
+                batch_size=SYNC_BATCH_SIZE,
+                update_conflicts=True,
+                unique_fields=['user', 'submission_id'],
+                update_fields=['verdict'],
+            )
+            record_solves(stats, accepted)
+        bump_version(submissions_version(user.id))
+
+        # Stop the mark below anything still being judged so it is re-fetched
+        pending = [s['id'] for s in fetched if s.get('verdict') in PENDING_VERDICTS]
+        user.last_submission_id = min(pending) - 1 if pending else max(s['id'] for s in fetched)
+
+    user.submissions_synced_at = timezone.now()
+    user.save(update_fields=['last_submission_id', 'submissions_synced_at'])
+    return submissions
+
+def needs_submission_sync(user):
+    if user.submissions_synced_at is None:
+        return True
+    return timezone.now() - user.submissions_synced_at > timedelta(seconds=SUBMISSION_SYNC_INTERVAL)
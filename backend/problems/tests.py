@@ -1,3 +1,152 @@
+import random
+from django.db import connection
+from django.db.models import F, Q
 from django.test import TestCase
+from users.models import User
+from .index import ProblemIndex
+from .models import Problem, Submission
+from .sync import store_submissions
 
-# Create your tests here.
+TAGS = ['dp', 'greedy', 'math', 'graphs', 'binary search']
+WORDS = ['tree', 'trees', 'array', 'game', 'string', 'queries', 'permutation', 'street']
+
+def tagged(problems, tags, match_all=True):
+    """
+    Queryset filter equivalent of the tag masks. SQLite has no JSON
+    containment lookup, so there the rows are filtered in Python.
+    """
+    if connection.features.supports_json_field_contains:
+        conditions = [Q(tags__contains=[tag]) for tag in tags]
+        return problems.filter(Q(*conditions, _connector=Q.AND if match_all else Q.OR))
+    test = all if match_all else any
+    return [p for p in problems if test(tag in p.tags for tag in tags)]
+
+def keys(problems):
+    return [(p.contest_id, p.index) if isinstance(p, Problem) else (p['contestId'], p['index']) for p in problems]
+
+class ProblemIndexTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        rng = random.Random(0)
+        Problem.objects.bulk_create([
+            Problem(
+                contest_id=contest_id,
+                index=index,
+                name=' '.join(rng.sample(WORDS, 2)).title(),
+                rating=rng.choice([None, *range(800, 3600, 100)]),
+                tags=rng.sample(TAGS, rng.randint(0, 3)),
+                solved_count=rng.randint(0, 50000),
+                in_problemset=True,
+            )
+            for contest_id in range(1, 31)
+            for index in 'ABC'
+        ])
+        cls.user = User.objects.create_user('solver', password='x')
+        solved = Problem.objects.order_by('id')[::7]
+        Submission.objects.bulk_create([
+            Submission(user=cls.user, problem=p, submission_id=n, verdict='OK', creation_time_seconds=n, programming_language='C++17')
+            for n, p in enumerate(solved, 1)
+        ])
+
+    def setUp(self):
+        self.index = ProblemIndex.build()
+
+    def search(self, **kwargs):
+        total, page = self.index.search(limit=self.index.size, **kwargs)
+        self.assertEqual(total, len(page))
+        return page
+
+    def test_default_order_matches_the_queryset(self):
+        self.assertEqual(keys(self.search()), keys(Problem.objects.order_by('-contest_id', '-index')))
+        self.assertEqual(keys(self.search(sort='contestId')), keys(Problem.objects.order_by('contest_id', 'index')))
+
+    def test_rating_sorts_keep_unrated_last(self):
+        for sort, order in (('rating', F('rating').asc(nulls_last=True)), ('-rating', F('rating').desc(nulls_last=True))):
+            expected = Problem.objects.order_by(order).values_list('rating', flat=True)
+            self.assertEqual([p['rating'] for p in self.search(sort=sort)], list(expected))
+
+    def test_rating_masks(self):
+        for low, high in ((1200, 2000), (None, 1000), (3000, None), (1500, 1500), (2000, 1000), (4000, None)):
+            expected = Problem.objects.all()
+            if low is not None:
+                expected = expected.filter(rating__gte=low)
+            if high is not None:
+                expected = expected.filter(rating__lte=high)
+            result = self.search(min_rating=low, max_rating=high)
+            self.assertEqual(sorted(keys(result)), sorted(keys(expected)), (low, high))
+
+    def test_tag_masks(self):
+        for tags in (['dp'], ['dp', 'math'], ['graphs', 'greedy', 'binary search'], ['unknown']):
+            for match_all in (True, False):
+                expected = tagged(Problem.objects.all(), tags, match_all)
+                result = self.search(tags=tags, match_all=match_all)
+                self.assertEqual(sorted(keys(result)), sorted(keys(expected)), (tags, match_all))
+
+    def test_combined_filters_and_paging(self):
+        expected = keys(tagged(
+            Problem.objects.filter(rating__gte=1000, rating__lte=2500).order_by('-contest_id', '-index'),
+            ['dp', 'greedy'],
+            match_all=False,
+        ))
+        filters = {'tags': ['dp', 'greedy'], 'match_all': False, 'min_rating': 1000, 'max_rating': 2500}
+        pages = []
+        for offset in range(0, len(expected) + 5, 5):
+            total, page = self.index.search(offset=offset, limit=5, **filters)
+            self.assertEqual(total, len(expected))
+            pages.extend(page)
+        self.assertEqual(keys(pages), expected)
+
+    def test_exclude_solved(self):
+        solved = Submission.objects.filter(user=self.user, verdict='OK').values_list('problem_id', flat=True)
+        exclude = self.index.id_mask(solved)
+        expected = Problem.objects.exclude(id__in=solved).order_by('-contest_id', '-index')
+        self.assertEqual(keys(self.search(exclude=exclude)), keys(expected))
+
+    def test_text_prefixes_match_name_words(self):
+        # No tag contains these words, so only names can match
+        for query in ('tree', 'tre', 'str', 'game perm', 'rray'):
+            conditions = [Q(name__iregex=rf'(^|[^a-z0-9]){term}') for term in query.split()]
+            expected = Problem.objects.filter(*conditions)
+            self.assertEqual(sorted(keys(self.search(query=query))), sorted(keys(expected)), query)
+
+    def test_text_matches_tags(self):
+        expected = tagged(Problem.objects.all(), ['binary search'])
+        self.assertTrue(expected)
+        self.assertEqual(sorted(keys(self.search(query='sear'))), sorted(keys(expected)))
+
+    def test_problems_outside_the_problemset_are_not_listed(self):
+        store_submissions(self.user, [{
+            'id': 1000,
+            'problem': {'contestId': 104000, 'index': 'A', 'name': 'Gym problem'},
+            'verdict': 'OK',
+            'creationTimeSeconds': 1000,
+            'programmingLanguage': 'C++17',
+        }])
+        index = ProblemIndex.build()
+        self.assertEqual(index.size, Problem.objects.filter(in_problemset=True).count())
+        self.assertIsNone(index.problem_id(104000, 'A'))
+        self.assertEqual(keys(index.search(limit=1)[1]), [(30, 'C')])
+
+class SubmissionSyncTests(TestCase):
+    def fetched(self, submission_id, verdict='OK'):
+        return {
+            'id': submission_id,
+            'problem': {'contestId': 1, 'index': 'A', 'name': 'Problem A'},
+            'verdict': verdict,
+            'creationTimeSeconds': submission_id,
+            'programmingLanguage': 'C++17',
+        }
+
+    def test_accounts_sharing_a_handle_each_own_the_history(self):
+        first, second = (User.objects.create_user(name, password='x', codeforces_handle='tourist') for name in ('first', 'second'))
+        for user in (first, second):
+            store_submissions(user, [self.fetched(10), self.fetched(11)])
+        for user in (first, second):
+            self.assertEqual(sorted(Submission.objects.filter(user=user).values_list('submission_id', flat=True)), [10, 11])
+
+    def test_submissions_fetched_twice_are_stored_once(self):
+        user = User.objects.create_user('solver', password='x', codeforces_handle='solver')
+        # Shifted offsets: the same id on two pages, the later copy judged
+        store_submissions(user, [self.fetched(11), self.fetched(10, 'TESTING'), self.fetched(10)])
+        self.assertEqual(dict(Submission.objects.filter(user=user).values_list('submission_id', 'verdict')), {10: 'OK', 11: 'OK'})
+        self.assertEqual(user.last_submission_id, 11)
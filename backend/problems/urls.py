@@ -1,7 +1,8 @@
 from django.urls import path
-from .views import ProblemListView, BookmarkView
+from .views import ProblemListView, BookmarkView, RecommendationView
 
 urlpatterns = [
     path('', ProblemListView.as_view(), name='problem_list'),
     path('bookmark/', BookmarkView.as_view(), name='bookmark'),
+    path('recommendations/', RecommendationView.as_view(), name='recommendations'),
 ]
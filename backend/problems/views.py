@@ -1,69 +1,121 @@
+from asgiref.sync import sync_to_async
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import permissions
-from utils.codeforces import get_problems
+from utils.conditional import Validators
+from utils.views import AsyncAPIView
+from .index import PROBLEMS_VERSION, RELEVANCE_SORT, get_problem_index
+from .models import Problem
+from .recommend import recommend
+from .status import get_problem_status
+from .sync import submissions_version, sync_problemset
 
-class ProblemListView(APIView):
+class ProblemListView(AsyncAPIView):
     permission_classes = (permissions.IsAuthenticated,)
+    page_size = 20
 
-    def get(self, request):
+    async def get(self, request):
         tags = request.query_params.get('tags')
         if tags:
-            tags = tags.split(',')
+            tags = [tag.strip() for tag in tags.split(',') if tag.strip()]
         
         try:
-            # Fetch problems from CF
-            data = get_problems(tags=tags)
-            problems = data['problems']
-            problem_stats = {f"{p['contestId']}{p['index']}": s for p, s in zip(data['problems'], data['problemStatistics'])}
-            
-            # Merge stats
-            result = []
-            for p in problems:
-                key = f"{p['contestId']}{p['index']}"
-                stats = problem_stats.get(key, {})
-                p['solvedCount'] = stats.get('solvedCount', 0)
-                result.append(p)
+            # Fill an empty mirror once, after that sync_problems keeps it fresh
+            if not await Problem.objects.filter(in_problemset=True).aexists():
+                await sync_to_async(sync_problemset)()
+
+            # Rows carry the user's solved status, so their submissions count too
+            validators = await sync_to_async(Validators)([PROBLEMS_VERSION, submissions_version(request.user.id)])
+            not_modified = validators.not_modified(request)
+            if not_modified is not None:
+                return not_modified
+
+            # A rebuild after a problemset sync reads the database
+            index = await sync_to_async(get_problem_index)()
+
+            sort = request.query_params.get('sort')
+            if sort and sort != RELEVANCE_SORT and sort not in index.orders:
+                return Response({'error': f'Invalid sort: {sort}'}, status=400)
 
             # Filter by rating
             min_rating = request.query_params.get('min_rating')
             max_rating = request.query_params.get('max_rating')
 
-            filtered_results = []
-            for p in result:
-                rating = p.get('rating')
-                if min_rating and (rating is None or rating < int(min_rating)):
-                    continue
-                if max_rating and (rating is None or rating > int(max_rating)):
-                    continue
-                filtered_results.append(p)
-            
-            result = filtered_results
+            problem_status = await sync_to_async(get_problem_status)(request.user)
+            hide_solved = request.query_params.get('hide_solved') in ('1', 'true')
 
             # Pagination (simple)
             page = int(request.query_params.get('page', 1))
-            page_size = 20
-            start = (page - 1) * page_size
-            end = start + page_size
+            count, results = index.search(
+                tags=tags,
+                match_all=request.query_params.get('tags_mode', 'and') != 'or',
+                min_rating=int(min_rating) if min_rating else None,
+                max_rating=int(max_rating) if max_rating else None,
+                query=request.query_params.get('q'),
+                exclude=index.id_mask(problem_status.solved_ids) if hide_solved else 0,
+                sort=sort,
+                offset=(page - 1) * self.page_size,
+                limit=self.page_size,
+            )
+            
+            # Rows are shared by every request, annotate copies
+            results = [
+                {**row, 'status': problem_status.status(index.problem_id(row['contestId'], row['index']))}
+                for row in results
+            ]
             
-            return Response({
-                'count': len(result),
-                'results': result[start:end]
-            })
+            return validators.apply(Response({
+                'count': count,
+                'results': results
+            }))
+        except Exception as e:
+            return Response({'error': str(e)}, status=500)
+
+class RecommendationView(APIView):
+    permission_classes = (permissions.IsAuthenticated,)
+    default_count = 10
+    max_count = 50
+
+    def get(self, request):
+        try:
+            count = int(request.query_params.get('count', self.default_count))
+            return Response(recommend(request.user, max(1, min(count, self.max_count))))
+        except ValueError as e:
+            return Response({'error': str(e)}, status=400)
         except Exception as e:
             return Response({'error': str(e)}, status=500)
 
 from .models import Bookmark
 from .serializers import BookmarkSerializer
-from rest_framework import status
+from utils.versions import bump_version
+
+def bookmarks_version(user_id):
+    """
+    Version name bumped whenever the user adds or removes a bookmark.
+    """
+    return f'bookmarks:{user_id}'
 
 class BookmarkView(APIView):
     permission_classes = (permissions.IsAuthenticated,)
 
     def get(self, request):
+        validators = Validators([
+            bookmarks_version(request.user.id),
+            PROBLEMS_VERSION,
+            submissions_version(request.user.id),
+        ])
+        not_modified = validators.not_modified(request)
+        if not_modified is not None:
+            return not_modified
+
         bookmarks = Bookmark.objects.filter(user=request.user).order_by('-created_at')
         serializer = BookmarkSerializer(bookmarks, many=True)
-        return Response(serializer.data)
+        index = get_problem_index()
+        problem_status = get_problem_status(request.user)
+        data = serializer.data
+        for bookmark in data:
+            bookmark['status'] = problem_status.status(index.problem_id(bookmark['contest_id'], bookmark['index']))
+        return validators.apply(Response(data))
 
     def post(self, request):
         contest_id = request.data.get('contest_id')
@@ -84,6 +136,9 @@ class BookmarkView(APIView):
         if not created:
             # If exists, delete it (toggle behavior)
             bookmark.delete()
+        # Only after the write, so no read of the old rows gets the new ETag
+        bump_version(bookmarks_version(request.user.id))
+        if not created:
             return Response({'status': 'removed'})
         
         return Response({'status': 'added', 'bookmark': BookmarkSerializer(bookmark).data}, status=201)
@@ -3,3 +3,9 @@ from django.apps import AppConfig
 
 class UsersConfig(AppConfig):
     name = 'users'
+
+    def ready(self):
+        from . import search, sync
+
+        search.connect_signals()
+        sync.connect_signals()
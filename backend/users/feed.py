@@ -0,0 +1,104 @@
+import hashlib
+import heapq
+from itertools import islice
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Q
+from problems.models import Submission
+from problems.sync import submissions_version
+from utils.pagination import decode_cursor, encode_cursor
+from utils.versions import get_versions
+from .models import Friendship
+from .serializers import FeedItemSerializer
+
+FEED_PAGE_SIZE = 50
+FEED_MAX_PAGE_SIZE = 200
+FEED_CACHE_TIMEOUT = 300
+# Friends merged per query, well below SQLite's 500 term compound select cap
+FEED_STREAMS_PER_QUERY = 100
+
+def friends_version(user_id):
+    """
+    Version name bumped whenever the user's friend list changes.
+    """
+    return f'friends:{user_id}'
+
+def feed_cache_key(user, friend_ids, params):
+    # Any friend syncing new submissions or a friend list change yields a new key
+    names = [friends_version(user.id)] + [submissions_version(friend_id) for friend_id in friend_ids]
+    versions = get_versions(names)
+    digest = hashlib.sha1(repr((params, [versions[name] for name in names])).encode()).hexdigest()
+    return f'feed:{user.id}:{digest}'
+
+def friend_stream(friend_id, verdict, cursor, limit):
+    """
+    One friend's submissions past the cursor, newest first, served
+    straight from the per-user (creation time, id) index.
+    """
+    submissions = (
+        Submission.objects
+        .filter(user_id=friend_id)
+        .order_by('-creation_time_seconds', '-submission_id')
+        .values_list('id', 'creation_time_seconds', 'submission_id')
+    )
+    if verdict:
+        submissions = submissions.filter(verdict=verdict)
+    if cursor:
+        created, submission_id = cursor
+        submissions = submissions.filter(
+            Q(creation_time_seconds__lt=created) |
+            Q(creation_time_seconds=created, submission_id__lt=submission_id)
+        )
+    return submissions[:limit]
+
+def merge_streams(streams, limit):
+    """
+    UNION ALL of the limited streams, cut down to the newest rows.
+    Returns (id, creation time, submission id) rows newest first.
+    """
+    parts, params = [], []
+    for n, stream in enumerate(streams):
+        sql, stream_params = stream.query.get_compiler(using=stream.db).as_sql()
+        parts.append(f'SELECT * FROM ({sql}) AS stream{n}')
+        params.extend(stream_params)
+    sql = ' UNION ALL '.join(parts) + ' ORDER BY 2 DESC, 3 DESC LIMIT %s'
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [*params, limit])
+        return cursor.fetchall()
+
+def build_feed_page(friend_ids, verdict=None, cursor=None, limit=FEED_PAGE_SIZE):
+    """
+    Friends' submissions newest first. Only the first limit + 1 rows of
+    each friend's stream can reach the page, so each is cut there before
+    the streams are merged. Returns (items, next cursor or None).
+    """
+    if cursor:
+        cursor = decode_cursor(cursor, (int, int))
+    batches = [
+        merge_streams([friend_stream(friend_id, verdict, cursor, limit + 1) for friend_id in friend_ids[i:i + FEED_STREAMS_PER_QUERY]], limit + 1)
+        for i in range(0, len(friend_ids), FEED_STREAMS_PER_QUERY)
+    ]
+    rows = list(islice(heapq.merge(*batches, key=lambda row: row[1:], reverse=True), limit + 1))
+
+    submissions = Submission.objects.select_related('problem', 'user').in_bulk([row[0] for row in rows[:limit]])
+    page = [submissions[row[0]] for row in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit:
+        last = page[-1]
+        next_cursor = encode_cursor(last.creation_time_seconds, last.submission_id)
+    return FeedItemSerializer(page, many=True).data, next_cursor
+
+def get_feed_page(user, verdict=None, cursor=None, limit=FEED_PAGE_SIZE):
+    """
+    Cached build_feed_page for the people the user follows.
+    """
+    friend_ids = list(Friendship.objects.filter(from_user=user).values_list('to_user_id', flat=True))
+    if not friend_ids:
+        return [], None
+
+    key = feed_cache_key(user, friend_ids, (verdict, cursor, limit))
+    page = cache.get(key)
+    if page is None:
+        page = build_feed_page(friend_ids, verdict, cursor, limit)
+        cache.set(key, page, FEED_CACHE_TIMEOUT)
+    return page
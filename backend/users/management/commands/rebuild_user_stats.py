@@ -0,0 +1,21 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from users.stats import rebuild_stats
+
+User = get_user_model()
+
+class Command(BaseCommand):
+    help = 'Recomputes materialized solve stats from stored submissions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('usernames', nargs='*', help='Only rebuild these users')
+
+    def handle(self, *args, **options):
+        users = User.objects.all()
+        if options['usernames']:
+            users = users.filter(username__in=options['usernames'])
+
+        for user in users.iterator():
+            stats = rebuild_stats(user)
+            self.stdout.write(f'{user.username}: {stats.solved_count} solved')
+        self.stdout.write(self.style.SUCCESS('Stats rebuilt'))
@@ -0,0 +1,32 @@
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from users.sync import PROFILE_BATCH_SIZE, refresh_profiles, stale_profiles
+
+class Command(BaseCommand):
+    help = 'Refreshes Codeforces rating, rank and avatar of linked users, stalest first'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=PROFILE_BATCH_SIZE)
+        parser.add_argument('--max-age', type=int, default=3600,
+                            help='Only refresh profiles older than this many seconds')
+        parser.add_argument('--limit', type=int, default=None,
+                            help='Refresh at most this many users per run')
+        parser.add_argument('--interval', type=int, default=None,
+                            help='Keep running, refreshing every this many seconds')
+
+    def handle(self, *args, **options):
+        while True:
+            users = stale_profiles(timedelta(seconds=options['max_age']))
+            if options['limit']:
+                users = users[:options['limit']]
+
+            try:
+                count = refresh_profiles(users, batch_size=options['batch_size'])
+                self.stdout.write(self.style.SUCCESS(f'Refreshed {count} profiles'))
+            except Exception as e:
+                self.stdout.write(self.style.ERROR(f'Profile refresh failed: {e}'))
+
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
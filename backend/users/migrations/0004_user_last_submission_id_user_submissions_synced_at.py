@@ -0,0 +1,23 @@
+# Generated by Django 6.0.2 on 2026-10-18 14:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_friendship'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='last_submission_id',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='submissions_synced_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 6.0.2 on 2026-10-18 15:04
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+SEARCH_FIELDS = ['username', 'first_name', 'last_name', 'codeforces_handle']
+
+
+def create_search_indexes(apps, schema_editor):
+    # Prefix and trigram indexes only exist on PostgreSQL, other databases
+    # are served by the in-process index in users.search
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for field in SEARCH_FIELDS:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS user_{field}_prefix_idx '
+            f'ON users_user (LOWER({field}::text) text_pattern_ops)'
+        )
+        # Matches the UPPER(...) LIKE UPPER(...) that __icontains compiles to
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS user_{field}_trgm_idx '
+            f'ON users_user USING gin (UPPER({field}::text) gin_trgm_ops)'
+        )
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for field in SEARCH_FIELDS:
+        schema_editor.execute(f'DROP INDEX IF EXISTS user_{field}_prefix_idx')
+        schema_editor.execute(f'DROP INDEX IF EXISTS user_{field}_trgm_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('users', '0005_userstats_dailysolves'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(django.db.models.functions.text.Lower('codeforces_handle'), name='user_handle_lower_idx'),
+        ),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -1,5 +1,6 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.db.models.functions import Lower
 
 class User(AbstractUser):
     codeforces_handle = models.CharField(max_length=50, blank=True, null=True)
@@ -12,7 +13,17 @@ class User(AbstractUser):
     max_rank = models.CharField(max_length=50, null=True, blank=True)
     last_updated = models.DateTimeField(null=True, blank=True)
     avatar = models.URLField(null=True, blank=True)
-    
+
+    # Submission sync state: newest submission_id known to be final
+    last_submission_id = models.IntegerField(null=True, blank=True)
+    submissions_synced_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Case-insensitive handle lookups, see users.search.lowered_fields
+            models.Index(Lower('codeforces_handle'), name='user_handle_lower_idx'),
+        ]
+
     def __str__(self):
         return self.username
 
@@ -26,3 +37,33 @@ class Friendship(models.Model):
 
     def __str__(self):
         return f"{self.from_user} follows {self.to_user}"
+
+class UserStats(models.Model):
+    """
+    Solve aggregates per user, maintained incrementally by the submission
+    sync so leaderboards never count submissions at read time.
+    """
+    user = models.OneToOneField(User, primary_key=True, related_name='stats', on_delete=models.CASCADE)
+    solved_count = models.IntegerField(default=0)
+    solved_7d = models.IntegerField(default=0)
+    solved_30d = models.IntegerField(default=0)
+    # Day the 7/30 day windows were last computed for
+    windows_date = models.DateField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Stats of {self.user}"
+
+class DailySolves(models.Model):
+    """
+    Number of problems a user solved for the first time on a given day.
+    """
+    user = models.ForeignKey(User, related_name='daily_solves', on_delete=models.CASCADE)
+    day = models.DateField()
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('user', 'day')
+
+    def __str__(self):
+        return f"{self.user} solved {self.count} on {self.day}"
@@ -0,0 +1,198 @@
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import Q
+from django.db.models.functions import Lower
+from django.db.models.signals import post_delete, post_save
+from utils.versions import bump_version, get_version
+
+User = get_user_model()
+
+USERS_VERSION = 'users'
+# Rebuild at least this often even without a version bump
+INDEX_MAX_AGE = 300
+SEARCH_LIMIT = 10
+# Fields matched by type-ahead search, exact matches only count on the first two
+SEARCH_FIELDS = ('codeforces_handle', 'username', 'first_name', 'last_name')
+EXACT_FIELDS = ('codeforces_handle', 'username')
+
+def lowered_fields(fields):
+    """
+    LOWER(field) aliases named <field>_lower, matching the functional indexes.
+    """
+    return {f'{field}_lower': Lower(field) for field in fields}
+
+def find_user(query):
+    """
+    User whose username is `query` or whose handle matches it ignoring case.
+    """
+    return (
+        User.objects.alias(**lowered_fields(['codeforces_handle']))
+        .filter(Q(username=query) | Q(codeforces_handle_lower=query.lower()))
+        .first()
+    )
+
+def trigrams(value):
+    return {value[i:i + 3] for i in range(len(value) - 2)}
+
+class UserSearchIndex:
+    """
+    Immutable in-memory index for databases without trigram support.
+
+    Every lowercased search field is stored in one sorted key list, which
+    serves prefix queries like a flattened trie: all keys starting with a
+    prefix form one contiguous run found by bisection. Substring queries
+    intersect per-trigram posting arrays and verify the survivors.
+    """
+    def __init__(self, users, version=None):
+        self.version = version
+        self.built_at = time.monotonic()
+        self.users = users
+
+        self.exact = {}
+        entries = set()
+        postings = {}
+        for doc, user in enumerate(users):
+            for field in SEARCH_FIELDS:
+                value = (user[field] or '').lower()
+                if not value:
+                    continue
+                entries.add((value, doc))
+                if field in EXACT_FIELDS:
+                    self.exact.setdefault(value, []).append(doc)
+                for gram in trigrams(value):
+                    docs = postings.get(gram)
+                    if docs is None:
+                        postings[gram] = array('I', [doc])
+                    elif docs[-1] != doc:
+                        # Docs arrive in order, so postings stay sorted
+                        docs.append(doc)
+
+        entries = sorted(entries)
+        self.keys = [value for value, _ in entries]
+        self.docs = array('I', [doc for _, doc in entries])
+        self.grams = postings
+
+    @classmethod
+    def build(cls, version=None):
+        rows = User.objects.values('id', *SEARCH_FIELDS)
+        return cls(list(rows.iterator(chunk_size=2000)), version)
+
+    def prefix_docs(self, prefix):
+        """
+        Docs with a field starting with `prefix`, in key order.
+        """
+        start = bisect_left(self.keys, prefix)
+        for position in range(start, len(self.keys)):
+            if not self.keys[position].startswith(prefix):
+                return
+            yield self.docs[position]
+
+    def substring_docs(self, query):
+        if len(query) < 3:
+            return []
+        lists = sorted((self.grams.get(gram, ()) for gram in trigrams(query)), key=len)
+        candidates = set(lists[0])
+        for other in lists[1:]:
+            candidates.intersection_update(other)
+            if not candidates:
+                return []
+        return sorted(
+            (doc for doc in candidates
+             if any(query in (self.users[doc][field] or '').lower() for field in SEARCH_FIELDS)),
+            key=lambda doc: self.users[doc]['username'],
+        )
+
+    def search(self, query, limit=SEARCH_LIMIT):
+        """
+        User ids ranked exact handle/username match first, then prefix,
+        then substring matches.
+        """
+        query = query.lower()
+        ranked = {}
+        for tier in (self.exact.get(query, []), self.prefix_docs(query), self.substring_docs(query)):
+            for doc in tier:
+                ranked.setdefault(doc, None)
+                if len(ranked) == limit:
+                    return [self.users[doc]['id'] for doc in ranked]
+        return [self.users[doc]['id'] for doc in ranked]
+
+_index = None
+_build_lock = threading.Lock()
+
+def rebuild_user_index(version):
+    global _index
+    try:
+        _index = UserSearchIndex.build(version)
+    except Exception:
+        # Keep serving the previous index, the next request retries
+        pass
+    finally:
+        connection.close()
+        _build_lock.release()
+
+def get_user_index():
+    """
+    Current index. Once one exists, a stale index is rebuilt on a
+    background thread and the previous one keeps serving meanwhile, so
+    a new sign-up never makes a type-ahead request wait for a rebuild.
+    """
+    global _index
+    version = get_version(USERS_VERSION)
+    index = _index
+    if index is not None and index.version == version and time.monotonic() - index.built_at < INDEX_MAX_AGE:
+        return index
+
+    if index is None:
+        with _build_lock:
+            if _index is None:
+                _index = UserSearchIndex.build(version)
+            return _index
+
+    if _build_lock.acquire(blocking=False):
+        threading.Thread(target=rebuild_user_index, args=(version,), daemon=True).start()
+    return index
+
+def search_database(query, limit=SEARCH_LIMIT):
+    """
+    Ranked search served by the PostgreSQL LOWER(...) pattern and trigram
+    indexes, one indexed query per tier.
+    """
+    lowered = query.lower()
+    tiers = [
+        Q(codeforces_handle_lower=lowered) | Q(username_lower=lowered),
+        Q(*[Q(**{f'{field}_lower__startswith': lowered}) for field in SEARCH_FIELDS], _connector=Q.OR),
+    ]
+    if len(lowered) >= 3:
+        tiers.append(Q(*[Q(**{f'{field}__icontains': query}) for field in SEARCH_FIELDS], _connector=Q.OR))
+
+    users = User.objects.alias(**lowered_fields(SEARCH_FIELDS))
+    ranked = {}
+    for condition in tiers:
+        for user_id in users.filter(condition).exclude(pk__in=list(ranked)).order_by('username').values_list('id', flat=True)[:limit - len(ranked)]:
+            ranked[user_id] = None
+        if len(ranked) == limit:
+            break
+    return list(ranked)
+
+def search_users(query, limit=SEARCH_LIMIT):
+    """
+    Ranked users matching `query` on handle, username or name.
+    """
+    if connection.vendor == 'postgresql':
+        ids = search_database(query, limit)
+    else:
+        ids = get_user_index().search(query, limit)
+    users = User.objects.in_bulk(ids)
+    return [users[user_id] for user_id in ids if user_id in users]
+
+def bump_users_version(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or set(update_fields) & set(SEARCH_FIELDS):
+        bump_version(USERS_VERSION)
+
+def connect_signals():
+    post_save.connect(bump_users_version, sender=User, dispatch_uid='user_search_saved_user')
+    post_delete.connect(bump_users_version, sender=User, dispatch_uid='user_search_deleted_user')
@@ -1,12 +1,15 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from problems.serializers import SubmissionSerializer
 
 User = get_user_model()
 
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
-        fields = ('id', 'username', 'email', 'codeforces_handle', 'is_verified')
+        fields = ('id', 'username', 'email', 'codeforces_handle', 'is_verified',
+                  'rating', 'rank', 'max_rating', 'max_rank', 'avatar', 'last_updated')
+        read_only_fields = ('rating', 'rank', 'max_rating', 'max_rank', 'avatar', 'last_updated')
 
 class RegisterSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True)
@@ -23,3 +26,11 @@ class RegisterSerializer(serializers.ModelSerializer):
             codeforces_handle=validated_data.get('codeforces_handle', '')
         )
         return user
+
+class FeedItemSerializer(SubmissionSerializer):
+    username = serializers.CharField(source='user.username')
+    handle = serializers.CharField(source='user.codeforces_handle')
+    avatar = serializers.CharField(source='user.avatar')
+
+    class Meta(SubmissionSerializer.Meta):
+        fields = ['username', 'handle', 'avatar'] + SubmissionSerializer.Meta.fields
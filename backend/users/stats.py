@@ -0,0 +1,205 @@
+from collections import Counter
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.db import transaction
+from django.db.models import Min, Q
+from django.utils import timezone
+from problems.models import Submission
+from .models import DailySolves, Friendship, User, UserStats
+
+# Rolling solve windows, field -> length in days (today included)
+WINDOWS = {'solved_7d': 7, 'solved_30d': 30}
+LONGEST_WINDOW = max(WINDOWS.values())
+
+def solve_day(creation_time_seconds):
+    return datetime.fromtimestamp(creation_time_seconds, tz=dt_timezone.utc).date()
+
+def today():
+    return timezone.now().astimezone(dt_timezone.utc).date()
+
+def window_counts(daily, day):
+    """
+    Sum (day, count) pairs into the rolling windows ending on `day`.
+    """
+    counts = dict.fromkeys(WINDOWS, 0)
+    for solved_on, count in daily:
+        age = (day - solved_on).days
+        for field, length in WINDOWS.items():
+            if 0 <= age < length:
+                counts[field] += count
+    return counts
+
+def lock_stats(user):
+    """
+    The user's stats row, locked for the rest of the transaction so
+    concurrent syncs of the same user apply their solves one at a time.
+    """
+    UserStats.objects.get_or_create(user=user)
+    return UserStats.objects.select_for_update().get(user=user)
+
+def newly_accepted(user, submissions):
+    """
+    Submissions about to be written that are accepted and were not stored
+    as accepted before. Must run before the submissions are upserted.
+    """
+    accepted = [s for s in submissions if s.verdict == 'OK']
+    if not accepted:
+        return []
+    stored = set(
+        Submission.objects
+        .filter(user=user, submission_id__in=[s.submission_id for s in accepted], verdict='OK')
+        .values_list('submission_id', flat=True)
+    )
+    return [s for s in accepted if s.submission_id not in stored]
+
+def record_solves(stats, accepted):
+    """
+    Fold newly accepted submissions into the stats and daily solve counts.
+    Problems the user had already solved earlier are ignored. Returns the
+    number of problems solved for the first time.
+    """
+    first_solves = {}
+    for s in accepted:
+        if s.problem_id not in first_solves or s.creation_time_seconds < first_solves[s.problem_id]:
+            first_solves[s.problem_id] = s.creation_time_seconds
+    if not first_solves:
+        return 0
+
+    already_solved = set(
+        Submission.objects
+        .filter(user_id=stats.user_id, problem_id__in=first_solves, verdict='OK')
+        .exclude(submission_id__in=[s.submission_id for s in accepted])
+        .values_list('problem_id', flat=True)
+        .distinct()
+    )
+    days = Counter(
+        solve_day(created)
+        for problem_id, created in first_solves.items()
+        if problem_id not in already_solved
+    )
+    if not days:
+        return 0
+
+    existing = dict(
+        DailySolves.objects
+        .filter(user_id=stats.user_id, day__in=days)
+        .values_list('day', 'count')
+    )
+    DailySolves.objects.bulk_create(
+        [DailySolves(user_id=stats.user_id, day=day, count=existing.get(day, 0) + count) for day, count in days.items()],
+        update_conflicts=True,
+        unique_fields=['user', 'day'],
+        update_fields=['count'],
+    )
+
+    solved = sum(days.values())
+    stats.solved_count += solved
+    apply_windows([stats])
+    stats.save()
+    return solved
+
+def apply_windows(stats_list, day=None):
+    """
+    Recompute the rolling windows of the given stats rows from their daily
+    counts, with one query for all of them.
+    """
+    day = day or today()
+    daily = {}
+    for user_id, solved_on, count in (
+        DailySolves.objects
+        .filter(user_id__in=[s.user_id for s in stats_list], day__gt=day - timedelta(days=LONGEST_WINDOW))
+        .values_list('user_id', 'day', 'count')
+    ):
+        daily.setdefault(user_id, []).append((solved_on, count))
+
+    for stats in stats_list:
+        for field, value in window_counts(daily.get(stats.user_id, []), day).items():
+            setattr(stats, field, value)
+        stats.windows_date = day
+
+def refresh_windows(stats_list, day=None):
+    """
+    Bring windows computed on an earlier day up to date. Only the window
+    columns are written, so a concurrent sync's solved count is kept.
+    """
+    if not stats_list:
+        return
+    apply_windows(stats_list, day)
+    for stats in stats_list:
+        stats.updated_at = timezone.now()
+    UserStats.objects.bulk_update(stats_list, [*WINDOWS, 'windows_date', 'updated_at'])
+
+def rebuild_stats(user):
+    """
+    Recompute the user's aggregates from all stored submissions.
+    """
+    first_solves = (
+        Submission.objects
+        .filter(user=user, verdict='OK')
+        .values('problem_id')
+        .annotate(first=Min('creation_time_seconds'))
+        .values_list('first', flat=True)
+    )
+    days = Counter(solve_day(created) for created in first_solves)
+
+    with transaction.atomic():
+        stats = lock_stats(user)
+        DailySolves.objects.filter(user=user).delete()
+        DailySolves.objects.bulk_create([DailySolves(user=user, day=day, count=count) for day, count in days.items()])
+        stats.solved_count = sum(days.values())
+        apply_windows([stats])
+        stats.save()
+    return stats
+
+# Leaderboard sort name -> attribute, highest first
+LEADERBOARD_SORTS = {
+    'rating': 'rating',
+    'max_rating': 'max_rating',
+    'solved': 'solved_count',
+    'solved_7d': 'solved_7d',
+    'solved_30d': 'solved_30d',
+}
+
+def leaderboard(user, sort='rating'):
+    """
+    The user and everyone they follow, ranked by `sort`. Reads users and
+    their materialized stats in one query; windows last computed on an
+    earlier day are refreshed with one more.
+    """
+    following = Friendship.objects.filter(from_user=user).values('to_user')
+    members = list(User.objects.filter(Q(pk__in=following) | Q(pk=user.pk)).select_related('stats'))
+
+    day = today()
+    stats = {}
+    stale = []
+    for member in members:
+        try:
+            stats[member.pk] = member.stats
+        except UserStats.DoesNotExist:
+            # Never synced, nothing solved as far as we know
+            stats[member.pk] = UserStats(user=member)
+            continue
+        if member.stats.windows_date != day:
+            stale.append(member.stats)
+    refresh_windows(stale, day)
+
+    rows = [
+        {
+            'username': member.username,
+            'handle': member.codeforces_handle,
+            'avatar': member.avatar,
+            'rating': member.rating,
+            'rank': member.rank,
+            'max_rating': member.max_rating,
+            'max_rank': member.max_rank,
+            'solved_count': stats[member.pk].solved_count,
+            'solved_7d': stats[member.pk].solved_7d,
+            'solved_30d': stats[member.pk].solved_30d,
+            'is_self': member.pk == user.pk,
+        }
+        for member in members
+    ]
+    key = LEADERBOARD_SORTS[sort]
+    rows.sort(key=lambda row: (row[key] is None, -(row[key] or 0), row['username']))
+    for position, row in enumerate(rows, 1):
+        row['position'] = position
+    return rows
@@ -0,0 +1,90 @@
+import re
+from django.contrib.auth import get_user_model
+from django.db.models import F, Q
+from django.db.models.signals import post_save
+from django.utils import timezone
+from utils.codeforces import CodeforcesError, get_user_info
+from utils.versions import bump_version
+
+User = get_user_model()
+
+# user.info accepts up to 10000 handles, keep URLs reasonably short
+PROFILE_BATCH_SIZE = 300
+PROFILE_FIELDS = ['rating', 'rank', 'max_rating', 'max_rank', 'avatar', 'last_updated']
+UNKNOWN_HANDLE_RE = re.compile(r'User with handle (\S+) not found')
+# Bumped whenever any user's public profile may have changed
+PROFILES_VERSION = 'profiles'
+# Fields shown in profile listings such as the friend list
+LISTED_FIELDS = {'username', 'email', 'codeforces_handle', 'is_verified', *PROFILE_FIELDS}
+
+def apply_user_info(user, info):
+    """
+    Copy a user.info entry onto the User, without saving.
+    """
+    user.rating = info.get('rating')
+    user.rank = info.get('rank')
+    user.max_rating = info.get('maxRating')
+    user.max_rank = info.get('maxRank')
+    user.avatar = info.get('titlePhoto') or info.get('avatar')
+    user.last_updated = timezone.now()
+
+def fetch_user_infos(handles):
+    """
+    user.info for a batch of handles. The whole call fails when one handle
+    does not exist, so drop the reported handle and retry with the rest.
+    """
+    handles = list(handles)
+    while handles:
+        try:
+            return get_user_info(handles, use_cache=False)
+        except CodeforcesError as e:
+            match = UNKNOWN_HANDLE_RE.search(str(e))
+            if not match or match.group(1) not in handles:
+                raise
+            handles.remove(match.group(1))
+    return []
+
+def stale_profiles(max_age):
+    """
+    Users with a linked handle whose profile is older than max_age,
+    never-refreshed ones first.
+    """
+    cutoff = timezone.now() - max_age
+    return (
+        User.objects
+        .exclude(codeforces_handle__isnull=True)
+        .exclude(codeforces_handle='')
+        .filter(Q(last_updated__isnull=True) | Q(last_updated__lt=cutoff))
+        .order_by(F('last_updated').asc(nulls_first=True), 'id')
+    )
+
+def refresh_profiles(users, batch_size=PROFILE_BATCH_SIZE):
+    """
+    Refresh rating, rank and avatar of the given users with one user.info
+    call and one bulk_update per batch. Returns the number of users refreshed.
+    """
+    users = list(users)
+    refreshed = 0
+    for start in range(0, len(users), batch_size):
+        batch = users[start:start + batch_size]
+        by_handle = {u.codeforces_handle.lower(): u for u in batch}
+        for info in fetch_user_infos(u.codeforces_handle for u in batch):
+            user = by_handle.pop(info['handle'].lower(), None)
+            if user is not None:
+                apply_user_info(user, info)
+                refreshed += 1
+        # Stamp unknown handles too, so they don't stay at the head of the queue
+        now = timezone.now()
+        for user in by_handle.values():
+            user.last_updated = now
+        User.objects.bulk_update(batch, PROFILE_FIELDS)
+    if users:
+        bump_version(PROFILES_VERSION)
+    return refreshed
+
+def bump_profiles_version(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or set(update_fields) & LISTED_FIELDS:
+        bump_version(PROFILES_VERSION)
+
+def connect_signals():
+    post_save.connect(bump_profiles_version, sender=User, dispatch_uid='user_profiles_saved_user')
@@ -1,3 +1,130 @@
+from datetime import date, timedelta
+from unittest import mock
 from django.test import TestCase
+from problems.models import Submission
+from problems.sync import store_submissions
+from .feed import build_feed_page
+from .models import DailySolves, User, UserStats
+from .stats import apply_windows, rebuild_stats, solve_day
 
-# Create your tests here.
+DAY = 86400
+# 2026-03-01 12:00 UTC
+NOON = 1772366400
+
+def submission(submission_id, index='A', verdict='OK', created=NOON):
+    return {
+        'id': submission_id,
+        'problem': {'contestId': 1, 'index': index, 'name': f'Problem {index}'},
+        'verdict': verdict,
+        'creationTimeSeconds': created,
+        'programmingLanguage': 'C++17',
+    }
+
+class SolveCountingTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('solver', password='x', codeforces_handle='solver')
+
+    def sync(self, *fetched):
+        store_submissions(self.user, list(fetched))
+        return UserStats.objects.get(user=self.user)
+
+    def daily(self):
+        return dict(DailySolves.objects.filter(user=self.user).values_list('day', 'count'))
+
+    def test_pending_submission_counts_once_judged(self):
+        stats = self.sync(submission(10, verdict='TESTING'))
+        self.assertEqual(stats.solved_count, 0)
+
+        stats = self.sync(submission(10))
+        self.assertEqual(stats.solved_count, 1)
+        # Fetched again, e.g. from an overlapping page
+        stats = self.sync(submission(10))
+        self.assertEqual(stats.solved_count, 1)
+        self.assertEqual(self.daily(), {solve_day(NOON): 1})
+
+    def test_second_accept_of_a_solved_problem(self):
+        self.sync(submission(10))
+        stats = self.sync(submission(11, created=NOON + 2 * DAY))
+        self.assertEqual(stats.solved_count, 1)
+        self.assertEqual(self.daily(), {solve_day(NOON): 1})
+
+    def test_accepts_in_one_batch_count_on_the_first_day(self):
+        stats = self.sync(
+            submission(10, created=NOON + DAY),
+            submission(11, created=NOON),
+            submission(12, index='B', verdict='WRONG_ANSWER'),
+        )
+        self.assertEqual(stats.solved_count, 1)
+        self.assertEqual(self.daily(), {solve_day(NOON): 1})
+
+    def test_incremental_counts_match_a_rebuild(self):
+        self.sync(submission(10), submission(11, index='B', verdict='TESTING', created=NOON + DAY))
+        self.sync(submission(11, index='B', created=NOON + DAY), submission(12, index='C', created=NOON + 3 * DAY))
+        incremental = UserStats.objects.get(user=self.user)
+        daily = self.daily()
+
+        rebuilt = rebuild_stats(self.user)
+        self.assertEqual(rebuilt.solved_count, incremental.solved_count)
+        self.assertEqual(self.daily(), daily)
+
+class WindowTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('solver', password='x')
+        self.stats = UserStats.objects.create(user=self.user)
+        self.solved_on = date(2026, 3, 1)
+        DailySolves.objects.create(user=self.user, day=self.solved_on, count=2)
+        DailySolves.objects.create(user=self.user, day=self.solved_on - timedelta(days=10), count=3)
+
+    def windows_on(self, days_later):
+        day = self.solved_on + timedelta(days=days_later)
+        apply_windows([self.stats], day)
+        self.assertEqual(self.stats.windows_date, day)
+        return self.stats.solved_7d, self.stats.solved_30d
+
+    def test_days_roll_out_of_the_windows(self):
+        self.assertEqual(self.windows_on(0), (2, 5))
+        # The last day still inside the 7 day window, then the first outside
+        self.assertEqual(self.windows_on(6), (2, 5))
+        self.assertEqual(self.windows_on(7), (0, 5))
+        self.assertEqual(self.windows_on(19), (0, 5))
+        self.assertEqual(self.windows_on(20), (0, 2))
+        self.assertEqual(self.windows_on(30), (0, 0))
+
+    def test_future_days_are_not_counted(self):
+        self.assertEqual(self.windows_on(-1), (0, 3))
+
+class FeedTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.friends = [User.objects.create_user(f'friend{n}', password='x', codeforces_handle=f'friend{n}') for n in range(4)]
+        for n, friend in enumerate(cls.friends):
+            # Interleaved times with ties across friends, one friend far ahead
+            store_submissions(friend, [
+                submission(100 * n + k, verdict='OK' if k % 3 else 'WRONG_ANSWER', created=NOON + k * DAY // (n + 1) + (10 * DAY if n == 3 else 0))
+                for k in range(12)
+            ])
+
+    def expected(self, verdict=None):
+        submissions = Submission.objects.filter(user__in=self.friends).order_by('-creation_time_seconds', '-submission_id')
+        if verdict:
+            submissions = submissions.filter(verdict=verdict)
+        return list(submissions.values_list('submission_id', flat=True))
+
+    def pages(self, friend_ids, verdict=None, limit=5):
+        ids, cursor = [], None
+        while True:
+            items, cursor = build_feed_page(friend_ids, verdict, cursor, limit)
+            self.assertLessEqual(len(items), limit)
+            ids.extend(item['id'] for item in items)
+            if cursor is None:
+                return ids
+
+    def test_pages_match_the_merged_order(self):
+        friend_ids = [friend.id for friend in self.friends]
+        for verdict in (None, 'OK', 'WRONG_ANSWER'):
+            self.assertEqual(self.pages(friend_ids, verdict), self.expected(verdict), verdict)
+
+    def test_streams_merge_across_query_batches(self):
+        friend_ids = [friend.id for friend in self.friends]
+        with mock.patch('users.feed.FEED_STREAMS_PER_QUERY', 3):
+            self.assertEqual(self.pages(friend_ids, limit=7), self.expected())
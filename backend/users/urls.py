@@ -3,7 +3,7 @@ from rest_framework_simplejwt.views import (
     TokenObtainPairView,
     TokenRefreshView,
 )
-from .views import RegisterView, UserView, VerifyHandleView, FriendListView, UserSubmissionsView, PublicUserView, UserSearchView
+from .views import RegisterView, UserView, VerifyHandleView, FriendListView, UserSubmissionsView, PublicUserView, UserSearchView, FriendFeedView, LeaderboardView
 
 urlpatterns = [
     path('register/', RegisterView.as_view(), name='register'),
@@ -13,6 +13,8 @@ urlpatterns = [
     path('verify-handle/', VerifyHandleView.as_view(), name='verify_handle'),
     path('friends/', FriendListView.as_view(), name='friend_list'),
     path('submissions/', UserSubmissionsView.as_view(), name='user_submissions'),
+    path('feed/', FriendFeedView.as_view(), name='friend_feed'),
+    path('leaderboard/', LeaderboardView.as_view(), name='leaderboard'),
     path('public/<str:query>/', PublicUserView.as_view(), name='public-user'),
     path('search/', UserSearchView.as_view(), name='user-search'),
 ]
@@ -1,10 +1,22 @@
+from asgiref.sync import sync_to_async
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from django.contrib.auth import get_user_model
 from .models import Friendship
 from .serializers import UserSerializer, RegisterSerializer
-from utils.codeforces import get_user_info, get_user_status
+from .search import find_user, search_users
+from .stats import LEADERBOARD_SORTS, leaderboard
+from .feed import FEED_MAX_PAGE_SIZE, FEED_PAGE_SIZE, friends_version, get_feed_page
+from .sync import PROFILES_VERSION, apply_user_info
+from problems.models import Submission
+from problems.serializers import SubmissionSerializer
+from problems.sync import async_user_submissions, needs_submission_sync
+from utils.codeforces import aget_user_info
+from utils.conditional import Validators
+from utils.pagination import set_link
+from utils.versions import bump_version
+from utils.views import AsyncAPIView
 from django.shortcuts import get_object_or_404
 
 User = get_user_model()
@@ -21,36 +33,40 @@ class UserView(APIView):
         serializer = UserSerializer(request.user)
         return Response(serializer.data)
 
-class VerifyHandleView(APIView):
+class VerifyHandleView(AsyncAPIView):
     permission_classes = (permissions.IsAuthenticated,)
 
-    def post(self, request):
+    async def post(self, request):
         handle = request.data.get('handle')
         if not handle:
             return Response({'error': 'Handle required'}, status=400)
         
         try:
-            result = get_user_info(handle)
+            result = await aget_user_info(handle)
             if result:
                 user = request.user
                 user.codeforces_handle = handle
-                user.save()
+                apply_user_info(user, result[0])
+                await user.asave()
                 return Response({'status': 'Handle valid', 'data': result[0]})
             else:
                 return Response({'error': 'Handle not found'}, status=400)
         except Exception as e:
             return Response({'error': str(e)}, status=500)
 
-from django.db.models import Q
-
 class FriendListView(APIView):
     permission_classes = (permissions.IsAuthenticated,)
 
     def get(self, request):
+        validators = Validators([friends_version(request.user.id), PROFILES_VERSION])
+        not_modified = validators.not_modified(request)
+        if not_modified is not None:
+            return not_modified
+
         friendships = Friendship.objects.filter(from_user=request.user)
         friends = [f.to_user for f in friendships]
         serializer = UserSerializer(friends, many=True)
-        return Response(serializer.data)
+        return validators.apply(Response(serializer.data))
 
     def post(self, request):
         query = request.data.get('username')
@@ -58,29 +74,115 @@ class FriendListView(APIView):
              return Response({'error': 'Username or Handle required'}, status=400)
         
         try:
-            target_user = User.objects.filter(Q(username=query) | Q(codeforces_handle__iexact=query)).first()
+            target_user = find_user(query)
             if not target_user:
                 return Response({'error': 'User not found'}, status=404)
 
             if target_user == request.user:
                 return Response({'error': 'Cannot add yourself'}, status=400)
             
-            Friendship.objects.get_or_create(from_user=request.user, to_user=target_user)
+            _, created = Friendship.objects.get_or_create(from_user=request.user, to_user=target_user)
+            if created:
+                bump_version(friends_version(request.user.id))
             return Response({'status': 'Friend added'})
         except Exception as e:
             return Response({'error': str(e)}, status=500)
 
-class UserSubmissionsView(APIView):
+class UserSubmissionsView(AsyncAPIView):
     permission_classes = (permissions.IsAuthenticated,)
-
-    def get(self, request):
-        handle = request.user.codeforces_handle
+    page_size = 1000
+    max_page_size = 5000
+    # Largest value of the IntegerField submission ids are compared against
+    max_submission_id = 2 ** 31 - 1
+
+    def parse_page(self, request):
+        """
+        (before, limit) from the query string, ValueError when malformed.
+        """
+        before = request.query_params.get('before')
+        if before is not None:
+            try:
+                before = int(before)
+            except ValueError:
+                raise ValueError(f'Invalid before: {before}')
+            if not 0 < before <= self.max_submission_id:
+                raise ValueError('before out of range')
+        try:
+            limit = int(request.query_params.get('limit', self.page_size))
+        except ValueError:
+            raise ValueError('limit must be an integer')
+        return before, max(1, min(limit, self.max_page_size))
+
+    async def get(self, request):
+        user = request.user
+        handle = user.codeforces_handle
         if not handle:
             return Response({'error': 'Codeforces handle not linked'}, status=400)
+        try:
+            before, limit = self.parse_page(request)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=400)
         
         try:
-            submissions = get_user_status(handle)
-            return Response(submissions)
+            if needs_submission_sync(user):
+                try:
+                    await async_user_submissions(user)
+                except Exception:
+                    # Serve what we already have when Codeforces is unavailable
+                    if user.submissions_synced_at is None:
+                        raise
+            return await sync_to_async(self.list_submissions)(request, user, before, limit)
+        except Exception as e:
+            return Response({'error': str(e)}, status=500)
+
+    def list_submissions(self, request, user, before, limit):
+        submissions = Submission.objects.filter(user=user).select_related('problem').order_by('-submission_id')
+        verdict = request.query_params.get('verdict')
+        if verdict:
+            submissions = submissions.filter(verdict=verdict)
+        language = request.query_params.get('language')
+        if language:
+            submissions = submissions.filter(programming_language=language)
+        if before is not None:
+            submissions = submissions.filter(submission_id__lt=before)
+
+        page = list(submissions[:limit + 1])
+        response = Response(SubmissionSerializer(page[:limit], many=True).data)
+        if len(page) > limit:
+            set_link(response, request, 'next', before=page[limit - 1].submission_id)
+        return response
+
+class FriendFeedView(APIView):
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def get(self, request):
+        try:
+            limit = int(request.query_params.get('limit', FEED_PAGE_SIZE))
+            items, next_cursor = get_feed_page(
+                request.user,
+                verdict=request.query_params.get('verdict'),
+                cursor=request.query_params.get('cursor'),
+                limit=max(1, min(limit, FEED_MAX_PAGE_SIZE)),
+            )
+            response = Response(items)
+            if next_cursor:
+                set_link(response, request, 'next', cursor=next_cursor)
+            return response
+        except ValueError as e:
+            return Response({'error': str(e)}, status=400)
+        except Exception as e:
+            return Response({'error': str(e)}, status=500)
+
+class LeaderboardView(APIView):
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def get(self, request):
+        sort = request.query_params.get('sort', 'rating')
+        if sort not in LEADERBOARD_SORTS:
+            return Response({'error': f"sort must be one of {', '.join(LEADERBOARD_SORTS)}"}, status=400)
+
+        try:
+            return Response(leaderboard(request.user, sort))
         except Exception as e:
             return Response({'error': str(e)}, status=500)
 
@@ -88,13 +190,18 @@ class PublicUserView(APIView):
     permission_classes = (permissions.AllowAny,)
 
     def get(self, request, query):
-        user = User.objects.filter(Q(username=query) | Q(codeforces_handle__iexact=query)).first()
+        user = find_user(query)
         if user:
             return Response({
                 'username': user.username,
                 'firstName': user.first_name,
                 'lastName': user.last_name,
                 'codeforces_handle': user.codeforces_handle,
+                'rating': user.rating,
+                'rank': user.rank,
+                'maxRating': user.max_rating,
+                'maxRank': user.max_rank,
+                'avatar': user.avatar,
                 'is_registered': True
             })
         return Response({'is_registered': False}, status=404)
@@ -107,12 +214,8 @@ class UserSearchView(APIView):
         if not query:
             return Response([])
 
-        users = User.objects.filter(
-            Q(username__icontains=query) | 
-            Q(first_name__icontains=query) | 
-            Q(last_name__icontains=query)
-        )[:10]  # Limit to 10 results
-        
+        users = search_users(query, limit=10)
+
         results = [{
             'username': user.username,
             'firstName': user.first_name,
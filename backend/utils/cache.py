@@ -0,0 +1,274 @@
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+
+# Defaults for settings.CODEFORCES_CACHE
+DEFAULT_CONFIG = {
+    'BACKEND': 'memory',
+    'OPTIONS': {},
+    # Seconds a response is served as fresh, per API method.
+    # Methods missing here are never cached.
+    'TTL': {
+        'contest.list': 300,
+        'problemset.problems': 3600,
+        'user.info': 600,
+    },
+    # Seconds past the TTL a response may still be served while it is
+    # refreshed in the background
+    'STALE_TTL': 3600,
+}
+
+def make_key(method, params=None):
+    """
+    Cache key for an API call, independent of param order and value types.
+    """
+    normalized = []
+    for name, value in sorted((params or {}).items()):
+        if isinstance(value, bool):
+            value = str(value).lower()
+        elif isinstance(value, (list, tuple)):
+            value = ";".join(str(v) for v in value)
+        normalized.append(f"{name}={value}")
+    return f"{method}?{'&'.join(normalized)}"
+
+class MemoryBackend:
+    """
+    In-process LRU store bounded to max_entries.
+    """
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry, timeout):
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+class FileBackend:
+    """
+    One JSON file per key in a directory shared by every worker on the host.
+    Reads refresh the file mtime, so eviction drops the least recently used.
+    """
+    def __init__(self, location=None, max_entries=256):
+        self.location = location or os.path.join(tempfile.gettempdir(), 'bugsnug-cf-cache')
+        self.max_entries = max_entries
+        os.makedirs(self.location, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.location, hashlib.sha1(key.encode()).hexdigest() + '.json')
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path) as f:
+                entry = json.load(f)
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return entry['value'], entry['stored_at']
+
+    def set(self, key, entry, timeout):
+        value, stored_at = entry
+        fd, tmp_path = tempfile.mkstemp(dir=self.location, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump({'value': value, 'stored_at': stored_at}, f)
+        os.replace(tmp_path, self._path(key))
+        self._evict()
+
+    def _evict(self):
+        try:
+            names = [n for n in os.listdir(self.location) if n.endswith('.json')]
+        except OSError:
+            return
+        if len(names) <= self.max_entries:
+            return
+        paths = [os.path.join(self.location, n) for n in names]
+        paths.sort(key=lambda p: os.path.getmtime(p) if os.path.exists(p) else 0)
+        for path in paths[:len(paths) - self.max_entries]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def clear(self):
+        for name in os.listdir(self.location):
+            if name.endswith('.json'):
+                os.remove(os.path.join(self.location, name))
+
+class DjangoCacheBackend:
+    """
+    Stores entries in a Django cache alias, e.g. Redis shared by all workers.
+    Size limits and eviction are left to the cache itself.
+    """
+    def __init__(self, alias='default', key_prefix='cf:'):
+        self.cache = caches[alias]
+        self.key_prefix = key_prefix
+        self.generation_key = key_prefix + 'generation'
+
+    def _generation(self):
+        # Keys embed the generation, so clear() only has to move it on.
+        # Like utils.versions, a generation lost with the cache never repeats.
+        generation = self.cache.get(self.generation_key)
+        if generation is None:
+            generation = time.time_ns()
+            if not self.cache.add(self.generation_key, generation, timeout=None):
+                generation = self.cache.get(self.generation_key, generation)
+        return generation
+
+    def _key(self, key):
+        # Memcached rejects long keys and spaces, hash them
+        return f'{self.key_prefix}{self._generation()}:{hashlib.sha1(key.encode()).hexdigest()}'
+
+    def get(self, key):
+        entry = self.cache.get(self._key(key))
+        return tuple(entry) if entry is not None else None
+
+    def set(self, key, entry, timeout):
+        self.cache.set(self._key(key), entry, timeout)
+
+    def clear(self):
+        """
+        Drops this backend's entries only, the alias may be shared. Entries
+        of earlier generations are never read again and expire on their own.
+        """
+        self.cache.set(self.generation_key, time.time_ns(), timeout=None)
+
+BACKENDS = {
+    'memory': MemoryBackend,
+    'file': FileBackend,
+    'django': DjangoCacheBackend,
+}
+
+class ResponseCache:
+    """
+    TTL cache with stale-while-revalidate around Codeforces API calls.
+    Entries are (value, stored_at) pairs.
+    """
+    def __init__(self, backend, ttls, stale_ttl):
+        self.backend = backend
+        self.ttls = ttls
+        self.stale_ttl = stale_ttl
+        self.refreshing = set()
+        self.lock = threading.Lock()
+        # Strong references to background refresh tasks
+        self.tasks = set()
+
+    def get_or_fetch(self, method, params, fetch):
+        ttl = self.ttls.get(method)
+        if not ttl:
+            return fetch()
+
+        key = make_key(method, params)
+        entry = self.backend.get(key)
+        if entry is not None:
+            value, stored_at = entry
+            age = time.time() - stored_at
+            if age < ttl:
+                return value
+            if age < ttl + self.stale_ttl:
+                self.refresh_in_background(key, ttl, fetch)
+                return value
+
+        return self.store(key, ttl, fetch())
+
+    def store(self, key, ttl, value):
+        self.backend.set(key, (value, time.time()), ttl + self.stale_ttl)
+        return value
+
+    def refresh_in_background(self, key, ttl, fetch):
+        with self.lock:
+            if key in self.refreshing:
+                return
+            self.refreshing.add(key)
+
+        def refresh():
+            try:
+                self.store(key, ttl, fetch())
+            except Exception:
+                # Keep serving the stale copy, the next stale hit retries
+                pass
+            finally:
+                with self.lock:
+                    self.refreshing.discard(key)
+
+        threading.Thread(target=refresh, daemon=True).start()
+
+    async def aget_or_fetch(self, method, params, fetch):
+        """
+        get_or_fetch for a coroutine `fetch`. Backend reads and writes run
+        in a worker thread, as the file and Redis backends block.
+        """
+        ttl = self.ttls.get(method)
+        if not ttl:
+            return await fetch()
+
+        key = make_key(method, params)
+        entry = await sync_to_async(self.backend.get, thread_sensitive=False)(key)
+        if entry is not None:
+            value, stored_at = entry
+            age = time.time() - stored_at
+            if age < ttl:
+                return value
+            if age < ttl + self.stale_ttl:
+                self.arefresh_in_background(key, ttl, fetch)
+                return value
+
+        return await sync_to_async(self.store, thread_sensitive=False)(key, ttl, await fetch())
+
+    def arefresh_in_background(self, key, ttl, fetch):
+        with self.lock:
+            if key in self.refreshing:
+                return
+            self.refreshing.add(key)
+
+        async def refresh():
+            try:
+                await sync_to_async(self.store, thread_sensitive=False)(key, ttl, await fetch())
+            except Exception:
+                pass
+            finally:
+                with self.lock:
+                    self.refreshing.discard(key)
+
+        task = asyncio.get_running_loop().create_task(refresh())
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    def clear(self):
+        self.backend.clear()
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                config = {**DEFAULT_CONFIG, **getattr(settings, 'CODEFORCES_CACHE', {})}
+                ttls = {**DEFAULT_CONFIG['TTL'], **config['TTL']}
+                backend = BACKENDS[config['BACKEND']](**config['OPTIONS'])
+                _cache = ResponseCache(backend, ttls, config['STALE_TTL'])
+    return _cache
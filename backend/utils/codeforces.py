@@ -1,29 +1,319 @@
-import requests
+import asyncio
+import random
+import threading
 import time
+import weakref
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+from . import metrics
+from .cache import get_cache, make_key
+from .singleflight import SingleFlight
 
 BASE_URL = "https://codeforces.com/api"
 
-def make_request(method, params=None):
-    try:
-        url = f"{BASE_URL}/{method}"
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        data = response.json()
-        if data['status'] == 'OK':
+# Defaults for settings.CODEFORCES_API, any key can be overridden there
+DEFAULT_CONFIG = {
+    'CONNECT_TIMEOUT': 3.05,
+    'READ_TIMEOUT': 20,
+    'MAX_RETRIES': 3,
+    'BACKOFF': 1.0,
+    'MAX_BACKOFF': 10.0,
+    # Codeforces allows roughly one call every two seconds
+    'RATE': 0.5,
+    'BURST': 1,
+    'POOL_SIZE': 10,
+    # Upper bound on concurrent connections of the async client
+    'MAX_CONNECTIONS': 100,
+}
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+CALL_LIMIT_COMMENT = "Call limit exceeded"
+
+class CodeforcesError(Exception):
+    """
+    Raised when a Codeforces API call fails for good.
+    retryable is set when the failure was transient (throttling, 5xx, network).
+    """
+    def __init__(self, message, retryable=False, retry_after=None):
+        super().__init__(message)
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled at `rate` tokens per second.
+    """
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self):
+        """
+        Take a token and return how many seconds the caller must wait
+        before using it. Tokens may go negative, which queues callers.
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+    def acquire(self):
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def aacquire(self):
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+class MethodStats:
+    """
+    Per-method call counters and latency totals.
+    """
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def as_dict(self):
+        return {
+            'calls': self.calls,
+            'errors': self.errors,
+            'retries': self.retries,
+            'total_seconds': self.total_seconds,
+            'avg_seconds': self.total_seconds / self.calls if self.calls else 0.0,
+            'max_seconds': self.max_seconds,
+        }
+
+class BaseClient:
+    """
+    Configuration, backoff, response parsing and stats shared by the
+    blocking and the asyncio client.
+    """
+    def __init__(self, base_url=BASE_URL, config=None, rate_limiter=None):
+        self.base_url = base_url
+        self.config = {**DEFAULT_CONFIG, **(config or {})}
+        self.rate_limiter = rate_limiter or TokenBucket(self.config['RATE'], self.config['BURST'])
+        self._stats = {}
+        self._stats_lock = threading.Lock()
+
+    @property
+    def timeout(self):
+        return (self.config['CONNECT_TIMEOUT'], self.config['READ_TIMEOUT'])
+
+    def backoff_delay(self, attempt, retry_after=None):
+        if retry_after is not None:
+            return min(retry_after, self.config['MAX_BACKOFF'])
+        cap = min(self.config['MAX_BACKOFF'], self.config['BACKOFF'] * (2 ** attempt))
+        # Full jitter keeps throttled workers from retrying in lockstep
+        return random.uniform(0, cap)
+
+    @staticmethod
+    def parse_response(response):
+        try:
+            data = response.json()
+        except ValueError:
+            data = None
+
+        if isinstance(data, dict) and data.get('status') == 'OK':
             return data['result']
-        else:
-            raise Exception(f"Codeforces API Error: {data.get('comment', 'Unknown error')}")
-    except requests.exceptions.RequestException as e:
-        raise Exception(f"Network Error: {str(e)}")
 
-def get_user_info(handles):
+        comment = data.get('comment', '') if isinstance(data, dict) else ''
+        retryable = response.status_code in RETRY_STATUS_CODES or CALL_LIMIT_COMMENT in comment
+        retry_after = response.headers.get('Retry-After')
+        retry_after = int(retry_after) if retry_after and retry_after.isdigit() else None
+        if comment:
+            raise CodeforcesError(f"Codeforces API Error: {comment}", retryable, retry_after)
+        raise CodeforcesError(f"Network Error: HTTP {response.status_code}", retryable, retry_after)
+
+    def _record(self, method, elapsed, retries, failed=False):
+        with self._stats_lock:
+            stats = self._stats.setdefault(method, MethodStats())
+            stats.calls += 1
+            stats.retries += retries
+            stats.errors += int(failed)
+            stats.total_seconds += elapsed
+            stats.max_seconds = max(stats.max_seconds, elapsed)
+        metrics.record_codeforces_call(method, elapsed, retries, failed)
+
+    def get_stats(self):
+        with self._stats_lock:
+            return {method: stats.as_dict() for method, stats in self._stats.items()}
+
+class CodeforcesClient(BaseClient):
+    """
+    Codeforces API client with a pooled keep-alive session, a shared rate
+    limiter and bounded retries with jittered exponential backoff.
+    """
+    def __init__(self, base_url=BASE_URL, config=None, rate_limiter=None):
+        super().__init__(base_url, config, rate_limiter)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=self.config['POOL_SIZE'],
+            pool_maxsize=self.config['POOL_SIZE'],
+        )
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def request(self, method, params=None):
+        started = time.monotonic()
+        retries = 0
+        while True:
+            try:
+                result = self._attempt(method, params)
+                break
+            except CodeforcesError as e:
+                if not e.retryable or retries >= self.config['MAX_RETRIES']:
+                    self._record(method, time.monotonic() - started, retries, failed=True)
+                    raise
+                time.sleep(self.backoff_delay(retries, e.retry_after))
+                retries += 1
+        self._record(method, time.monotonic() - started, retries)
+        return result
+
+    def _attempt(self, method, params):
+        self.rate_limiter.acquire()
+        try:
+            response = self.session.get(f"{self.base_url}/{method}", params=params, timeout=self.timeout)
+        except requests.exceptions.RequestException as e:
+            raise CodeforcesError(f"Network Error: {str(e)}", retryable=True)
+        return self.parse_response(response)
+
+def encode_params(params):
+    # requests sends booleans as True/False, keep the same query strings
+    return {name: str(value) if isinstance(value, bool) else value for name, value in (params or {}).items()}
+
+class AsyncCodeforcesClient(BaseClient):
+    """
+    asyncio counterpart of CodeforcesClient on a pooled httpx client.
+    Waiting for the rate limiter or a backoff only suspends the calling
+    coroutine, so one worker can keep many upstream calls in flight.
+    """
+    def __init__(self, base_url=BASE_URL, config=None, rate_limiter=None):
+        super().__init__(base_url, config, rate_limiter)
+        self.client = httpx.AsyncClient(
+            timeout=httpx.Timeout(self.config['READ_TIMEOUT'], connect=self.config['CONNECT_TIMEOUT']),
+            limits=httpx.Limits(
+                max_connections=self.config['MAX_CONNECTIONS'],
+                max_keepalive_connections=self.config['POOL_SIZE'],
+            ),
+        )
+
+    async def request(self, method, params=None):
+        started = time.monotonic()
+        retries = 0
+        while True:
+            try:
+                result = await self._attempt(method, params)
+                break
+            except CodeforcesError as e:
+                if not e.retryable or retries >= self.config['MAX_RETRIES']:
+                    self._record(method, time.monotonic() - started, retries, failed=True)
+                    raise
+                await asyncio.sleep(self.backoff_delay(retries, e.retry_after))
+                retries += 1
+        self._record(method, time.monotonic() - started, retries)
+        return result
+
+    async def _attempt(self, method, params):
+        await self.rate_limiter.aacquire()
+        try:
+            response = await self.client.get(f"{self.base_url}/{method}", params=encode_params(params))
+        except httpx.HTTPError as e:
+            raise CodeforcesError(f"Network Error: {str(e)}", retryable=True)
+        return self.parse_response(response)
+
+    async def aclose(self):
+        await self.client.aclose()
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_client():
+    """
+    Process-wide client, so every caller shares one connection pool
+    and one rate limiter. settings.CODEFORCES_TRANSPORT may swap it for a
+    recording or replaying one, see utils.recording.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                from .recording import make_clients
+                client_class, _ = make_clients()
+                _client = client_class(config=getattr(settings, 'CODEFORCES_API', None))
+    return _client
+
+# httpx connections belong to the event loop that opened them
+_async_clients = weakref.WeakKeyDictionary()
+
+def get_async_client():
+    """
+    Async client of the running event loop. It shares the rate limiter of
+    the blocking client, so both stay within one Codeforces budget.
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        from .recording import make_clients
+        _, client_class = make_clients()
+        client = client_class(
+            config=getattr(settings, 'CODEFORCES_API', None),
+            rate_limiter=get_client().rate_limiter,
+        )
+        _async_clients[loop] = client
+    return client
+
+# Identical upstream calls in flight at the same time, from threads or
+# coroutines, share a single request
+_flight = SingleFlight()
+
+def get_coalescing_stats():
+    """
+    Per-method counts of upstream calls made and of calls that joined one
+    already in flight instead.
+    """
+    return _flight.get_stats()
+
+def collect_coalescing_metrics():
+    coalesced = metrics.Counter('codeforces_coalesced_total', 'Codeforces calls that joined one already in flight.', ['method'])
+    coalesced.values = {(method,): stats['deduplicated'] for method, stats in get_coalescing_stats().items()}
+    return [coalesced]
+
+metrics.registry.collectors.append(collect_coalescing_metrics)
+
+def make_request(method, params=None, use_cache=True):
+    """
+    Call an API method. Responses of methods with a TTL in
+    settings.CODEFORCES_CACHE are cached unless use_cache is False.
+    """
+    def fetch():
+        return _flight.do(make_key(method, params), lambda: get_client().request(method, params), method)
+
+    if not use_cache:
+        return fetch()
+    return get_cache().get_or_fetch(method, params, fetch)
+
+def get_user_info(handles, use_cache=True):
     """
     Fetch user info for a list of handles.
     handles: list of strings or single string (semicolon separated)
     """
     if isinstance(handles, list):
         handles = ";".join(handles)
-    return make_request("user.info", {"handles": handles})
+    return make_request("user.info", {"handles": handles}, use_cache=use_cache)
 
 def get_user_status(handle, from_index=1, count=1000):
     """
@@ -31,17 +321,46 @@ def get_user_status(handle, from_index=1, count=1000):
     """
     return make_request("user.status", {"handle": handle, "from": from_index, "count": count})
 
-def get_contest_list(gym=False):
+def get_contest_list(gym=False, use_cache=True):
     """
     Fetch list of contests.
     """
-    return make_request("contest.list", {"gym": gym})
+    return make_request("contest.list", {"gym": gym}, use_cache=use_cache)
 
-def get_problems(tags=None):
+def get_problems(tags=None, use_cache=True):
     """
     Fetch problemset problems.
     """
     params = {}
     if tags:
         params["tags"] = ";".join(tags) if isinstance(tags, list) else tags
-    return make_request("problemset.problems", params)
+    return make_request("problemset.problems", params, use_cache=use_cache)
+
+
+async def amake_request(method, params=None, use_cache=True):
+    """
+    Async make_request, sharing its response cache.
+    """
+    def fetch():
+        return _flight.ado(make_key(method, params), lambda: get_async_client().request(method, params), method)
+
+    if not use_cache:
+        return await fetch()
+    return await get_cache().aget_or_fetch(method, params, fetch)
+
+async def aget_user_info(handles, use_cache=True):
+    if isinstance(handles, list):
+        handles = ";".join(handles)
+    return await amake_request("user.info", {"handles": handles}, use_cache=use_cache)
+
+async def aget_user_status(handle, from_index=1, count=1000):
+    return await amake_request("user.status", {"handle": handle, "from": from_index, "count": count})
+
+async def aget_contest_list(gym=False, use_cache=True):
+    return await amake_request("contest.list", {"gym": gym}, use_cache=use_cache)
+
+async def aget_problems(tags=None, use_cache=True):
+    params = {}
+    if tags:
+        params["tags"] = ";".join(tags) if isinstance(tags, list) else tags
+    return await amake_request("problemset.problems", params, use_cache=use_cache)
@@ -0,0 +1,55 @@
+import hashlib
+import time
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+from .versions import get_versions
+
+# With a per-process cache, bumps made by another process (e.g. a sync
+# command) are invisible here, so public validators also roll over this often
+UNSHARED_MAX_AGE = 300
+
+class Validators:
+    """
+    ETag and Last-Modified of a response derived from the versions of the
+    datasets it is built from, so a poll can be answered with 304 before
+    the data is read or serialized.
+    """
+    def __init__(self, names, private=True, extra=()):
+        versions = get_versions(names)
+        parts = [versions[name] for name in names]
+        last_modified = max(parts) / 1e9
+        # Anything else the response depends on, e.g. the current time
+        parts.extend(extra)
+        # Counters in a per-process cache miss bumps made by other workers
+        self.shared = not isinstance(caches['default'], (LocMemCache, DummyCache))
+        if not self.shared:
+            bucket = int(time.time()) // UNSHARED_MAX_AGE
+            parts.append(bucket)
+            last_modified = max(last_modified, bucket * UNSHARED_MAX_AGE)
+
+        self.etag = '"%s"' % hashlib.sha1(repr(parts).encode()).hexdigest()
+        self.last_modified = int(last_modified)
+        self.private = private
+
+    def not_modified(self, request):
+        """
+        A 304 response when the client's copy is current, otherwise None.
+        Per-user data changes through requests that may hit another worker,
+        so without a shared cache it is always served in full.
+        """
+        if self.private and not self.shared:
+            return None
+        response = get_conditional_response(request, etag=self.etag, last_modified=self.last_modified)
+        return self.apply(response) if response is not None else None
+
+    def apply(self, response):
+        response['ETag'] = self.etag
+        response['Last-Modified'] = http_date(self.last_modified)
+        # Clients may keep the response but must revalidate before reuse
+        response['Cache-Control'] = 'private, no-cache' if self.private else 'public, no-cache'
+        if self.private:
+            patch_vary_headers(response, ['Authorization'])
+        return response
@@ -0,0 +1,215 @@
+import bisect
+import contextvars
+import threading
+import time
+
+# Seconds, shared by every latency histogram
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def format_labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{escape(value)}"' for name, value in pairs) + '}'
+
+def format_value(value):
+    if isinstance(value, float):
+        if value == float('inf'):
+            return '+Inf'
+        return repr(value)
+    return str(value)
+
+class Metric:
+    """
+    One metric family. Values are pre-aggregated per label tuple; the
+    lock is held only for the arithmetic, never while rendering text.
+    """
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def snapshot(self):
+        with self.lock:
+            return {labels: self.copy_value(value) for labels, value in self.values.items()}
+
+    @staticmethod
+    def copy_value(value):
+        return value
+
+    def samples(self):
+        for labels, value in sorted(self.snapshot().items()):
+            yield self.name, format_labels(self.labelnames, labels), value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        lines.extend(f'{name}{labels} {format_value(value)}' for name, labels, value in self.samples())
+        return '\n'.join(lines)
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, *labels, amount=1):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def inc(self, *labels, amount=1):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+class Histogram(Metric):
+    """
+    Fixed buckets; each observation bumps one bucket count and the sum.
+    """
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labels):
+        slot = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.values.get(labels)
+            if series is None:
+                # One count per bucket plus +Inf, then the sum
+                series = self.values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[slot] += 1
+            series[-1] += value
+
+    @staticmethod
+    def copy_value(value):
+        return list(value)
+
+    def samples(self):
+        bounds = [*self.buckets, float('inf')]
+        for labels, series in sorted(self.snapshot().items()):
+            cumulative = 0
+            for bound, count in zip(bounds, series):
+                cumulative += count
+                yield f'{self.name}_bucket', format_labels(self.labelnames, labels, [('le', format_value(float(bound)))]), cumulative
+            yield f'{self.name}_sum', format_labels(self.labelnames, labels), series[-1]
+            yield f'{self.name}_count', format_labels(self.labelnames, labels), cumulative
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+        # Callables returning extra metrics computed at scrape time
+        self.collectors = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self):
+        """
+        All metrics in the Prometheus text exposition format.
+        """
+        metrics = list(self.metrics)
+        for collect in self.collectors:
+            metrics.extend(collect())
+        return '\n'.join(metric.render() for metric in metrics) + '\n'
+
+registry = Registry()
+
+HTTP_REQUESTS = registry.counter('http_requests_total', 'HTTP requests served.', ['method', 'route', 'status'])
+HTTP_LATENCY = registry.histogram('http_request_duration_seconds', 'HTTP request latency.', ['method', 'route'])
+HTTP_DB_QUERIES = registry.counter('http_request_db_queries_total', 'Database queries run by HTTP requests.', ['route'])
+HTTP_DB_SECONDS = registry.counter('http_request_db_seconds_total', 'Seconds HTTP requests spent in database queries.', ['route'])
+HTTP_CODEFORCES_CALLS = registry.counter('http_request_codeforces_calls_total', 'Codeforces calls made by HTTP requests.', ['route'])
+HTTP_CODEFORCES_SECONDS = registry.counter('http_request_codeforces_seconds_total', 'Seconds HTTP requests spent in Codeforces calls.', ['route'])
+
+CODEFORCES_CALLS = registry.counter('codeforces_requests_total', 'Codeforces API calls by outcome.', ['method', 'outcome'])
+CODEFORCES_LATENCY = registry.histogram('codeforces_request_duration_seconds', 'Codeforces API call latency, retries included.', ['method'])
+CODEFORCES_RETRIES = registry.counter('codeforces_retries_total', 'Codeforces API attempts retried.', ['method'])
+
+WEBSOCKET_CONNECTS = registry.counter('websocket_connects_total', 'Chat websocket connection attempts.', ['outcome'])
+WEBSOCKET_DISCONNECTS = registry.counter('websocket_disconnects_total', 'Chat websocket disconnects.')
+WEBSOCKET_MESSAGES = registry.counter('websocket_messages_total', 'Chat websocket messages.', ['direction'])
+WEBSOCKET_OPEN = registry.gauge('websocket_open_connections', 'Chat websockets currently open.')
+
+class RequestStats:
+    """
+    Time a single request spent in the database and in Codeforces calls.
+    Shared with sync_to_async threads through the context variable.
+    """
+    __slots__ = ('db_queries', 'db_seconds', 'codeforces_calls', 'codeforces_seconds')
+
+    def __init__(self):
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.codeforces_calls = 0
+        self.codeforces_seconds = 0.0
+
+current_request = contextvars.ContextVar('metrics_request', default=None)
+
+def time_query(execute, sql, params, many, context):
+    """
+    Connection execute wrapper adding query time to the current request.
+    """
+    stats = current_request.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.db_queries += 1
+        stats.db_seconds += time.perf_counter() - started
+
+def attach_query_timer(connection, **kwargs):
+    if time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(time_query)
+
+def install_query_timer():
+    """
+    Time queries on every connection, including ones opened later by
+    other threads.
+    """
+    from django.db import connections
+    from django.db.backends.signals import connection_created
+    connection_created.connect(attach_query_timer, dispatch_uid='metrics_query_timer')
+    for connection in connections.all(initialized_only=True):
+        attach_query_timer(connection)
+
+def record_request(method, route, status, elapsed, stats):
+    HTTP_REQUESTS.inc(method, route, str(status))
+    HTTP_LATENCY.observe(elapsed, method, route)
+    if stats.db_queries:
+        HTTP_DB_QUERIES.inc(route, amount=stats.db_queries)
+        HTTP_DB_SECONDS.inc(route, amount=stats.db_seconds)
+    if stats.codeforces_calls:
+        HTTP_CODEFORCES_CALLS.inc(route, amount=stats.codeforces_calls)
+        HTTP_CODEFORCES_SECONDS.inc(route, amount=stats.codeforces_seconds)
+
+def record_codeforces_call(method, elapsed, retries, failed):
+    CODEFORCES_CALLS.inc(method, 'error' if failed else 'ok')
+    CODEFORCES_LATENCY.observe(elapsed, method)
+    if retries:
+        CODEFORCES_RETRIES.inc(method, amount=retries)
+    stats = current_request.get()
+    if stats is not None:
+        stats.codeforces_calls += 1
+        stats.codeforces_seconds += elapsed
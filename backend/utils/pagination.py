@@ -0,0 +1,45 @@
+import base64
+import json
+
+def set_link(response, request, rel, **params):
+    """
+    Add an RFC 8288 Link header pointing at the current URL with params
+    replaced (None removes a param), so list bodies can stay plain JSON arrays.
+    """
+    query = request.query_params.copy()
+    for name, value in params.items():
+        if value is None:
+            query.pop(name, None)
+        else:
+            query[name] = value
+    url = request.build_absolute_uri(request.path) + '?' + query.urlencode()
+    link = f'<{url}>; rel="{rel}"'
+    if response.get('Link'):
+        link = f"{response['Link']}, {link}"
+    response['Link'] = link
+    return response
+
+def encode_cursor(*values):
+    """
+    Opaque cursor for a keyset position, values must be JSON serializable.
+    """
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip('=')
+
+def decode_cursor(cursor, types=None):
+    """
+    Inverse of encode_cursor. With `types`, the values must match them one
+    to one (e.g. (str, int)). Raises ValueError on malformed input.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (TypeError, ValueError) as e:
+        raise ValueError(f'Invalid cursor: {cursor}') from e
+    if types is not None and not (
+        isinstance(values, list)
+        and len(values) == len(types)
+        # JSON true/false would pass as int
+        and all(isinstance(v, t) and not isinstance(v, bool) for v, t in zip(values, types))
+    ):
+        raise ValueError(f'Invalid cursor: {cursor}')
+    return values
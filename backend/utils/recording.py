@@ -0,0 +1,150 @@
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import random
+import tempfile
+import time
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from .cache import make_key
+from .codeforces import AsyncCodeforcesClient, CodeforcesClient, CodeforcesError
+
+# Defaults for settings.CODEFORCES_TRANSPORT
+DEFAULT_CONFIG = {
+    # live, record or replay
+    'MODE': 'live',
+    'PATH': os.path.join(tempfile.gettempdir(), 'bugsnug-cf-recordings'),
+    # Replay only: seconds added to every call, plus up to JITTER more
+    'LATENCY': 0.0,
+    'JITTER': 0.0,
+    # Replay only: share of calls failing with a retryable error
+    'ERROR_RATE': 0.0,
+    'SEED': None,
+}
+
+MODES = ('live', 'record', 'replay')
+
+class RecordingStore:
+    """
+    Gzipped JSON responses on disk, one file per method and params.
+    """
+    def __init__(self, location):
+        self.location = location
+
+    def path(self, method, params):
+        key = make_key(method, params)
+        return os.path.join(self.location, method, hashlib.sha1(key.encode()).hexdigest() + '.json.gz')
+
+    def save(self, method, params, result):
+        path = self.path(method, params)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(fd, 'wb') as raw, gzip.GzipFile(fileobj=raw, mode='wb') as f:
+            f.write(json.dumps({
+                'key': make_key(method, params),
+                'recorded_at': time.time(),
+                'result': result,
+            }).encode())
+        os.replace(tmp_path, path)
+
+    def load(self, method, params):
+        try:
+            with gzip.open(self.path(method, params)) as f:
+                return json.load(f)['result']
+        except FileNotFoundError:
+            raise CodeforcesError(f"No recorded response for {make_key(method, params)}")
+
+class Faults:
+    """
+    Latency and errors injected into replayed calls.
+    """
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+
+    def delay(self):
+        return self.latency + (self.random.uniform(0, self.jitter) if self.jitter else 0.0)
+
+    def check(self, method):
+        if self.error_rate and self.random.random() < self.error_rate:
+            raise CodeforcesError(f"Codeforces API Error: Call limit exceeded (injected, {method})", retryable=True)
+
+class RecordingClient(CodeforcesClient):
+    """
+    Live client that also saves every successful response.
+    """
+    def __init__(self, store, **kwargs):
+        super().__init__(**kwargs)
+        self.store = store
+
+    def _attempt(self, method, params):
+        result = super()._attempt(method, params)
+        self.store.save(method, params, result)
+        return result
+
+class AsyncRecordingClient(AsyncCodeforcesClient):
+    def __init__(self, store, **kwargs):
+        super().__init__(**kwargs)
+        self.store = store
+
+    async def _attempt(self, method, params):
+        result = await super()._attempt(method, params)
+        await sync_to_async(self.store.save, thread_sensitive=False)(method, params, result)
+        return result
+
+class ReplayClient(CodeforcesClient):
+    """
+    Serves recorded responses without network access or rate limiting.
+    Injected errors go through the usual retry and backoff.
+    """
+    def __init__(self, store, faults, **kwargs):
+        super().__init__(**kwargs)
+        self.store = store
+        self.faults = faults
+
+    def _attempt(self, method, params):
+        time.sleep(self.faults.delay())
+        self.faults.check(method)
+        return self.store.load(method, params)
+
+class AsyncReplayClient(AsyncCodeforcesClient):
+    def __init__(self, store, faults, **kwargs):
+        super().__init__(**kwargs)
+        self.store = store
+        self.faults = faults
+
+    async def _attempt(self, method, params):
+        await asyncio.sleep(self.faults.delay())
+        self.faults.check(method)
+        return await sync_to_async(self.store.load, thread_sensitive=False)(method, params)
+
+def get_config():
+    return {**DEFAULT_CONFIG, **getattr(settings, 'CODEFORCES_TRANSPORT', {})}
+
+def make_clients():
+    """
+    (client factory, async client factory) for the configured mode. Both
+    accept the CodeforcesClient keyword arguments.
+    """
+    config = get_config()
+    mode = config['MODE']
+    if mode not in MODES:
+        raise ValueError(f"Invalid CODEFORCES_TRANSPORT MODE: {mode}")
+    if mode == 'live':
+        return CodeforcesClient, AsyncCodeforcesClient
+
+    store = RecordingStore(config['PATH'])
+    if mode == 'record':
+        return (
+            lambda **kwargs: RecordingClient(store, **kwargs),
+            lambda **kwargs: AsyncRecordingClient(store, **kwargs),
+        )
+    faults = Faults(config['LATENCY'], config['JITTER'], config['ERROR_RATE'], config['SEED'])
+    return (
+        lambda **kwargs: ReplayClient(store, faults, **kwargs),
+        lambda **kwargs: AsyncReplayClient(store, faults, **kwargs),
+    )
@@ -0,0 +1,140 @@
+import asyncio
+import threading
+
+class Call:
+    """
+    One in-flight call. Thread followers wait on the event; coroutine
+    followers park a future on their own loop, resolved thread-safely.
+    """
+    def __init__(self):
+        self.event = threading.Event()
+        self.waiters = []
+        self.result = None
+        self.error = None
+        # The leader was cancelled or interrupted before an outcome
+        self.abandoned = False
+
+    def finish(self, result=None, error=None, abandoned=False):
+        self.result = result
+        self.error = error
+        self.abandoned = abandoned
+        self.event.set()
+        for loop, future in self.waiters:
+            try:
+                loop.call_soon_threadsafe(self._resolve, future)
+            except RuntimeError:
+                # The follower's loop is already closed
+                pass
+
+    def _resolve(self, future):
+        if future.done():
+            return
+        if self.abandoned:
+            # Wake the follower, which then joins again
+            future.set_result(None)
+        elif self.error is not None:
+            future.set_exception(self.error)
+        else:
+            future.set_result(self.result)
+
+    def outcome(self):
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key: the first caller runs
+    the function and every caller arriving before it finishes shares its
+    result or exception. Works for threads, coroutines and any mix of the
+    two; nothing is cached once the call completes. A leader that is
+    cancelled rather than failing passes nothing on, its followers join
+    again and one of them takes over.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.stats = {}
+
+    def _join(self, key, label):
+        """
+        Returns (call, is_leader).
+        """
+        with self.lock:
+            stats = self.stats.setdefault(label or key, {'calls': 0, 'deduplicated': 0})
+            call = self.calls.get(key)
+            if call is not None:
+                stats['deduplicated'] += 1
+                return call, False
+            stats['calls'] += 1
+            call = self.calls[key] = Call()
+            return call, True
+
+    def _leave(self, key, call, result=None, error=None, abandoned=False):
+        # Finishing under the lock means a coroutine follower either sees
+        # the event set or gets its future resolved, never neither
+        with self.lock:
+            if self.calls.get(key) is call:
+                del self.calls[key]
+            call.finish(result, error, abandoned)
+
+    def do(self, key, fn, label=None):
+        while True:
+            call, leader = self._join(key, label)
+            if leader:
+                break
+            call.event.wait()
+            if not call.abandoned:
+                return call.outcome()
+
+        try:
+            result = fn()
+        except Exception as e:
+            self._leave(key, call, error=e)
+            raise
+        except BaseException:
+            self._leave(key, call, abandoned=True)
+            raise
+        self._leave(key, call, result)
+        return result
+
+    async def ado(self, key, fn, label=None):
+        """
+        do() for a coroutine function `fn`.
+        """
+        while True:
+            call, leader = self._join(key, label)
+            if leader:
+                break
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            with self.lock:
+                if not call.event.is_set():
+                    call.waiters.append((loop, future))
+                else:
+                    future.set_result(None)
+            await future
+            if not call.abandoned:
+                return call.outcome()
+
+        try:
+            result = await fn()
+        except Exception as e:
+            self._leave(key, call, error=e)
+            raise
+        except BaseException:
+            self._leave(key, call, abandoned=True)
+            raise
+        self._leave(key, call, result)
+        return result
+
+    def get_stats(self):
+        """
+        Per-label counts of executed and deduplicated calls.
+        """
+        with self.lock:
+            return {label: dict(stats) for label, stats in self.stats.items()}
+
+    def reset_stats(self):
+        with self.lock:
+            self.stats.clear()
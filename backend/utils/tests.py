@@ -0,0 +1,340 @@
+import asyncio
+import json
+import tempfile
+import threading
+import time
+from unittest import mock
+import httpx
+import requests
+from django.core.cache import caches
+from django.test import SimpleTestCase
+from .cache import DjangoCacheBackend, FileBackend, MemoryBackend, ResponseCache, make_key
+from .codeforces import AsyncCodeforcesClient, CodeforcesClient, CodeforcesError, TokenBucket
+from .singleflight import SingleFlight
+
+TTL = 60
+STALE_TTL = 600
+
+class Fetch:
+    """
+    Counting fetch that can be held until released.
+    """
+    def __init__(self, value, hold=False):
+        self.value = value
+        self.calls = 0
+        self.release = threading.Event()
+        if not hold:
+            self.release.set()
+
+    def __call__(self):
+        self.calls += 1
+        self.release.wait(5)
+        return self.value
+
+class ResponseCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.cache = ResponseCache(MemoryBackend(), {'contest.list': TTL}, STALE_TTL)
+
+    def store(self, value, age):
+        self.cache.backend.set(make_key('contest.list'), (value, time.time() - age), TTL + STALE_TTL)
+
+    def get(self, fetch):
+        return self.cache.get_or_fetch('contest.list', None, fetch)
+
+    def wait_for_refreshes(self):
+        deadline = time.monotonic() + 5
+        while self.cache.refreshing and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertFalse(self.cache.refreshing)
+
+    def test_fresh_entries_are_served_without_fetching(self):
+        fetch = Fetch('fetched')
+        self.assertEqual(self.get(fetch), 'fetched')
+        self.assertEqual(self.get(fetch), 'fetched')
+        self.store('cached', TTL - 1)
+        self.assertEqual(self.get(fetch), 'cached')
+        self.assertEqual(fetch.calls, 1)
+
+    def test_methods_without_a_ttl_are_not_cached(self):
+        fetch = Fetch('fetched')
+        for _ in range(2):
+            self.assertEqual(self.cache.get_or_fetch('user.status', {'handle': 'x'}, fetch), 'fetched')
+        self.assertEqual(fetch.calls, 2)
+
+    def test_stale_entries_are_served_while_one_refresh_runs(self):
+        self.store('stale', TTL + 1)
+        fetch = Fetch('fresh', hold=True)
+        self.assertEqual(self.get(fetch), 'stale')
+        self.assertEqual(self.get(fetch), 'stale')
+        fetch.release.set()
+        self.wait_for_refreshes()
+        self.assertEqual(self.get(fetch), 'fresh')
+        self.assertEqual(fetch.calls, 1)
+
+    def test_failed_refresh_keeps_the_stale_entry(self):
+        self.store('stale', TTL + 1)
+
+        def fail():
+            raise RuntimeError('down')
+
+        self.assertEqual(self.get(fail), 'stale')
+        self.wait_for_refreshes()
+        self.assertEqual(self.get(fail), 'stale')
+
+    def test_expired_entries_are_fetched_in_the_request(self):
+        self.store('expired', TTL + STALE_TTL + 1)
+        fetch = Fetch('fresh')
+        self.assertEqual(self.get(fetch), 'fresh')
+        self.assertFalse(self.cache.refreshing)
+
+class BackendTests(SimpleTestCase):
+    def check_lru(self, backend):
+        for key in 'abc':
+            backend.set(key, (key, 0), TTL)
+            # Distinct mtimes for the file backend
+            time.sleep(0.01)
+        backend.get('a')
+        backend.set('d', ('d', 0), TTL)
+        self.assertIsNone(backend.get('b'))
+        for key in 'acd':
+            self.assertEqual(backend.get(key), (key, 0))
+
+    def test_memory_backend_evicts_the_least_recently_used(self):
+        self.check_lru(MemoryBackend(max_entries=3))
+
+    def test_file_backend_evicts_the_least_recently_used(self):
+        with tempfile.TemporaryDirectory() as location:
+            self.check_lru(FileBackend(location, max_entries=3))
+
+    def test_django_backend_clear_keeps_other_keys(self):
+        shared = caches['default']
+        shared.set('unrelated', 1)
+        backend, other = DjangoCacheBackend(), DjangoCacheBackend(key_prefix='other:')
+        backend.set('a', ('a', 0), TTL)
+        other.set('a', ('other', 0), TTL)
+
+        backend.clear()
+        self.assertIsNone(backend.get('a'))
+        self.assertEqual(other.get('a'), ('other', 0))
+        self.assertEqual(shared.get('unrelated'), 1)
+        backend.set('a', ('b', 0), TTL)
+        self.assertEqual(backend.get('a'), ('b', 0))
+
+def wait_until(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError('timed out')
+        time.sleep(0.005)
+
+class Worker(threading.Thread):
+    """
+    Runs fn in a thread, keeping its result or exception.
+    """
+    def __init__(self, fn):
+        super().__init__(daemon=True)
+        self.fn = fn
+        self.result = self.error = None
+
+    def run(self):
+        try:
+            self.result = self.fn()
+        except BaseException as e:
+            self.error = e
+
+class SingleFlightTests(SimpleTestCase):
+    def setUp(self):
+        self.flight = SingleFlight()
+        self.release = threading.Event()
+        self.calls = 0
+
+    def followers(self):
+        return self.flight.get_stats().get('key', {}).get('deduplicated', 0)
+
+    def blocking(self, value='value', error=None):
+        def fn():
+            self.calls += 1
+            self.release.wait(5)
+            if error is not None:
+                raise error
+            return value
+        return fn
+
+    def coroutine(self, value='value'):
+        async def fn():
+            self.calls += 1
+            while not self.release.is_set():
+                await asyncio.sleep(0.005)
+            return value
+        return fn
+
+    def thread_caller(self, fn):
+        worker = Worker(lambda: self.flight.do('key', fn, 'key'))
+        worker.start()
+        return worker
+
+    def coroutine_caller(self, fn):
+        worker = Worker(lambda: asyncio.run(self.flight.ado('key', fn, 'key')))
+        worker.start()
+        return worker
+
+    def finish(self, workers, followers):
+        wait_until(lambda: self.followers() == followers)
+        self.release.set()
+        for worker in workers:
+            worker.join(5)
+        return workers
+
+    def test_thread_leader_shares_with_threads_and_coroutines(self):
+        leader = self.thread_caller(self.blocking('shared'))
+        wait_until(lambda: self.calls == 1)
+        workers = [leader, self.thread_caller(self.blocking()), self.coroutine_caller(self.coroutine())]
+        for worker in self.finish(workers, 2):
+            self.assertEqual((worker.result, worker.error), ('shared', None))
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(self.flight.get_stats(), {'key': {'calls': 1, 'deduplicated': 2}})
+
+    def test_coroutine_leader_shares_with_threads_and_coroutines(self):
+        leader = self.coroutine_caller(self.coroutine('shared'))
+        wait_until(lambda: self.calls == 1)
+        workers = [leader, self.thread_caller(self.blocking()), self.coroutine_caller(self.coroutine())]
+        for worker in self.finish(workers, 2):
+            self.assertEqual((worker.result, worker.error), ('shared', None))
+        self.assertEqual(self.calls, 1)
+
+    def test_followers_get_the_leaders_exception(self):
+        error = ValueError('upstream failed')
+        leader = self.thread_caller(self.blocking(error=error))
+        wait_until(lambda: self.calls == 1)
+        workers = [leader, self.thread_caller(self.blocking()), self.coroutine_caller(self.coroutine())]
+        for worker in self.finish(workers, 2):
+            self.assertIs(worker.error, error)
+        self.assertEqual(self.calls, 1)
+
+    def test_calls_after_completion_run_again(self):
+        self.release.set()
+        self.assertEqual(self.flight.do('key', self.blocking('first')), 'first')
+        self.assertEqual(self.flight.do('key', self.blocking('second')), 'second')
+        self.assertEqual(self.calls, 2)
+
+    def test_cancelled_leader_hands_over_to_a_follower(self):
+        async def scenario():
+            leader = asyncio.ensure_future(self.flight.ado('key', self.coroutine('never'), 'key'))
+            await asyncio.sleep(0.05)
+            self.assertEqual(self.calls, 1)
+            thread_follower = self.thread_caller(self.blocking('taken over'))
+            coroutine_follower = asyncio.ensure_future(self.flight.ado('key', self.coroutine('taken over'), 'key'))
+            while self.followers() < 2:
+                await asyncio.sleep(0.005)
+            leader.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await leader
+            # One follower leads the next call, the other joins it again
+            while self.calls < 2 or self.followers() < 3:
+                await asyncio.sleep(0.005)
+            self.release.set()
+            result = await asyncio.wait_for(coroutine_follower, 5)
+            await asyncio.get_running_loop().run_in_executor(None, thread_follower.join, 5)
+            return result, thread_follower.result
+
+        self.assertEqual(asyncio.run(scenario()), ('taken over', 'taken over'))
+        self.assertEqual(self.calls, 2)
+        self.assertEqual(self.flight.get_stats()['key']['calls'], 2)
+
+def api_response(status_code=200, result=None, comment=None, headers=None):
+    if comment is None:
+        body = {'status': 'OK', 'result': result}
+    else:
+        body = {'status': 'FAILED', 'comment': comment}
+    return status_code, body, headers or {}
+
+CLIENT_CONFIG = {'BACKOFF': 0, 'MAX_RETRIES': 2, 'RATE': 1000, 'BURST': 1000}
+
+class CodeforcesClientTests(SimpleTestCase):
+    def make_client(self, responses):
+        client = CodeforcesClient(base_url='http://codeforces.test/api', config=CLIENT_CONFIG)
+
+        def get(url, params=None, timeout=None):
+            status_code, body, headers = responses.pop(0)
+            response = requests.Response()
+            response.status_code = status_code
+            response._content = json.dumps(body).encode()
+            response.headers.update(headers)
+            return response
+
+        client.session.get = get
+        return client
+
+    def test_transient_failures_are_retried(self):
+        client = self.make_client([
+            api_response(503, comment='Service unavailable'),
+            api_response(400, comment='Call limit exceeded'),
+            api_response(result=['ok']),
+        ])
+        self.assertEqual(client.request('contest.list'), ['ok'])
+        stats = client.get_stats()['contest.list']
+        self.assertEqual((stats['calls'], stats['retries'], stats['errors']), (1, 2, 0))
+
+    def test_permanent_failures_are_not_retried(self):
+        responses = [api_response(400, comment='handles: User with handle x not found'), api_response(result=[])]
+        client = self.make_client(responses)
+        with self.assertRaises(CodeforcesError) as raised:
+            client.request('user.info', {'handles': 'x'})
+        self.assertFalse(raised.exception.retryable)
+        self.assertEqual(len(responses), 1)
+
+    def test_retries_are_bounded(self):
+        responses = [api_response(502, comment='Bad gateway')] * 4
+        client = self.make_client(list(responses))
+        with self.assertRaises(CodeforcesError) as raised:
+            client.request('contest.list')
+        self.assertTrue(raised.exception.retryable)
+        stats = client.get_stats()['contest.list']
+        self.assertEqual((stats['retries'], stats['errors']), (2, 1))
+
+    def test_retry_after_is_parsed(self):
+        client = self.make_client([api_response(429, comment='Too many requests', headers={'Retry-After': '7'})])
+        with self.assertRaises(CodeforcesError) as raised:
+            client._attempt('contest.list', None)
+        self.assertEqual(raised.exception.retry_after, 7)
+
+    def test_backoff_is_jittered_and_capped(self):
+        client = CodeforcesClient(config={'BACKOFF': 1.0, 'MAX_BACKOFF': 10.0})
+        for attempt in range(6):
+            cap = min(10.0, 2 ** attempt)
+            delays = [client.backoff_delay(attempt) for _ in range(50)]
+            self.assertTrue(all(0 <= delay <= cap for delay in delays), attempt)
+            self.assertGreater(len(set(delays)), 1)
+        self.assertEqual(client.backoff_delay(0, retry_after=3), 3)
+        self.assertEqual(client.backoff_delay(0, retry_after=60), 10.0)
+
+    def test_async_client_retries_transient_failures(self):
+        responses = [api_response(503, comment='Service unavailable'), api_response(result=['ok'])]
+
+        def handler(request):
+            status_code, body, headers = responses.pop(0)
+            return httpx.Response(status_code, json=body, headers=headers)
+
+        async def scenario():
+            client = AsyncCodeforcesClient(base_url='http://codeforces.test/api', config=CLIENT_CONFIG)
+            await client.aclose()
+            client.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+            try:
+                return await client.request('contest.list'), client.get_stats()['contest.list']['retries']
+            finally:
+                await client.aclose()
+
+        self.assertEqual(asyncio.run(scenario()), (['ok'], 1))
+
+class TokenBucketTests(SimpleTestCase):
+    def test_burst_then_queued_at_the_rate(self):
+        with mock.patch('utils.codeforces.time') as clock:
+            clock.monotonic.return_value = 100.0
+            bucket = TokenBucket(rate=2, capacity=2)
+            waits = [bucket.reserve() for _ in range(4)]
+            self.assertEqual(waits, [0.0, 0.0, 0.5, 1.0])
+
+            # Refills up to the capacity only
+            clock.monotonic.return_value = 110.0
+            waits = [bucket.reserve() for _ in range(3)]
+            self.assertEqual(waits, [0.0, 0.0, 0.5])
@@ -0,0 +1,38 @@
+import time
+from django.core.cache import cache
+
+# Version counters live in the default cache so every worker sharing it
+# (Redis when REDIS_URL is set) sees a bump made by any process.
+KEY_PREFIX = 'version:'
+
+def _key(name):
+    return KEY_PREFIX + name
+
+def get_version(name):
+    """
+    Current version of a named dataset. Versions are nanosecond timestamps
+    of the last bump, so a version lost with the cache never comes back.
+    """
+    version = cache.get(_key(name))
+    if version is None:
+        version = time.time_ns()
+        # Another process may have initialised it meanwhile, keep theirs
+        if not cache.add(_key(name), version, timeout=None):
+            version = cache.get(_key(name), version)
+    return version
+
+def bump_version(name):
+    version = time.time_ns()
+    cache.set(_key(name), version, timeout=None)
+    return version
+
+def get_versions(names):
+    """
+    Versions of several datasets with a single cache round trip.
+    """
+    keys = {_key(name): name for name in names}
+    versions = {keys[key]: version for key, version in cache.get_many(list(keys)).items()}
+    for name in names:
+        if name not in versions:
+            versions[name] = get_version(name)
+    return versions
@@ -0,0 +1,36 @@
+import inspect
+from asgiref.sync import sync_to_async
+from rest_framework.views import APIView
+
+class AsyncAPIView(APIView):
+    """
+    APIView whose handlers may be coroutines. Under ASGI the request is
+    served on the event loop, and only authentication, permission and
+    throttle checks (which may query the database) hop to a thread.
+    Handlers must wrap their own ORM work in sync_to_async.
+    """
+    view_is_async = True
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+
+            response = handler(request, *args, **kwargs)
+            if inspect.isawaitable(response):
+                response = await response
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
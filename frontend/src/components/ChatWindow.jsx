@@ -1,13 +1,17 @@
-import React, { useState, useEffect, useRef } from 'react';
+import React, { useState, useEffect, useLayoutEffect, useRef } from 'react';
 import { useChat } from '../context/ChatContext';
 import { useAuth } from '../context/AuthContext';
 import { X, Send, AlertCircle, Loader2 } from 'lucide-react';
 
 const ChatWindow = ({ roomName, onClose, recipientName }) => {
-    const { messages, sendMessage, connect, disconnect, isConnected, error } = useChat();
+    const { messages, sendMessage, connect, disconnect, isConnected, error, peerReadId, hasOlder, loadingOlder, loadOlder } = useChat();
     const { user } = useAuth();
     const [inputText, setInputText] = useState('');
     const messagesEndRef = useRef(null);
+    const messagesAreaRef = useRef(null);
+    // Scroll height before an older page was prepended, to keep the view in place
+    const prependedFromRef = useRef(null);
+    const lastMessageIdRef = useRef(null);
 
     useEffect(() => {
         if (roomName) {
@@ -22,10 +26,31 @@ const ChatWindow = ({ roomName, onClose, recipientName }) => {
         messagesEndRef.current?.scrollIntoView({ behavior: "smooth" });
     };
 
-    useEffect(() => {
-        scrollToBottom();
+    useLayoutEffect(() => {
+        const area = messagesAreaRef.current;
+        if (area && prependedFromRef.current !== null) {
+            area.scrollTop += area.scrollHeight - prependedFromRef.current;
+            prependedFromRef.current = null;
+        }
+        // Only new messages at the bottom scroll down, not older pages
+        const last = messages[messages.length - 1];
+        const lastId = last ? (last.id ?? messages.length) : null;
+        if (lastId !== lastMessageIdRef.current) {
+            lastMessageIdRef.current = lastId;
+            scrollToBottom();
+        }
     }, [messages]);
 
+    const handleScroll = async () => {
+        const area = messagesAreaRef.current;
+        if (!area || area.scrollTop > 40 || !hasOlder || loadingOlder) return;
+        const scrollHeight = area.scrollHeight;
+        prependedFromRef.current = scrollHeight;
+        if (!(await loadOlder())) {
+            prependedFromRef.current = null;
+        }
+    };
+
     const handleSend = (e) => {
         e.preventDefault();
         if (inputText.trim() && isConnected) {
@@ -60,7 +85,13 @@ const ChatWindow = ({ roomName, onClose, recipientName }) => {
             )}
 
             {/* Messages Area */}
-            <div className="flex-1 overflow-y-auto p-4 space-y-3 bg-gray-50">
+            <div ref={messagesAreaRef} onScroll={handleScroll} className="flex-1 overflow-y-auto p-4 space-y-3 bg-gray-50">
+                {loadingOlder && (
+                    <div className="text-center text-gray-400 text-xs flex justify-center items-center gap-1">
+                        <Loader2 className="w-3 h-3 animate-spin" /> Loading older messages...
+                    </div>
+                )}
+
                 {!isConnected && !error && (
                     <div className="text-center text-gray-400 text-xs mt-2 flex justify-center items-center gap-1">
                         <Loader2 className="w-3 h-3 animate-spin" /> Connecting...
@@ -74,14 +105,18 @@ const ChatWindow = ({ roomName, onClose, recipientName }) => {
                 ) : (
                     messages.map((msg, index) => {
                         const isMe = msg.sender === user?.username;
+                        const isLast = index === messages.length - 1;
                         return (
-                            <div key={index} className={`flex ${isMe ? 'justify-end' : 'justify-start'}`}>
+                            <div key={msg.id ?? index} className={`flex ${isMe ? 'justify-end' : 'justify-start'}`}>
                                 <div className={`max-w-[75%] rounded-lg px-3 py-2 text-sm ${isMe
                                     ? 'bg-salmon-pink text-black rounded-tr-none'
                                     : 'bg-white border border-gray-200 text-black rounded-tl-none'
                                     }`}>
                                     {!isMe && <div className="text-[10px] opacity-70 mb-0.5">{msg.sender}</div>}
                                     {msg.message}
+                                    {isMe && isLast && msg.id && peerReadId >= msg.id && (
+                                        <div className="text-[10px] opacity-70 mt-0.5 text-right">Seen</div>
+                                    )}
                                 </div>
                             </div>
                         );
@@ -1,6 +1,6 @@
 import React, { createContext, useContext, useState, useEffect, useRef } from 'react';
 import { useAuth } from './AuthContext';
-import { getChatHistory } from '../services/api';
+import { getChatHistory, getLinkParam, getReadState } from '../services/api';
 
 const ChatContext = createContext();
 
@@ -10,7 +10,17 @@ export const ChatProvider = ({ children }) => {
     const [messages, setMessages] = useState([]);
     const [isConnected, setIsConnected] = useState(false);
     const [error, setError] = useState(null);
+    // Latest message id the other participant has read
+    const [peerReadId, setPeerReadId] = useState(0);
+    // Whether older history pages exist, walked with the Link rel="prev" cursor
+    const [hasOlder, setHasOlder] = useState(false);
+    const [loadingOlder, setLoadingOlder] = useState(false);
     const socketRef = useRef(null);
+    const latestIdRef = useRef(0);
+    const olderCursorRef = useRef(null);
+    const otherUsernameRef = useRef(null);
+    // Guards against scroll events firing before loadingOlder re-renders
+    const loadingOlderRef = useRef(false);
     const { user } = useAuth(); // We can access user here if needed
 
     const connect = async (roomName) => {
@@ -25,6 +35,11 @@ export const ChatProvider = ({ children }) => {
         }
 
         setError(null); // Clear previous errors
+        setPeerReadId(0);
+        latestIdRef.current = 0;
+        olderCursorRef.current = null;
+        otherUsernameRef.current = null;
+        setHasOlder(false);
 
         // Fetch History
         if (user) {
@@ -34,10 +49,19 @@ export const ChatProvider = ({ children }) => {
                 const otherUsername = participants.find(p => p !== user.username) || participants[0]; // Fallback for self-chat
 
                 if (otherUsername) {
+                    otherUsernameRef.current = otherUsername;
                     const historyRes = await getChatHistory(otherUsername);
                     if (historyRes.status === 200) {
                         setMessages(historyRes.data);
+                        olderCursorRef.current = getLinkParam(historyRes, 'prev', 'before');
+                        setHasOlder(!!olderCursorRef.current);
+                        const last = historyRes.data[historyRes.data.length - 1];
+                        latestIdRef.current = last ? last.id : 0;
                     }
+                    // Seed the receipt, live read events only cover this session
+                    getReadState(otherUsername)
+                        .then((res) => setPeerReadId((prev) => Math.max(prev, res.data.peer_last_read_message_id || 0)))
+                        .catch(() => {}); // 404 until the conversation exists
                 }
             } catch (err) {
                 console.error("Failed to fetch chat history:", err);
@@ -68,11 +92,21 @@ export const ChatProvider = ({ children }) => {
                 console.log('WebSocket Connected');
                 setIsConnected(true);
                 setError(null);
+                markRead(latestIdRef.current);
             };
 
             socketRef.current.onmessage = (e) => {
                 const data = JSON.parse(e.data);
+                if (data.type === 'read') {
+                    if (data.reader !== user?.username) {
+                        setPeerReadId((prev) => Math.max(prev, data.message_id));
+                    }
+                    return;
+                }
                 setMessages((prev) => [...prev, data]);
+                if (data.sender !== user?.username) {
+                    markRead(data.id);
+                }
             };
 
             socketRef.current.onerror = (e) => {
@@ -93,6 +127,37 @@ export const ChatProvider = ({ children }) => {
         }
     };
 
+    // Prepends the next older page of history, returns whether one was loaded
+    const loadOlder = async () => {
+        const cursor = olderCursorRef.current;
+        const otherUsername = otherUsernameRef.current;
+        if (!cursor || !otherUsername || loadingOlderRef.current) return false;
+
+        loadingOlderRef.current = true;
+        setLoadingOlder(true);
+        try {
+            const res = await getChatHistory(otherUsername, { before: cursor });
+            // The user may have switched rooms meanwhile
+            if (otherUsernameRef.current !== otherUsername) return false;
+            olderCursorRef.current = getLinkParam(res, 'prev', 'before');
+            setHasOlder(!!olderCursorRef.current);
+            setMessages((prev) => [...res.data, ...prev]);
+            return res.data.length > 0;
+        } catch (err) {
+            console.error("Failed to fetch older messages:", err);
+            return false;
+        } finally {
+            loadingOlderRef.current = false;
+            setLoadingOlder(false);
+        }
+    };
+
+    const markRead = (messageId) => {
+        if (messageId && socketRef.current && socketRef.current.readyState === WebSocket.OPEN) {
+            socketRef.current.send(JSON.stringify({ type: 'read', message_id: messageId }));
+        }
+    };
+
     const sendMessage = (message, sender) => {
         if (socketRef.current && socketRef.current.readyState === WebSocket.OPEN) {
             socketRef.current.send(JSON.stringify({ message, sender }));
@@ -108,6 +173,9 @@ export const ChatProvider = ({ children }) => {
         }
         setIsConnected(false);
         setMessages([]); // Optional: clear messages on disconnect/room switch
+        olderCursorRef.current = null;
+        otherUsernameRef.current = null;
+        setHasOlder(false);
     };
 
     useEffect(() => {
@@ -119,7 +187,7 @@ export const ChatProvider = ({ children }) => {
     }, []);
 
     return (
-        <ChatContext.Provider value={{ messages, isConnected, error, connect, disconnect, sendMessage }}>
+        <ChatContext.Provider value={{ messages, isConnected, error, peerReadId, hasOlder, loadingOlder, connect, disconnect, sendMessage, loadOlder }}>
             {children}
         </ChatContext.Provider>
     );
@@ -61,6 +61,21 @@ export const getCFUser = (handle) => axios.get(`https://codeforces.com/api/user.
 export const getPublicUser = (query) => api.get(`/users/public/${query}/`);
 export const searchUsers = (query) => api.get(`/users/search/?q=${query}`);
 export const getCFSubmissions = (handle) => axios.get(`https://codeforces.com/api/user.status?handle=${handle}`);
-export const getChatHistory = (otherUsername) => api.get(`/chat/history/${otherUsername}/`);
+export const getChatHistory = (otherUsername, params) => api.get(`/chat/history/${otherUsername}/`, { params });
+export const getReadState = (otherUsername) => api.get(`/chat/read/${otherUsername}/`);
+export const getInbox = (params) => api.get('/chat/inbox/', { params });
+
+// Query param `param` of the `rel` link in a paginated response's Link header, or null
+export const getLinkParam = (response, rel, param) => {
+    const header = response.headers?.link;
+    if (!header) return null;
+    for (const part of header.split(',')) {
+        const match = part.match(/<([^>]*)>\s*;\s*rel="([^"]*)"/);
+        if (match && match[2] === rel) {
+            return new URL(match[1]).searchParams.get(param);
+        }
+    }
+    return null;
+};
 
 export default api;